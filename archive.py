@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+
+COPY_CHUNK = 1024 * 1024
+# Headers that describe the wire encoding, not the decoded payload we store
+HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'}
+
+FORMATS = ('warc', 'warc.gz', 'zip', 'zip-deflated')
+
+
+def open_archive(output_dir, fmt, append=False):
+    """Archive written next to the output folder, e.g. scraped_example_com_123.warc.gz"""
+    if fmt in ('warc', 'warc.gz'):
+        return WarcArchive(output_dir.parent / f"{output_dir.name}.{fmt}", compress=fmt == 'warc.gz', append=append)
+    if fmt in ('zip', 'zip-deflated'):
+        return ZipArchive(output_dir.parent / f"{output_dir.name}.zip", deflate=fmt == 'zip-deflated', append=append)
+    raise ValueError(f"Unknown archive format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+
+class _Index:
+    """<archive>.idx.jsonl: one line per record with what is needed to seek straight to it"""
+
+    def __init__(self, path, append):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def add(self, **entry):
+        self.file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def read_chunks(body=None, path=None):
+    if body is not None:
+        yield body
+        return
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            yield chunk
+
+
+class WarcArchive:
+    """
+    WARC 1.1 file with a request + response record per fetched page or asset (a resource
+    record for browser-rendered pages). Records are only ever appended; with compress=True
+    every record is its own gzip member, as is usual for .warc.gz, so the offsets in the
+    index can be read without touching the rest of the file.
+    Bodies are stored decoded (Content-Encoding removed) since that is what we download.
+    """
+
+    def __init__(self, path, compress=True, append=False):
+        self.path = path
+        self.compress = compress
+        self.file = open(path, 'ab' if append else 'wb')
+        self.index = _Index(f"{path}.idx.jsonl", append)
+        self.lock = threading.Lock()
+        self.records = 0
+        with self.lock:
+            self._write_record('warcinfo', None, [('Content-Type', 'application/warc-fields')],
+                               body=f"software: Website Source Getter\r\nformat: WARC File Format 1.1\r\n".encode())
+
+    def _write_record(self, kind, url, headers, body=None, path=None, length=None, prefix=b''):
+        """Caller holds the lock. Returns (offset, record id)"""
+        if length is None:
+            length = len(body) if body is not None else os.path.getsize(path)
+        record_id = f"<urn:uuid:{uuid.uuid4()}>"
+        lines = ['WARC/1.1', f'WARC-Type: {kind}', f'WARC-Record-ID: {record_id}',
+                 f'WARC-Date: {time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}']
+        if url:
+            lines.append(f'WARC-Target-URI: {url}')
+        lines += [f'{name}: {value}' for name, value in headers]
+        lines.append(f'Content-Length: {len(prefix) + length}')
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8')
+
+        offset = self.file.tell()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None
+
+        def write(data):
+            self.file.write(compressor.compress(data) if compressor else data)
+
+        write(head)
+        if prefix:
+            write(prefix)
+        if length:
+            for chunk in read_chunks(body, path):
+                write(chunk)
+        write(b"\r\n\r\n")
+        if compressor:
+            self.file.write(compressor.flush())
+        self.records += 1
+        return offset, record_id
+
+    def add_response(self, url, status, reason, headers, body=None, path=None, method='GET'):
+        """One fetched HTTP response. The body comes from memory or is streamed from path"""
+        http_head = [f"HTTP/1.1 {status} {reason or ''}".rstrip()]
+        http_head += [f"{name}: {value}" for name, value in headers.items() if name.lower() not in HOP_HEADERS]
+        length = len(body) if body is not None else os.path.getsize(path)
+        http_head.append(f"Content-Length: {length}")
+        prefix = ("\r\n".join(http_head) + "\r\n\r\n").encode('latin-1', errors='replace')
+        request = f"{method} {url} HTTP/1.1\r\n\r\n".encode('latin-1', errors='replace')
+        with self.lock:
+            offset, record_id = self._write_record('response', url, [('Content-Type', 'application/http; msgtype=response')],
+                                                   body=body, path=path, length=length, prefix=prefix)
+            self._write_record('request', url, [('Content-Type', 'application/http; msgtype=request'),
+                                                ('WARC-Concurrent-To', record_id)], body=request)
+            self.index.add(url=url, offset=offset, status=status, length=length,
+                           mime=headers.get('Content-Type', ''))
+
+    def add_resource(self, url, content_type, body=None, path=None):
+        """Content without an HTTP exchange of its own, e.g. a page rendered by the browser"""
+        with self.lock:
+            offset, _ = self._write_record('resource', url, [('Content-Type', content_type)], body=body, path=path)
+            self.index.add(url=url, offset=offset, status=None, mime=content_type)
+
+    def add_file(self, name, path=None, url=None, body=None):
+        """Mirror files (rewritten pages, netlify.toml) aren't captures, a WARC skips them"""
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.index.close()
+
+
+class ZipArchive:
+    """
+    The mirror itself (same layout as the folder) streamed into one zip as files are
+    finished. Members are appended through ZipFile.open('w'), so nothing is staged in
+    memory or in temp files; the zip's central directory plus <archive>.idx.jsonl
+    (name -> header offset) give random access.
+    """
+
+    def __init__(self, path, deflate=False, append=False):
+        self.path = path
+        mode = 'a' if append and path.exists() else 'w'
+        compression = zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED
+        try:
+            self.zip = zipfile.ZipFile(path, mode, compression=compression, allowZip64=True)
+        except zipfile.BadZipFile:
+            # Interrupted before the central directory was written, start a fresh one
+            self.zip = zipfile.ZipFile(path, 'w', compression=compression, allowZip64=True)
+            mode = 'w'
+        self.names = set(self.zip.namelist())
+        self.index = _Index(f"{path}.idx.jsonl", mode == 'a')
+        self.lock = threading.Lock()
+        self.records = 0
+
+    def add_file(self, name, path=None, url=None, body=None):
+        name = name.replace("\\", "/")
+        with self.lock:
+            if name in self.names:
+                return
+            self.names.add(name)
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = self.zip.compression
+            size = len(body) if body is not None else os.path.getsize(path)
+            with self.zip.open(info, 'w', force_zip64=size > 0x7FFFFFFF) as member:
+                for chunk in read_chunks(body, path):
+                    member.write(chunk)
+            self.records += 1
+            self.index.add(name=name, url=url, offset=info.header_offset, size=size, compressed=info.compress_size)
+
+    def add_response(self, *args, **kwargs):
+        """A zip holds the finished mirror, responses arrive through add_file"""
+
+    def add_resource(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        with self.lock:
+            self.zip.close()
+            self.index.close()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urldefrag, urlparse
+
+MANIFEST_NAME = "manifest.json"
+
+
+def url_digest(url):
+    """Stable across runs and machines, unlike hash() (randomized per process)"""
+    return hashlib.sha1(urldefrag(url)[0].encode('utf-8', 'ignore')).hexdigest()[:12]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """
+    Names and deduplicates mirrored assets.
+    Every URL gets its own stable file name (readable stem + URL digest), so /a/logo.png and
+    /b/logo.png no longer collide. Bodies are identified by SHA-256: a second URL serving
+    bytes we already have is hard-linked to the first copy (or simply mapped to it when the
+    filesystem can't link). manifest.json records URL -> path, size and hash (and for a
+    stylesheet, the URLs it references before its rewrite).
+    entries / by_hash can be disk-backed maps (spill.DiskMap) for low-memory crawls.
+    """
+
+    def __init__(self, output_dir, dedup=True, entries=None, by_hash=None):
+        self.output_dir = Path(output_dir)
+        self.dedup = dedup
+        self.entries = entries if entries is not None else {}  # Key: URL, Value: {'path', 'size', 'sha256'}
+        self.by_hash = by_hash if by_hash is not None else {}  # Key: sha256, Value: path relative to ROOT
+        self.lock = threading.Lock()
+        self.deduplicated = 0
+        self.bytes_deduplicated = 0
+        self.load()
+
+    def load(self):
+        """Pick up the manifest of a previous run into the same folder (incremental mode)"""
+        try:
+            with open(self.output_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries.update(data)
+        for entry in data.values():
+            if entry.get('sha256'):
+                self.by_hash.setdefault(entry['sha256'], entry['path'])
+
+    def path_for(self, full_url, folder, type_attr=''):
+        """Where full_url is stored inside folder (e.g. assets/images)"""
+        name = os.path.basename(unquote(urlparse(full_url).path))
+        stem, ext = os.path.splitext(name)
+        if not ext:
+            ext = mimetypes.guess_extension(type_attr) or '.bin'
+        stem = re.sub(r'[^\w\.-]', '_', stem)[:40] or 'resource'
+        ext = re.sub(r'[^\w\.]', '_', ext)[:10]
+        return folder / f"{stem}-{url_digest(full_url)}{ext}"
+
+    def known_hash(self, full_url, rel_path):
+        entry = self.entries.get(full_url)
+        if entry and entry.get('path') == rel_path:
+            return entry.get('sha256')
+        return None
+
+    def holds(self, rel_path, sha256, size):
+        """True if rel_path still has the body it was recorded with (an incremental run may have replaced it)"""
+        path = self.output_dir / rel_path
+        try:
+            return path.stat().st_size == size and file_sha256(path) == sha256
+        except OSError:
+            return False
+
+    def record(self, full_url, filepath, size, sha256=None, dedup=True):
+        """
+        Register a finished download and return the path (relative to ROOT) the URL should map to.
+        sha256=None means the body wasn't read (e.g. a 304), the hash is taken from the
+        manifest or the file itself.
+        """
+        rel_path = str(filepath.relative_to(self.output_dir)).replace("\\", "/")
+        if sha256 is None:
+            sha256 = self.known_hash(full_url, rel_path) or file_sha256(filepath)
+
+        with self.lock:
+            dedup = self.dedup and dedup
+            previous = self.entries.get(full_url)
+            if previous and previous.get('path') == rel_path and previous.get('sha256') not in (None, sha256):
+                # New body in the same file: the old hash must not lead other URLs here any more
+                if self.by_hash.get(previous['sha256']) == rel_path:
+                    self.by_hash.pop(previous['sha256'], None)
+            existing = self.by_hash.get(sha256) if dedup else None
+            if existing and existing != rel_path and not self.holds(existing, sha256, size):
+                # Changed or gone since it was recorded, this copy is the one to link to from now on
+                self.by_hash[sha256] = rel_path
+                existing = None
+            if existing and existing != rel_path:
+                self.deduplicated += 1
+                self.bytes_deduplicated += size
+                try:
+                    os.remove(filepath)
+                    os.link(self.output_dir / existing, filepath)
+                except OSError:
+                    # No hard links here (or the file is busy): keep the single copy and map to it
+                    if not filepath.exists():
+                        rel_path = existing
+            elif dedup:
+                self.by_hash.setdefault(sha256, rel_path)
+            entry = {'path': rel_path, 'size': size, 'sha256': sha256}
+            if previous and previous.get('refs') and previous.get('path') == rel_path:
+                entry['refs'] = previous['refs']
+            self.entries[full_url] = entry
+            return rel_path
+
+    def set_refs(self, full_url, refs):
+        """What a stylesheet references, for later runs that find it already rewritten"""
+        with self.lock:
+            entry = self.entries.get(full_url)
+            if entry is not None:
+                self.entries[full_url] = dict(entry, refs=refs)
+
+    def refs(self, full_url):
+        entry = self.entries.get(full_url)
+        return (entry or {}).get('refs') or {}
+
+    def adopt(self, full_url, rel_path):
+        """Take over an asset a resumed crawl already has on disk but the manifest lacks"""
+        if full_url in self.entries:
+            return
+        filepath = self.output_dir / rel_path
+        try:
+            size, sha256 = filepath.stat().st_size, file_sha256(filepath)
+        except OSError:
+            return
+        with self.lock:
+            self.by_hash.setdefault(sha256, rel_path)
+            self.entries[full_url] = {'path': rel_path, 'size': size, 'sha256': sha256}
+
+    def save(self):
+        tmp = self.output_dir / (MANIFEST_NAME + '.tmp')
+        if isinstance(self.entries, dict):
+            with self.lock:
+                data = dict(self.entries)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+        else:
+            # Disk-backed: streamed in key order, same layout as json.dump above
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write("{")
+                separator = "\n"
+                for url, entry in self.entries.sorted_items():
+                    body = json.dumps(entry, indent=1, sort_keys=True).replace("\n", "\n ")
+                    f.write(f"{separator} {json.dumps(url)}: {body}")
+                    separator = ",\n"
+                f.write("\n}" if separator != "\n" else "}")
+        os.replace(tmp, self.output_dir / MANIFEST_NAME)
+
+    def summary(self):
+        return f"{len(self.entries)} URLs, {self.deduplicated} duplicates ({self.bytes_deduplicated // 1024}KB) stored once"
@@ -0,0 +1,77 @@
+"""
+Cost of checkpointing a crawl: batched CrawlCheckpoint writes against committing every
+record on its own, for a simulated crawl (each page queues links and maps a few assets).
+
+    python benchmarks/bench_checkpoint.py [pages]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpoint import CrawlCheckpoint, STATE_FILE
+
+LINKS_PER_PAGE = 3
+ASSETS_PER_PAGE = 4
+
+
+def simulate(record_queued, record_done, record_asset, pages):
+    start = time.perf_counter()
+    for page in range(pages):
+        for link in range(LINKS_PER_PAGE):
+            record_queued(f"https://example.com/page/{page * LINKS_PER_PAGE + link}")
+        for asset in range(ASSETS_PER_PAGE):
+            url = f"https://example.com/img/{page}-{asset}.png"
+            record_asset([url, f"/img/{page}-{asset}.png"], f"assets/images/{page}-{asset}.png")
+        record_done(f"https://example.com/page/{page}", page + 1)
+    return time.perf_counter() - start
+
+
+def batched(folder, pages):
+    checkpoint = CrawlCheckpoint(folder)
+    elapsed = simulate(checkpoint.queued, checkpoint.done, checkpoint.asset, pages)
+    start = time.perf_counter()
+    checkpoint.close()
+    return elapsed + time.perf_counter() - start, checkpoint.commits
+
+
+def per_record(folder, pages):
+    """Same schema, one transaction per write"""
+    checkpoint = CrawlCheckpoint(folder)
+    checkpoint.close()
+    db = sqlite3.connect(str(folder / STATE_FILE))
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+
+    def queued(url):
+        db.execute("INSERT OR IGNORE INTO pages (url, state) VALUES (?, 0)", (url,))
+        db.commit()
+
+    def done(url, number):
+        db.execute("INSERT OR REPLACE INTO pages (url, state, number) VALUES (?, 1, ?)", (url, number))
+        db.commit()
+
+    def asset(keys, path):
+        db.executemany("INSERT OR REPLACE INTO assets (key, path) VALUES (?, ?)", [(key, path) for key in keys])
+        db.commit()
+
+    elapsed = simulate(queued, done, asset, pages)
+    db.close()
+    return elapsed, pages * (LINKS_PER_PAGE + ASSETS_PER_PAGE + 1)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{pages} pages, {LINKS_PER_PAGE} queued links + {ASSETS_PER_PAGE} assets each")
+    print(f"{'mode':<12} {'total (s)':>10} {'per page (us)':>14} {'commits':>8}")
+    for name, fn in [("batched", batched), ("per record", per_record)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            seconds, commits = fn(Path(tmp), pages)
+        print(f"{name:<12} {seconds:>10.2f} {seconds / pages * 1e6:>14.1f} {commits:>8}")
+
+
+if __name__ == "__main__":
+    main()
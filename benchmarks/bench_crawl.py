@@ -0,0 +1,180 @@
+"""
+End-to-end crawl benchmark, fully offline: generates a synthetic site, serves it on
+127.0.0.1 and mirrors it with the crawler core in a separate process (so peak RSS is the
+crawler's alone). Reports pages/s, assets/s, MB/s, peak RSS and time per stage, and saves
+the result as JSON under benchmarks/results/ for comparison across versions.
+
+    python benchmarks/bench_crawl.py [--size small|medium|large] [--pages N] [--repeat 3]
+    python benchmarks/bench_crawl.py --compare benchmarks/results/OLD.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+sys.path.insert(0, HERE)
+from synthetic_site import SIZES, generate_site, serve
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, None where it can't be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def child(url, options_json):
+    """Runs in the benchmark subprocess: one crawl, JSON result on stdout"""
+    sys.path.insert(0, ROOT)
+    from crawler import SiteCrawler, CrawlOptions
+    crawler = SiteCrawler(url, CrawlOptions(**json.loads(options_json)))
+    started = time.perf_counter()
+    summary = crawler.run()
+    seconds = time.perf_counter() - started
+    report = crawler.metrics.report()
+    page_bytes = report['fetches'].get('page', {}).get('bytes', 0)
+    asset_fetches = sum(sum(data['status'].values()) for kind, data in report['fetches'].items() if kind != 'page')
+    print(json.dumps({
+        'status': summary['status'],
+        'seconds': seconds,
+        'pages': summary['pages'],
+        'assets': summary['assets'],
+        'asset_fetches': asset_fetches,
+        'bytes': summary['asset_bytes'] + page_bytes,
+        'errors': summary.get('errors', 0),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': {name: stat['sum'] for name, stat in report['stages'].items()},
+    }))
+
+
+def run_once(url, options):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", url, json.dumps(options)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(runs):
+    """Best run by wall time, with rates derived from it"""
+    best = min(runs, key=lambda run: run['seconds'])
+    seconds = best['seconds']
+    return {
+        'seconds': round(seconds, 3),
+        'pages_per_s': round(best['pages'] / seconds, 2),
+        'assets_per_s': round(best['asset_fetches'] / seconds, 2),
+        'mb_per_s': round(best['bytes'] / 1024 / 1024 / seconds, 2),
+        'peak_rss_mb': round(best['peak_rss_mb'], 1) if best['peak_rss_mb'] else None,
+        'pages': best['pages'],
+        'assets': best['assets'],
+        'errors': best['errors'],
+        'stages': {name: round(value, 3) for name, value in sorted(best['stages'].items())},
+    }
+
+
+def print_result(result, baseline=None):
+    metrics = result['result']
+    old = baseline['result'] if baseline else {}
+    print(f"{'metric':<14} {'value':>10}" + (f" {'baseline':>10} {'change':>8}" if baseline else ""))
+    for key in ['seconds', 'pages_per_s', 'assets_per_s', 'mb_per_s', 'peak_rss_mb']:
+        value = metrics[key]
+        line = f"{key:<14} {value if value is not None else '-':>10}"
+        if baseline and old.get(key) and value is not None:
+            line += f" {old[key]:>10} {(value - old[key]) / old[key] * 100:>+7.1f}%"
+        print(line)
+    print("stage seconds: " + ", ".join(f"{name} {value}" for name, value in metrics['stages'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', nargs=2, metavar=('URL', 'OPTIONS'), help=argparse.SUPPRESS)
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    for name in ['pages', 'fanout', 'images', 'css', 'js', 'fonts', 'media', 'media_mb']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f"Override the preset's {name}")
+    parser.add_argument('--page-workers', type=int, default=4)
+    parser.add_argument('--download-threads', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=1, help="Crawls per benchmark, the fastest one is reported")
+    parser.add_argument('--label', default="", help="Free text stored with the result")
+    parser.add_argument('--compare', help="Earlier result JSON to compare against")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    site = dict(SIZES[args.size])
+    for name in site:
+        if getattr(args, name, None) is not None:
+            site[name] = getattr(args, name)
+
+    with tempfile.TemporaryDirectory(prefix="bench_site_") as site_dir, \
+            tempfile.TemporaryDirectory(prefix="bench_out_") as out_dir:
+        info = generate_site(site_dir, **site)
+        print(f"Site: {info['pages']} pages, {info['asset_files']} asset files, {info['asset_bytes'] / 1024 / 1024:.1f} MB")
+        server, url = serve(site_dir)
+        options = {
+            'max_pages': info['pages'],
+            'page_workers': args.page_workers,
+            'download_threads': args.download_threads,
+            'per_host_limit': max(args.page_workers, args.download_threads),
+            'politeness_delay': 0,
+            'output_root': out_dir,
+            'cache_dir': os.path.join(out_dir, "cache"),
+        }
+        try:
+            runs = [run_once(url, options) for _ in range(max(1, args.repeat))]
+        finally:
+            server.shutdown()
+
+    result = {
+        'revision': git_revision(),
+        'label': args.label,
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': sys.version.split()[0],
+        'site': info,
+        'options': {key: value for key, value in options.items() if key not in ('output_root', 'cache_dir')},
+        'result': summarize(runs),
+        'runs': runs,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{result['revision']}_{args.size}.json"
+        path = os.path.join(RESULTS_DIR, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=1)
+        print(f"Saved {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
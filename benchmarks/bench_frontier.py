@@ -0,0 +1,88 @@
+"""
+Link bookkeeping for a large crawl: pushes 1M+ discovered links (many of them duplicates
+or variants differing only by fragment, trailing slash, port or query order) through
+    legacy - append to the queue unless already visited (the original scrape_website)
+    exact  - Frontier with canonical fingerprints
+    bloom  - Frontier with a Bloom filter seen-set
+and reports time, queue length and memory held by the queue + seen-set.
+
+    python benchmarks/bench_frontier.py [links]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frontier import Frontier
+from urlnorm import make_seen_set, normalize
+
+
+def discovered_links(count, seed=1):
+    """About 1 in 4 links is a new page, the rest repeat an earlier one in some spelling"""
+    rng = random.Random(seed)
+    pages = max(1, count // 4)
+    variants = [
+        "https://example.com/section/{n}/article?id={n}&ref=home",
+        "https://example.com/section/{n}/article/?ref=home&id={n}",
+        "https://EXAMPLE.com:443/section/{n}/article?id={n}&ref=home#comments",
+        "https://example.com/section/{n}/article?ref=home&id={n}#top",
+    ]
+    for _ in range(count):
+        n = rng.randrange(pages)
+        yield rng.choice(variants).format(n=n)
+
+
+def legacy(links):
+    queue = deque()
+    visited = set()
+    for url in links:
+        if url not in visited:
+            queue.append(url)
+    return queue, visited
+
+
+def with_frontier(kind, capacity):
+    def run(links):
+        frontier = Frontier(max_pages=10 ** 9, seen=make_seen_set(kind, capacity))
+        for url in links:
+            frontier.add(normalize(url))
+        return frontier
+    return run
+
+
+def measure(fn, count):
+    # Links are generated during the run, like urljoin() creating them, so every string a
+    # structure keeps is counted against it
+    start = time.perf_counter()
+    result = fn(discovered_links(count))
+    elapsed = time.perf_counter() - start
+    queued = len(result[0]) if isinstance(result, tuple) else len(result.queue)
+    del result
+
+    tracemalloc.start()
+    result = fn(discovered_links(count))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, queued, memory
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_200_000
+    print(f"{count} discovered links (generation included in the times)")
+    print(f"{'mode':<8} {'seconds':>8} {'links/s':>10} {'queued':>10} {'memory (MB)':>12}")
+    modes = [
+        ("legacy", legacy),
+        ("exact", with_frontier("exact", None)),
+        ("bloom", with_frontier("bloom", count)),
+    ]
+    for name, fn in modes:
+        elapsed, queued, memory = measure(fn, count)
+        print(f"{name:<8} {elapsed:>8.2f} {count / elapsed:>10.0f} {queued:>10} {memory / 1024 / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Memory over a long crawl: serves a generated-on-the-fly site (every page links further on
+and shows its own images, so the link and asset maps grow with every page) and crawls it
+in a child process with and without low_memory, sampling RSS as pages complete.
+Reports RSS at each quarter of the crawl, the peak, and the growth per 1000 pages.
+
+    python benchmarks/bench_memory.py [--pages 5000] [--images 4] [--modes default low-memory]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from bench_crawl import peak_rss_mb
+
+MODES = {
+    'default': {},
+    'low-memory': {'low_memory': True, 'hot_entries': 5000},
+}
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(512)
+
+
+class GeneratedSite(BaseHTTPRequestHandler):
+    """/p<n>.html links to the next pages and to images only it uses, /img/<n>-<k>.png"""
+    pages = 1000
+    images = 4
+    fanout = 6
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        path = self.path.split('?')[0]
+        if path in ('/', '/index.html'):
+            path = '/p0.html'
+        if path.startswith('/p') and path.endswith('.html') and path[2:-5].isdigit():
+            n = int(path[2:-5])
+            links = "".join(f'<a href="/p{(n * self.fanout + k) % self.pages}.html?from={n}#top">more</a>'
+                            for k in range(1, self.fanout + 1))
+            links += f'<a href="/p{(n + 1) % self.pages}.html">next</a>'
+            images = "".join(f'<img src="/img/{n}-{k}.png" alt="">' for k in range(self.images))
+            body = f"<html><head><title>Page {n}</title></head><body>{links}{images}" \
+                   f"<p>{'Lorem ipsum dolor sit amet. ' * 40}</p></body></html>".encode()
+            content_type = 'text/html; charset=utf-8'
+        elif path.startswith('/img/'):
+            body, content_type = IMAGE, 'image/png'
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def child(url, options_json):
+    """Runs in the benchmark subprocess: one crawl with an RSS sampler, JSON result on stdout"""
+    sys.path.insert(0, ROOT)
+    from crawler import SiteCrawler, CrawlOptions
+    crawler = SiteCrawler(url, CrawlOptions(**json.loads(options_json)))
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.25):
+            frontier = crawler.frontier
+            if frontier is not None:
+                samples.append((len(frontier.visited), current_rss_mb()))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    summary = crawler.run()
+    done.set()
+    sampler.join()
+    print(json.dumps({
+        'status': summary['status'],
+        'seconds': round(time.perf_counter() - started, 2),
+        'pages': summary['pages'],
+        'assets': summary['assets'],
+        'peak_rss_mb': peak_rss_mb(),
+        'samples': samples,
+    }))
+
+
+def rss_at(samples, pages):
+    """RSS of the first sample taken once `pages` pages were visited"""
+    for visited, rss in samples:
+        if visited >= pages and rss is not None:
+            return rss
+    return samples[-1][1] if samples else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', nargs=2, metavar=('URL', 'OPTIONS'), help=argparse.SUPPRESS)
+    parser.add_argument('--pages', type=int, default=5000)
+    parser.add_argument('--images', type=int, default=4, help="Images per page, each used by that page only")
+    parser.add_argument('--page-workers', type=int, default=4)
+    parser.add_argument('--download-threads', type=int, default=8)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    handler = type('Site', (GeneratedSite,), {'pages': args.pages, 'images': args.images})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print(f"Generated site: {args.pages} pages, {args.pages * args.images} images")
+    quarters = [args.pages * q // 4 for q in range(1, 5)]
+    print(f"{'mode':<11} {'seconds':>8} {'pages':>6} " + " ".join(f"{f'rss@{q}':>10}" for q in quarters)
+          + f" {'peak':>7} {'MB/1k pages':>12}")
+    try:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory(prefix="bench_mem_") as out_dir:
+                options = {
+                    'max_pages': args.pages, 'page_workers': args.page_workers,
+                    'download_threads': args.download_threads, 'politeness_delay': 0,
+                    'per_host_limit': max(args.page_workers, args.download_threads),
+                    'organize_netlify': False, 'use_sitemaps': False, 'respect_robots': False,
+                    'output_root': out_dir, **MODES[mode],
+                }
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", url, json.dumps(options)],
+                    cwd=ROOT, capture_output=True, text=True, check=True
+                ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            samples = result['samples']
+            rss = [rss_at(samples, q) for q in quarters]
+            # Growth between the first and last quarter, i.e. after start-up costs are paid
+            growth = None
+            if rss[0] is not None and rss[-1] is not None and quarters[-1] > quarters[0]:
+                growth = (rss[-1] - rss[0]) / (quarters[-1] - quarters[0]) * 1000
+            print(f"{mode:<11} {result['seconds']:>8} {result['pages']:>6} "
+                  + " ".join(f"{value:>10.1f}" if value is not None else f"{'-':>10}" for value in rss)
+                  + f" {result['peak_rss_mb'] or 0:>7.1f} {growth if growth is not None else 0:>12.2f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
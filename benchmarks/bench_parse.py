@@ -0,0 +1,80 @@
+"""
+Parse + extract cost on large pages: the old html.parser + one find_all per tag kind,
+against make_soup + extract_page (lxml when installed).
+
+    python benchmarks/bench_parse.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bs4 import BeautifulSoup
+from extractor import extract_page, make_soup, pick_parser
+
+ROUNDS = 3
+PAGE_SIZES = [500, 2000, 8000]  # blocks per page, each block has a link, an image, text, ...
+
+
+def build_page(blocks):
+    parts = ['<html><head>']
+    for i in range(20):
+        parts.append(f'<link rel="stylesheet" href="/css/s{i}.css"><script src="/js/a{i}.js"></script>')
+    parts.append('</head><body>')
+    for i in range(blocks):
+        parts.append(
+            f'<div class="card"><a href="/post/{i}">Post {i}</a>'
+            f'<img src="/img/{i}.jpg" data-src="/img/{i}@2x.jpg" alt="">'
+            f'<p>Some text for block {i} with <b>markup</b> and <i>more</i> inline tags.</p></div>'
+        )
+        if i % 100 == 0:
+            parts.append(f'<video src="/v/{i}.mp4"><source src="/v/{i}.webm"></video>'
+                         f'<audio><source src="/a/{i}.mp3"></audio>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def legacy(html):
+    """What scrape_website did before: slow backend, a find_all per asset kind, then str(soup)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [a['href'] for a in soup.find_all('a', href=True)]
+    found = []
+    for tag, attr in [('img', 'src'), ('img', 'data-src'), ('video', 'src'), ('video', 'data-src'),
+                      ('source', 'src'), ('source', 'data-src'), ('audio', 'src'), ('source', 'src'),
+                      ('script', 'src')]:
+        found.extend(el.get(attr) for el in soup.find_all(tag))
+    found.extend(el.get('href') for el in soup.find_all('link', rel='stylesheet'))
+    found.extend(el.get('href') for el in soup.find_all('link', rel='stylesheet'))  # fonts pass
+    str(soup)
+    return links, found
+
+
+def current(html):
+    soup = make_soup(html)
+    refs = extract_page(soup)
+    str(soup)
+    return refs
+
+
+def best_of(fn, html):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    print(f"Parser in use: {pick_parser()} (best of {ROUNDS})")
+    print(f"{'page KB':>8} {'legacy (ms)':>12} {'single pass (ms)':>17} {'speedup':>8}")
+    for blocks in PAGE_SIZES:
+        html = build_page(blocks)
+        old_ms = best_of(legacy, html)
+        new_ms = best_of(current, html)
+        print(f"{len(html) // 1024:>8} {old_ms:>12.1f} {new_ms:>17.1f} {old_ms / new_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
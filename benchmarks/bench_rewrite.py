@@ -0,0 +1,99 @@
+"""
+Per-page cost of the HTML path rewrite as the crawl-wide asset map grows.
+
+    python benchmarks/bench_rewrite.py
+
+The legacy column is the old update_html_paths loop (a str.replace per map entry plus
+the regex passes). It is only run up to LEGACY_LIMIT entries because it gets slow.
+"""
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rewriter import rewrite_html
+
+BASE_URL = "https://example.com/blog/post"
+MAP_SIZES = [100, 1000, 10000, 50000]
+LEGACY_LIMIT = 10000
+ROUNDS = 5
+
+
+def legacy_update_html_paths(html, downloaded_files, base_url, html_subdir="."):
+    sorted_urls = sorted(downloaded_files.keys(), key=len, reverse=True)
+    for original_url in sorted_urls:
+        root_relative_path = downloaded_files[original_url]
+        if html_subdir == ".":
+            final_path = root_relative_path.replace("\\", "/")
+        else:
+            final_path = "../" + root_relative_path.replace("\\", "/")
+        html = html.replace(f'"{original_url}"', f'"{final_path}"')
+        html = html.replace(f"'{original_url}'", f"'{final_path}'")
+        if not original_url.startswith(('http://', 'https://', '//')):
+            full_url = urljoin(base_url, original_url)
+            html = html.replace(f'"{full_url}"', f'"{final_path}"')
+            html = html.replace(f"'{full_url}'", f"'{final_path}'")
+    if html_subdir != ".":
+        html = re.sub(r'(href|src|content|data-src|data-href)=(["\'])assets/', r'\1=\2../assets/', html, flags=re.IGNORECASE)
+        html = re.sub(r'url\((["\']?)assets/', r'url(\1../assets/', html, flags=re.IGNORECASE)
+        for folder, target in [('css', 'css'), ('js', 'js'), ('javascript', 'js'), ('images?', 'images'),
+                               ('img', 'images'), ('fonts?', 'fonts'), ('videos?', 'videos'),
+                               ('audio', 'audio'), ('media', 'images')]:
+            html = re.sub(rf'(href|src|content|data-src)=(["\'])/{folder}/', rf'\1=\2../assets/{target}/', html, flags=re.IGNORECASE)
+        html = re.sub(r'url\((["\']?)/css/', r'url(\1../assets/css/', html, flags=re.IGNORECASE)
+        html = re.sub(r'url\((["\']?)/images?/', r'url(\1../assets/images/', html, flags=re.IGNORECASE)
+        html = re.sub(r'url\((["\']?)/fonts?/', r'url(\1../assets/fonts/', html, flags=re.IGNORECASE)
+    html = re.sub(r'<base[^>]*>', '', html, flags=re.IGNORECASE)
+    return html
+
+
+def build_page(assets=300, paragraphs=200):
+    parts = ['<html><head><base href="/">']
+    for i in range(assets // 3):
+        parts.append(f'<link rel="stylesheet" href="/css/style{i}.css">')
+    parts.append('</head><body>')
+    for i in range(assets // 3):
+        parts.append(f'<img src="img/photo{i}.jpg" alt="photo {i}">')
+        parts.append(f'<div style="background:url(\'/images/bg{i}.png\')"></div>')
+    for i in range(paragraphs):
+        parts.append(f'<p class="text">Paragraph {i} with <a href="/page{i}.html">a link</a> in it.</p>')
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def build_map(size):
+    downloaded_files = {}
+    for i in range(size // 2):
+        downloaded_files[f"https://example.com/img/photo{i}.jpg"] = f"assets/images/photo{i}.jpg"
+        downloaded_files[f"img/photo{i}.jpg"] = f"assets/images/photo{i}.jpg"
+    return downloaded_files
+
+
+def time_call(fn, *args):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    html = build_page()
+    print(f"Page size: {len(html) // 1024}KB, best of {ROUNDS} rounds, subdir=pages")
+    print(f"{'map entries':>12} {'single pass (ms)':>18} {'legacy (ms)':>14}")
+    for size in MAP_SIZES:
+        downloaded_files = build_map(size)
+        new_ms = time_call(rewrite_html, html, downloaded_files, BASE_URL, "pages")
+        if size <= LEGACY_LIMIT:
+            legacy_ms = f"{time_call(legacy_update_html_paths, html, downloaded_files, BASE_URL, 'pages'):.2f}"
+        else:
+            legacy_ms = "skipped"
+        print(f"{size:>12} {new_ms:>18.2f} {legacy_ms:>14}")
+
+
+if __name__ == "__main__":
+    main()
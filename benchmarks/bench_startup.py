@@ -0,0 +1,55 @@
+"""
+Cold import time of the entry points, measured in fresh interpreters.
+
+    python benchmarks/bench_startup.py [runs]
+
+The GUI itself logs "Window ready in ...ms" and "Chrome check took ...ms" on every launch;
+this script tracks the import part without needing a display.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["sigma", "crawler", "cli"]
+HEAVY = ["selenium", "webdriver_manager", "bs4", "requests"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(f"{{elapsed:.1f}} {{','.join(loaded) or '-'}}")
+"""
+
+
+def measure(module, runs):
+    times = []
+    loaded = '-'
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        times.append(float(output[0]))
+        loaded = output[1]
+    return statistics.median(times), loaded
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"Median of {runs} fresh interpreters")
+    print(f"{'module':<10} {'import (ms)':>12}  heavy modules loaded")
+    for module in MODULES:
+        try:
+            ms, loaded = measure(module, runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<10} {'failed':>12}  {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:<10} {ms:>12.1f}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
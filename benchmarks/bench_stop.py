@@ -0,0 +1,142 @@
+"""
+Stop latency: crawls a site whose responses hang in the places a Stop used to wait on
+(headers that never come, a body trickling in, a 503 with a long Retry-After, a long
+Crawl-delay), presses stop() once the crawl is stuck there and measures how long run()
+takes to return. Also checks that page_timeout / crawl_timeout end such waits on their own.
+
+    python benchmarks/bench_stop.py [--stuck 2] [--hang 40]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+
+class HangingSite(BaseHTTPRequestHandler):
+    """
+    /stall-page.html      no headers for `hang` seconds
+    /trickle-page.html    headers, then one byte every 0.5s
+    /busy-page.html       503 + Retry-After: hang
+    /slow-asset.html      a page whose image trickles
+    /delay/*              robots.txt asks for a Crawl-delay of hang seconds
+    """
+    hang = 40
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        try:
+            if path == '/robots.txt':
+                self.reply(f"User-agent: *\nCrawl-delay: {self.hang}\n".encode(), 'text/plain')
+            elif path == '/stall-page.html':
+                time.sleep(self.hang)
+                self.reply(b"<html></html>")
+            elif path in ('/trickle-page.html', '/trickle.png'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html' if path.endswith('.html') else 'image/png')
+                self.send_header('Content-Length', '100000')
+                self.end_headers()
+                for _ in range(int(self.hang * 2)):
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                    time.sleep(0.5)
+            elif path == '/busy-page.html':
+                self.send_response(503)
+                self.send_header('Retry-After', str(int(self.hang)))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            elif path == '/slow-asset.html':
+                self.reply(b'<html><body><img src="/trickle.png"></body></html>')
+            elif path.startswith('/delay/'):
+                n = int(path.rsplit('/', 1)[-1].split('.')[0] or 0)
+                self.reply(f'<html><body><a href="/delay/{n + 1}.html">next</a></body></html>'.encode())
+            else:
+                self.reply(b"", status=404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def reply(self, body, content_type='text/html', status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# name -> (start path, extra options, whether page_timeout covers the wait)
+SCENARIOS = {
+    'stalled headers': ('/stall-page.html', {}, True),
+    'trickling page': ('/trickle-page.html', {}, True),
+    'trickling asset': ('/slow-asset.html', {}, True),
+    'retry-after': ('/busy-page.html', {}, True),
+    # Politeness comes before the page's budget starts
+    'crawl-delay': ('/delay/0.html', {'respect_robots': True, 'max_pages': 5}, False),
+}
+
+
+def crawl(url, out_dir, overrides, stop_after=None):
+    """Seconds from stop() (or from the start, without stop_after) until run() returned"""
+    from crawler import SiteCrawler, CrawlOptions
+    options = {
+        'max_pages': 1, 'page_workers': 2, 'download_threads': 2, 'politeness_delay': 0,
+        'organize_netlify': False, 'use_sitemaps': False, 'respect_robots': False,
+        'output_root': out_dir, 'retries': 3, **overrides,
+    }
+    crawler = SiteCrawler(url, CrawlOptions(**options))
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(crawler.run()), daemon=True)
+    started = time.perf_counter()
+    worker.start()
+    if stop_after is not None:
+        time.sleep(stop_after)
+        started = time.perf_counter()
+        crawler.stop()
+    worker.join(timeout=120)
+    seconds = time.perf_counter() - started
+    return seconds if not worker.is_alive() else None, result.get('status')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stuck', type=float, default=2.0, help="Seconds into the crawl when Stop is pressed")
+    parser.add_argument('--hang', type=float, default=40.0, help="How long the site keeps each request hanging")
+    parser.add_argument('--budget', type=float, default=3.0, help="page_timeout / crawl_timeout for the budget runs")
+    args = parser.parse_args()
+
+    handler = type('Site', (HangingSite,), {'hang': args.hang})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"Stop pressed {args.stuck:g}s in, the site hangs for {args.hang:g}s")
+    print(f"{'scenario':<17} {'stop -> run() returned':>23} {'page_timeout':>13} {'crawl_timeout':>14}")
+    try:
+        for name, (path, overrides, page_budget) in SCENARIOS.items():
+            with tempfile.TemporaryDirectory(prefix="bench_stop_") as out_dir:
+                stopped, _ = crawl(base + path, out_dir, overrides, stop_after=args.stuck)
+                page = crawl(base + path, out_dir, {**overrides, 'page_timeout': args.budget})[0] if page_budget else '-'
+                whole, _ = crawl(base + path, out_dir, {**overrides, 'crawl_timeout': args.budget})
+            cells = [value if value == '-' else f"{value:.2f}s" if value is not None else "hung"
+                     for value in (stopped, page, whole)]
+            print(f"{name:<17} {cells[0]:>23} {cells[1]:>13} {cells[2]:>14}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
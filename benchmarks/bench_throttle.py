@@ -0,0 +1,82 @@
+"""
+Crawl a synthetic site served by a throttling origin (429 + Retry-After above a request
+rate / concurrency, random 503s) and compare how much of the site each retry / concurrency
+mode mirrors, how many requests it spends and how long it takes.
+
+    python benchmarks/bench_throttle.py [--pages 30] [--rate 40] [--concurrent 3] [--error-rate 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+from synthetic_site import Throttle, generate_site, serve
+
+MODES = {
+    'no-retry': {'retries': 0, 'adaptive_concurrency': False},
+    'retry': {'retries': 4, 'adaptive_concurrency': False},
+    'adaptive': {'retries': 4, 'adaptive_concurrency': True},
+}
+
+
+def run_mode(site_dir, out_dir, info, args, overrides):
+    from crawler import SiteCrawler, CrawlOptions
+    throttle = Throttle(args.rate, args.concurrent, args.error_rate, retry_after=args.retry_after)
+    server, url = serve(site_dir, throttle=throttle)
+    options = CrawlOptions(
+        max_pages=info['pages'], page_workers=args.page_workers, download_threads=args.download_threads,
+        per_host_limit=args.per_host, politeness_delay=0, organize_netlify=False, output_root=out_dir,
+        respect_robots=False, use_sitemaps=False, **overrides
+    )
+    crawler = SiteCrawler(url, options)
+    started = time.perf_counter()
+    try:
+        summary = crawler.run()
+    finally:
+        server.shutdown()
+    seconds = time.perf_counter() - started
+    return {
+        'seconds': round(seconds, 2),
+        'pages': summary['pages'],
+        'assets': summary['assets'],
+        'retries': summary.get('retries', 0),
+        'errors': summary.get('errors', 0),
+        'limits': crawler.scheduler.limits(),
+        **throttle.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=30)
+    parser.add_argument('--rate', type=int, default=40, help="Origin answers 429 above this many requests/s")
+    parser.add_argument('--concurrent', type=int, default=3, help="Origin answers 429 above this many requests in flight")
+    parser.add_argument('--error-rate', type=float, default=0.05, help="Share of requests answered with 503")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--page-workers', type=int, default=4)
+    parser.add_argument('--download-threads', type=int, default=8)
+    parser.add_argument('--per-host', type=int, default=8)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_site_") as site_dir:
+        info = generate_site(site_dir, pages=args.pages, fanout=4, images=4, css=1, js=1, fonts=1, media=0, image_kb=8)
+        print(f"Site: {info['pages']} pages, {info['asset_files']} asset files; origin: {args.rate} req/s, "
+              f"{args.concurrent} in flight, {args.error_rate:.0%} 503s")
+        print(f"{'mode':<10} {'seconds':>8} {'pages':>6} {'assets':>7} {'requests':>9} {'429':>6} {'503':>5} "
+              f"{'retries':>8} {'peak':>5}  limits")
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory(prefix="bench_out_") as out_dir:
+                result = run_mode(site_dir, out_dir, info, args, MODES[mode])
+            limits = ", ".join(f"{limit}" for limit in result['limits'].values())
+            print(f"{mode:<10} {result['seconds']:>8} {result['pages']:>6} {result['assets']:>7} {result['requests']:>9} "
+                  f"{result['throttled']:>6} {result['errors']:>5} {result['retries']:>8} {result['peak_in_flight']:>5}  {limits}")
+
+
+if __name__ == "__main__":
+    main()
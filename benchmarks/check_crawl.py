@@ -0,0 +1,228 @@
+"""
+Offline regression checks for crawl bookkeeping that only goes wrong in a real crawl
+(slots that are never handed back, budgets that end a crawl early). Each check writes a
+small site, serves it on 127.0.0.1, crawls it with the crawler core and asserts on the
+result. Exits non-zero when a check fails.
+
+    python benchmarks/check_crawl.py [name ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+from synthetic_site import serve
+
+CHECKS = {}
+
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+
+def write_site(root, pages):
+    """pages: {path: html}. Anything else (sitemap.xml, robots.txt) answers 404"""
+    for path, html in pages.items():
+        target = os.path.join(root, path.lstrip('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+
+def page(*links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><p>page</p>{anchors}</body></html>"
+
+
+def crawl(url, out_dir, **overrides):
+    """Runs a crawl, returns (crawler, summary)"""
+    from crawler import SiteCrawler, CrawlOptions
+    options = {
+        'max_pages': 10, 'page_workers': 2, 'download_threads': 2, 'politeness_delay': 0,
+        'organize_netlify': False, 'respect_robots': False, 'parse_processes': 0,
+        'output_root': out_dir, 'crawl_timeout': 20, **overrides,
+    }
+    crawler = SiteCrawler(url, CrawlOptions(**options))
+    return crawler, crawler.run()
+
+
+@check
+def sitemap_404_releases_host_slot(site, out_dir):
+    """A 404 /sitemap.xml must hand its scheduler slot back, even with one slot per host"""
+    write_site(site, {'/index.html': page('/a.html', '/b.html'), '/a.html': page(), '/b.html': page()})
+    server, url = serve(site)
+    try:
+        started = time.perf_counter()
+        crawler, summary = crawl(url + "index.html", out_dir, per_host_limit=1, use_sitemaps=True)
+        seconds = time.perf_counter() - started
+    finally:
+        server.shutdown()
+    in_flight = {host.name: host.in_flight for host in crawler.scheduler.hosts.values()}
+    assert summary['status'] == 'complete', summary
+    assert summary['pages'] == 3, summary
+    assert not any(in_flight.values()), in_flight
+    assert seconds < 10, f"took {seconds:.1f}s"
+
+
+@check
+def unreachable_pages_free_budget(site, out_dir):
+    """Pages skipped as 404 after they were claimed give their slot to the next queued link"""
+    bad = [f'/bad{n}.html' for n in range(6)]
+    good = [f'/good{n}.html' for n in range(10)]
+    write_site(site, {'/index.html': page(*bad, *good), **{path: page() for path in good}})
+    server, url = serve(site)
+    try:
+        crawler, summary = crawl(url + "index.html", out_dir, max_pages=6, use_sitemaps=False)
+    finally:
+        server.shutdown()
+    assert summary['status'] == 'complete', summary
+    assert summary['pages'] == 6, summary
+
+
+@check
+def complete_crawl_leaves_no_checkpoint(site, out_dir):
+    """The resume state is only kept for crawls that didn't finish, it isn't part of the mirror"""
+    from checkpoint import STATE_FILE
+    write_site(site, {'/index.html': page('/a.html'), '/a.html': page()})
+    server, url = serve(site)
+    try:
+        crawler, summary = crawl(url + "index.html", out_dir, use_sitemaps=False)
+    finally:
+        server.shutdown()
+    assert summary['status'] == 'complete', summary
+    left = [name for name in os.listdir(summary['output_dir']) if name.startswith(STATE_FILE)]
+    assert not left, left
+
+
+def mirrored(summary, url):
+    """Bytes the mirror holds for url, found through manifest.json"""
+    from asset_store import MANIFEST_NAME
+    with open(os.path.join(summary['output_dir'], MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(os.path.join(summary['output_dir'], manifest[url]['path']), 'rb') as f:
+        return f.read()
+
+
+@check
+def incremental_change_keeps_linked_duplicate(site, out_dir):
+    """Two identical assets are stored once; when one changes, the other keeps its own bytes"""
+    old, new = b"\x89PNG same bytes" * 64, b"\x89PNG changed" * 64
+    write_site(site, {'/index.html': '<html><body><img src="/a.png"><img src="/b.png"></body></html>'})
+    for name in ('a.png', 'b.png'):
+        with open(os.path.join(site, name), 'wb') as f:
+            f.write(old)
+    server, url = serve(site)
+    # One download thread: a.png is recorded before b.png, the order that used to link b.png to the new a.png
+    options = {'incremental': True, 'use_sitemaps': False, 'download_threads': 1,
+               'cache_dir': os.path.join(out_dir, 'cache')}
+    try:
+        crawl(url + "index.html", out_dir, **options)
+        with open(os.path.join(site, 'a.png'), 'wb') as f:
+            f.write(new)
+        # Last-Modified has one-second resolution, the change must not look like a 304
+        later = time.time() + 60
+        os.utime(os.path.join(site, 'a.png'), (later, later))
+        crawler, summary = crawl(url + "index.html", out_dir, **options)
+    finally:
+        server.shutdown()
+    assert summary['status'] == 'complete', summary
+    assert mirrored(summary, url + "a.png") == new
+    assert mirrored(summary, url + "b.png") == old
+
+
+@check
+def incremental_revalidates_stylesheet_targets(site, out_dir):
+    """A stylesheet answered 304 (already rewritten on disk) still has its fonts, images and imports revalidated"""
+    write_site(site, {
+        '/index.html': '<html><head><link rel="stylesheet" href="/css/site.css"></head><body></body></html>',
+        '/css/site.css': '@import "more.css";\n@font-face { src: url(../fonts/f0.woff2); }\n',
+        '/css/more.css': 'body { background: url("/img/bg.png"); }\n',
+        '/fonts/f0.woff2': 'font v1',
+        '/img/bg.png': 'png v1',
+    })
+    server, url = serve(site)
+    options = {'incremental': True, 'use_sitemaps': False, 'cache_dir': os.path.join(out_dir, 'cache')}
+    try:
+        _, first = crawl(url + "index.html", out_dir, **options)
+        font = os.path.join(site, 'fonts', 'f0.woff2')
+        with open(font, 'w', encoding='utf-8') as f:
+            f.write('font v2')
+        later = time.time() + 60
+        os.utime(font, (later, later))
+        crawler, summary = crawl(url + "index.html", out_dir, **options)
+    finally:
+        server.shutdown()
+    assert summary['status'] == 'complete', summary
+    assert summary['assets'] == first['assets'] == 4, (first['assets'], summary['assets'])
+    assert mirrored(summary, url + "fonts/f0.woff2") == b'font v2'
+
+
+@check
+def resume_ignores_other_sites(site, out_dir):
+    """Resuming example.com never picks up a newer scraped_example_com_au_* checkpoint"""
+    from pathlib import Path
+    from checkpoint import CrawlCheckpoint
+    from crawler import SiteCrawler, CrawlOptions
+    root = Path(out_dir)
+    for name, start_url in (('scraped_example_com_1700000000', "https://example.com/"),
+                            ('scraped_example_com_au_1700000100', "https://example.com.au/"),
+                            ('scraped_example_com_1700000200_2', "https://www.example.com.au/")):
+        (root / name).mkdir()
+        checkpoint = CrawlCheckpoint(root / name)
+        checkpoint.set_meta('start_url', start_url)
+        checkpoint.close()
+        time.sleep(0.05)  # Newest last
+    crawler = SiteCrawler("https://example.com/", CrawlOptions(output_root=out_dir, resume=True))
+    found = crawler.find_resumable_dir(root, "example.com")
+    assert found is not None and found.name == 'scraped_example_com_1700000000', found
+
+
+@check
+def sitemap_skips_disallowed_before_limit(site, out_dir):
+    """Newer sitemap entries under a robots.txt Disallow don't push the allowed pages out of the limit"""
+    private = [(f"/private/p{n}.html", f"2024-01-{n + 10:02d}") for n in range(10)]
+    public = [(f"/public/p{n}.html", "2020-01-01") for n in range(3)]
+    entries = "".join(f"<url><loc>{{base}}{path}</loc><lastmod>{lastmod}</lastmod></url>"
+                      for path, lastmod in private + public)
+    write_site(site, {
+        '/index.html': page(),
+        '/robots.txt': "User-agent: *\nDisallow: /private/\n",
+        **{path: page() for path, _ in private + public},
+    })
+    server, url = serve(site)
+    with open(os.path.join(site, 'sitemap.xml'), 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                + entries.format(base=url.rstrip('/')) + '</urlset>')
+    try:
+        crawler, summary = crawl(url + "index.html", out_dir, max_pages=3, use_sitemaps=True, respect_robots=True)
+    finally:
+        server.shutdown()
+    assert summary['status'] == 'complete', summary
+    assert summary['pages'] == 3, summary
+
+
+def main():
+    names = sys.argv[1:] or list(CHECKS)
+    failed = 0
+    for name in names:
+        with tempfile.TemporaryDirectory(prefix="check_site_") as site, \
+                tempfile.TemporaryDirectory(prefix="check_out_") as out_dir:
+            try:
+                CHECKS[name](site, out_dir)
+                print(f"ok    {name}")
+            except Exception:
+                failed += 1
+                print(f"FAIL  {name}")
+                traceback.print_exc()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
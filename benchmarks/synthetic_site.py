@@ -0,0 +1,214 @@
+"""
+Synthetic sites for offline benchmarks: a generator writing pages, stylesheets, scripts,
+fonts, images and large media files into a folder, and a local threaded HTTP server for it.
+The server can inject throttling (429 + Retry-After) and random 503s, see Throttle.
+
+    python benchmarks/synthetic_site.py OUT_DIR [--pages 200] [--serve] [--rate 20 --concurrent 4]
+"""
+import argparse
+import functools
+import os
+import random
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+SIZES = {
+    'small': dict(pages=50, fanout=5, images=6, css=2, js=2, fonts=2, media=1, media_mb=5),
+    'medium': dict(pages=300, fanout=8, images=10, css=3, js=3, fonts=3, media=4, media_mb=20),
+    'large': dict(pages=2000, fanout=10, images=15, css=4, js=4, fonts=4, media=10, media_mb=50),
+}
+
+
+def write_blob(path, size, rng):
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            chunk = min(remaining, 1024 * 1024)
+            f.write(rng.randbytes(chunk))
+            remaining -= chunk
+
+
+def generate_site(root, pages=50, fanout=5, images=6, css=2, js=2, fonts=2, media=1, media_mb=5,
+                  image_kb=40, pool_factor=4, seed=1):
+    """
+    Writes the site into root and returns a dict describing it. Assets come from shared
+    pools (pool_factor times the per-page count) so pages reuse each other's files like real
+    sites do. Every page links to the next one, so the whole site is reachable.
+    """
+    rng = random.Random(seed)
+    for folder in ['img', 'css', 'js', 'fonts', 'media']:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    image_pool = [f"/img/i{n}.png" for n in range(max(1, images * pool_factor))]
+    font_pool = [f"/fonts/f{n}.woff2" for n in range(max(1, fonts * pool_factor))]
+    css_pool = [f"/css/s{n}.css" for n in range(max(1, css * pool_factor))]
+    js_pool = [f"/js/a{n}.js" for n in range(max(1, js * pool_factor))]
+    media_pool = [f"/media/m{n}.mp4" for n in range(media)]
+
+    total = 0
+    for path in image_pool:
+        size = rng.randint(image_kb * 512, image_kb * 1536)
+        write_blob(os.path.join(root, path.lstrip('/')), size, rng)
+        total += size
+    for path in font_pool:
+        write_blob(os.path.join(root, path.lstrip('/')), 30 * 1024, rng)
+        total += 30 * 1024
+    for path in media_pool:
+        write_blob(os.path.join(root, path.lstrip('/')), media_mb * 1024 * 1024, rng)
+        total += media_mb * 1024 * 1024
+    for n, path in enumerate(css_pool):
+        body = [f'@font-face {{ font-family: f{n}; src: url("{font}"); }}' for font in rng.sample(font_pool, min(fonts, len(font_pool)))]
+        body += [f'.bg{n}-{k} {{ background: url({img}); }}' for k, img in enumerate(rng.sample(image_pool, min(2, len(image_pool))))]
+        body.append("body { margin: 0; font: 14px sans-serif; }\n" * 20)
+        with open(os.path.join(root, path.lstrip('/')), 'w', encoding='utf-8') as f:
+            f.write("\n".join(body))
+    for n, path in enumerate(js_pool):
+        with open(os.path.join(root, path.lstrip('/')), 'w', encoding='utf-8') as f:
+            f.write(f"function f{n}(x) {{ return x * {n}; }}\n" * 200)
+
+    for page in range(pages):
+        links = {(page + 1) % pages} | {rng.randrange(pages) for _ in range(fanout)}
+        head = [f'<link rel="stylesheet" href="{href}">' for href in rng.sample(css_pool, min(css, len(css_pool)))]
+        head += [f'<script src="{src}"></script>' for src in rng.sample(js_pool, min(js, len(js_pool)))]
+        body = [f'<a href="{page_path(target)}">Page {target}</a>' for target in sorted(links)]
+        body += [f'<img src="{src}" alt="">' for src in rng.sample(image_pool, min(images, len(image_pool)))]
+        if media_pool and page % max(1, pages // max(1, media)) == 0:
+            body.append(f'<video src="{rng.choice(media_pool)}"></video>')
+        body.append("<p>" + "Lorem ipsum dolor sit amet. " * 60 + "</p>")
+        html = f"<html><head><title>Page {page}</title>{''.join(head)}</head><body>{''.join(body)}</body></html>"
+        filename = "index.html" if page == 0 else f"p{page}.html"
+        with open(os.path.join(root, filename), 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    return {
+        'pages': pages, 'fanout': fanout, 'images': images, 'css': css, 'js': js, 'fonts': fonts,
+        'media': media, 'media_mb': media_mb, 'asset_files': len(image_pool) + len(font_pool) + len(css_pool) + len(js_pool) + len(media_pool),
+        'asset_bytes': total, 'seed': seed,
+    }
+
+
+def page_path(page):
+    return "/" if page == 0 else f"/p{page}.html"
+
+
+class Throttle:
+    """
+    Misbehaving origin: answers 429 with Retry-After once more than `concurrent` requests
+    are in flight or more than `rate` arrived within the current second, and 503 for a
+    random error_rate share of the rest.
+    """
+
+    def __init__(self, rate=None, concurrent=None, error_rate=0.0, retry_after=1, seed=1):
+        self.rate = rate
+        self.concurrent = concurrent
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.window = 0
+        self.window_count = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.peak_in_flight = 0
+
+    def admit(self):
+        """None when the request may be served, else the status to answer with"""
+        with self.lock:
+            self.requests += 1
+            second = int(time.monotonic())
+            if second != self.window:
+                self.window = second
+                self.window_count = 0
+            self.window_count += 1
+            if (self.concurrent and self.in_flight >= self.concurrent) or (self.rate and self.window_count > self.rate):
+                self.throttled += 1
+                return 429
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return 503
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return None
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'throttled': self.throttled, 'errors': self.errors,
+                    'peak_in_flight': self.peak_in_flight}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    throttle = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.throttled(super().do_GET)
+
+    def do_HEAD(self):
+        self.throttled(super().do_HEAD)
+
+    def throttled(self, serve_request):
+        throttle = self.throttle
+        if throttle is None:
+            serve_request()
+            return
+        status = throttle.admit()
+        if status:
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', str(throttle.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        try:
+            serve_request()
+        finally:
+            throttle.done()
+
+
+def serve(root, port=0, throttle=None):
+    """Serve root on 127.0.0.1 in a background thread. Returns (server, base_url)"""
+    handler = functools.partial(type('Handler', (QuietHandler,), {'throttle': throttle}), directory=root)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--pages', type=int)
+    parser.add_argument('--serve', action='store_true', help="Keep serving the site until Ctrl+C")
+    parser.add_argument('--rate', type=int, help="Answer 429 above this many requests per second")
+    parser.add_argument('--concurrent', type=int, help="Answer 429 above this many requests in flight")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+    config = dict(SIZES[args.size])
+    if args.pages:
+        config['pages'] = args.pages
+    info = generate_site(args.out_dir, **config)
+    print(f"Generated {info['pages']} pages, {info['asset_files']} assets ({info['asset_bytes'] / 1024 / 1024:.1f} MB) in {args.out_dir}")
+    if args.serve:
+        throttle = None
+        if args.rate or args.concurrent or args.error_rate:
+            throttle = Throttle(args.rate, args.concurrent, args.error_rate)
+        server, url = serve(args.out_dir, throttle=throttle)
+        print(f"Serving on {url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from cancel import Cancelled
+
+# selenium and webdriver_manager are imported inside the methods that need them, so
+# importing this module (and starting the GUI) stays cheap until a browser is really used
+
+# Number of resource entries the page has loaded so far, used to detect network idle
+RESOURCE_COUNT_JS = "return window.performance.getEntriesByType('resource').length;"
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chrome instances shared across pages. Browsers are started lazily
+    up to size and handed out one per render, so up to size pages can render in parallel.
+    """
+
+    def __init__(self, size=2, wait_selector=None, ready_timeout=15, idle_time=0.5, driver_path=None):
+        self.size = max(1, int(size))
+        self.wait_selector = wait_selector
+        self.ready_timeout = ready_timeout
+        self.idle_time = idle_time
+        self.driver_path = driver_path
+        # Called when a browser fails to start, e.g. to drop a cached detection result
+        self.on_start_failure = None
+        self.idle = queue.LifoQueue()
+        self.drivers = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def resolve_driver(self):
+        """Resolve the chromedriver binary once for the lifetime of the pool"""
+        with self.lock:
+            if self.driver_path is None:
+                from webdriver_manager.chrome import ChromeDriverManager
+                self.driver_path = ChromeDriverManager().install()
+            return self.driver_path
+
+    def build_options(self):
+        from selenium.webdriver.chrome.options import Options
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
+        options.add_experimental_option('useAutomationExtension', False)
+        options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        return options
+
+    @property
+    def load_timeout(self):
+        return max(30, self.ready_timeout * 2)
+
+    def start_browser(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        driver = webdriver.Chrome(service=Service(self.resolve_driver()), options=self.build_options())
+        driver.set_page_load_timeout(self.load_timeout)
+        return driver
+
+    def warm(self):
+        """Start one browser and park it in the pool. Raises if Chrome can't be started"""
+        driver = self.acquire()
+        self.release(driver)
+
+    def acquire(self, cancel=None):
+        while True:
+            if cancel is not None:
+                cancel.check()
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("Browser pool is closed")
+                can_start = len(self.drivers) < self.size
+                if can_start:
+                    # Reserve the slot before the (slow) launch so other threads don't overshoot
+                    self.drivers.append(None)
+            if can_start:
+                break
+
+            # Every browser is busy, wait for one to come back (or for a broken one to free its slot)
+            try:
+                return self.idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+        try:
+            driver = self.start_browser()
+        except Exception:
+            with self.lock:
+                self.drivers.remove(None)
+            if self.on_start_failure:
+                self.on_start_failure()
+            raise
+        with self.lock:
+            self.drivers[self.drivers.index(None)] = driver
+        return driver
+
+    def release(self, driver, broken=False):
+        with self.lock:
+            if driver not in self.drivers:
+                return  # Interrupted, it is being quit already
+        if broken or self.closed:
+            self.discard(driver)
+        else:
+            self.idle.put(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def render(self, url, cancel=None):
+        """
+        Load url in a pooled browser and return the rendered HTML once the page is ready.
+        cancel (cancel.CancelToken): its deadline caps the load and the waits, and cancelling
+        it quits the browser mid-load; the render then fails and the browser is replaced.
+        """
+        driver = self.acquire(cancel)
+        broken = False
+        try:
+            with cancel.hook(lambda: self.interrupt(driver)) if cancel is not None else nullcontext():
+                if cancel is not None:
+                    driver.set_page_load_timeout(cancel.timeout(self.load_timeout))
+                driver.get(url)
+                self.wait_ready(driver, cancel)
+
+                # Trigger lazy loaded content, then wait for the requests it caused to settle
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                self.wait_network_idle(driver, cancel)
+                driver.execute_script("window.scrollTo(0, 0);")
+
+                return driver.page_source
+        except Cancelled:
+            raise
+        except Exception:
+            broken = True
+            if cancel is not None:
+                cancel.check()
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def interrupt(self, driver):
+        """Take a browser out of the pool in the middle of a render and quit it in the background"""
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+        threading.Thread(target=self.discard, args=(driver,), daemon=True).start()
+
+    def wait_ready(self, driver, cancel=None):
+        """Best effort: a page that never matches is still returned as rendered so far"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        def loaded(d):
+            if cancel is not None:
+                cancel.check()
+            return d.execute_script("return document.readyState") == "complete"
+
+        timeout = cancel.timeout(self.ready_timeout) if cancel is not None else self.ready_timeout
+        wait = WebDriverWait(driver, timeout, poll_frequency=0.1)
+        try:
+            wait.until(loaded)
+            if self.wait_selector:
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.wait_selector)))
+        except TimeoutException:
+            pass
+
+    def wait_network_idle(self, driver, cancel=None):
+        """Returns once no new resources were requested for idle_time seconds (or on timeout)"""
+        deadline = time.monotonic() + self.ready_timeout
+        last_count = driver.execute_script(RESOURCE_COUNT_JS)
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            if cancel is not None:
+                cancel.wait(0.1)
+            else:
+                time.sleep(0.1)
+            count = driver.execute_script(RESOURCE_COUNT_JS)
+            if count != last_count:
+                last_count = count
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= self.idle_time:
+                return
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            drivers = [d for d in self.drivers if d is not None]
+            self.drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,112 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Cancelled(Exception):
+    """The crawl was stopped, or the time budget of the work ran out"""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation passed into every fetch. The crawl owns one root token and
+    stop() cancels it; child(seconds) gives a piece of work (one page) its own deadline on
+    top. Blocking calls check() between chunks, cap their timeouts with timeout(), sleep
+    with wait(), and what can't be checked from inside (a socket read, a browser load)
+    registers a hook() that breaks it from the cancelling thread.
+    """
+
+    def __init__(self, parent=None, seconds=None):
+        self.root = parent.root if parent else self
+        self.event = parent.event if parent else threading.Event()
+        self.deadline = parent.deadline if parent else None
+        self.seconds = seconds
+        if seconds:
+            deadline = time.monotonic() + seconds
+            self.deadline = deadline if self.deadline is None else min(self.deadline, deadline)
+        if parent is None:
+            self.reason = None
+            self.hooks = []
+            self.lock = threading.Lock()
+
+    def child(self, seconds=None):
+        return CancelToken(self, seconds)
+
+    def cancel(self, reason="stopped"):
+        """Cancels the root and everything derived from it, runs the hooks once"""
+        root = self.root
+        with root.lock:
+            if root.event.is_set():
+                return
+            root.reason = reason
+            root.event.set()
+            hooks, root.hooks = root.hooks, []
+        for callback in hooks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        return self.event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def check(self):
+        """Raises Cancelled once the crawl is stopped or the deadline has passed"""
+        if self.event.is_set():
+            raise Cancelled(self.root.reason)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise Cancelled(f"time budget of {self.seconds:g}s exceeded" if self.seconds else "time budget exceeded")
+
+    def remaining(self):
+        """Seconds to the deadline, None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, timeout):
+        """timeout (seconds or requests' (connect, read) pair) cut down to the time left"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        remaining = max(0.01, remaining)
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+    def wait(self, seconds):
+        """Interruptible sleep, raises Cancelled instead of sleeping past a stop or the deadline"""
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self.event.wait(remaining)
+            self.check()
+        if self.event.wait(seconds):
+            self.check()
+
+    @contextmanager
+    def hook(self, callback):
+        """with token.hook(fn): ... calls fn from cancel() if the crawl is stopped meanwhile"""
+        root = self.root
+        with root.lock:
+            cancelled = root.event.is_set()
+            if not cancelled:
+                root.hooks.append(callback)
+        if cancelled:
+            callback()
+        try:
+            yield
+        finally:
+            with root.lock:
+                if callback in root.hooks:
+                    root.hooks.remove(callback)
+
+    def on_cancel(self, callback):
+        """Like hook(), for the token's whole lifetime"""
+        root = self.root
+        with root.lock:
+            if not root.event.is_set():
+                root.hooks.append(callback)
+                return
+        callback()
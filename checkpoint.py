@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+import time
+
+STATE_FILE = "crawl_state.sqlite"
+
+# Page states
+QUEUED = 0
+DONE = 1
+
+
+class CrawlCheckpoint:
+    """
+    Crawl state kept in a SQLite file next to the mirror: the frontier, pages already saved
+    and the URL -> local path asset map. Writes are buffered and committed in batches
+    (every flush_every records or flush_interval seconds), so checkpointing costs a few
+    inserts per page rather than a transaction each.
+    A stopped or crashed crawl is resumed from load(); a complete one removes the file, it
+    would otherwise be published along with the mirror.
+    """
+
+    def __init__(self, output_dir, flush_every=500, flush_interval=2.0):
+        self.path = output_dir / STATE_FILE
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending_pages = []  # (url, state, number)
+        self.pending_assets = []  # (key, path)
+        self.last_flush = time.monotonic()
+        self.commits = 0
+        self.write_seconds = 0.0
+
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, state INTEGER NOT NULL, number INTEGER);
+            CREATE TABLE IF NOT EXISTS assets (key TEXT PRIMARY KEY, path TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.db.commit()
+
+    def reset(self):
+        """Forget a previous run (fresh crawl into a reused folder)"""
+        with self.lock:
+            self.pending_pages.clear()
+            self.pending_assets.clear()
+            self.db.executescript("DELETE FROM pages; DELETE FROM assets; DELETE FROM meta;")
+            self.db.commit()
+
+    def load(self):
+        """Returns (queued urls in discovery order, {saved url: page number}, {asset key: path})"""
+        with self.lock:
+            queued = [row[0] for row in self.db.execute("SELECT url FROM pages WHERE state = ? ORDER BY rowid", (QUEUED,))]
+            done = dict(self.db.execute("SELECT url, number FROM pages WHERE state = ?", (DONE,)))
+            assets = dict(self.db.execute("SELECT key, path FROM assets"))
+        return queued, done, assets
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            self.db.commit()
+
+    def queued(self, url):
+        with self.lock:
+            self.pending_pages.append((url, QUEUED, None))
+            self._maybe_flush()
+
+    def done(self, url, number):
+        with self.lock:
+            self.pending_pages.append((url, DONE, number))
+            self._maybe_flush()
+
+    def asset(self, keys, rel_path):
+        """AssetDownloadPool.on_result hook"""
+        with self.lock:
+            self.pending_assets.extend((key, rel_path) for key in keys)
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self.pending_pages) + len(self.pending_assets) >= self.flush_every
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self._flush()
+
+    def _flush(self):
+        start = time.perf_counter()
+        if self.pending_pages:
+            # A queued record never downgrades a page that is already saved
+            self.db.executemany(
+                "INSERT INTO pages (url, state, number) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state, number = excluded.number "
+                "WHERE excluded.state > pages.state",
+                self.pending_pages
+            )
+            self.pending_pages.clear()
+        if self.pending_assets:
+            self.db.executemany("INSERT OR REPLACE INTO assets (key, path) VALUES (?, ?)", self.pending_assets)
+            self.pending_assets.clear()
+        self.db.commit()
+        self.commits += 1
+        self.last_flush = time.monotonic()
+        self.write_seconds += time.perf_counter() - start
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self, remove=False):
+        with self.lock:
+            self._flush()
+            self.db.close()
+        if remove:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(str(self.path) + suffix)
+                except OSError:
+                    pass
+
+    def summary(self):
+        return f"{self.commits} commits, {self.write_seconds * 1000:.0f}ms spent writing"
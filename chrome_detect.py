@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CACHE_FILE = Path(".scraper_cache") / "chrome_check.json"
+MAX_AGE = 7 * 24 * 3600  # Re-check at least weekly even if nothing visibly changed
+
+
+def chrome_version():
+    """Installed Chrome version, read without starting a browser. None if it can't be found"""
+    try:
+        if sys.platform == 'win32':
+            import winreg
+            for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+                try:
+                    with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                        return winreg.QueryValueEx(key, "version")[0]
+                except OSError:
+                    continue
+            return None
+
+        if sys.platform == 'darwin':
+            import plistlib
+            plist = Path("/Applications/Google Chrome.app/Contents/Info.plist")
+            if plist.exists():
+                with open(plist, 'rb') as f:
+                    return plistlib.load(f).get('CFBundleShortVersionString')
+            return None
+
+        for name in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'):
+            binary = shutil.which(name)
+            if binary:
+                output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=5).stdout
+                return output.strip() or None
+    except Exception:
+        pass
+    return None
+
+
+class ChromeDetection:
+    """
+    Caches the result of the startup Chrome check on disk. The entry is keyed by the
+    installed Chrome version and the chromedriver file's mtime, so a warm start can skip
+    both the driver download and the test browser launch.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = Path(cache_file)
+
+    def load(self):
+        """The cached result if it is still valid for this machine, else None"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - cached.get('checked_at', 0) > MAX_AGE:
+            return None
+        if cached.get('chrome_version') != chrome_version():
+            return None
+        if cached.get('available'):
+            driver_path = cached.get('driver_path')
+            if not driver_path or not os.path.exists(driver_path):
+                return None
+            if os.path.getmtime(driver_path) != cached.get('driver_mtime'):
+                return None
+        return cached
+
+    def save(self, available, driver_path=None):
+        entry = {
+            'available': available,
+            'chrome_version': chrome_version(),
+            'driver_path': driver_path,
+            'driver_mtime': os.path.getmtime(driver_path) if driver_path and os.path.exists(driver_path) else None,
+            'checked_at': time.time(),
+        }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+        except OSError:
+            pass
+
+    def invalidate(self):
+        try:
+            self.cache_file.unlink()
+        except OSError:
+            pass
+
+    def check(self, browser_pool):
+        """
+        Returns (available, from_cache). On a cache hit no browser is started; the pool
+        just gets the known driver path and launches its first browser on first use.
+        """
+        cached = self.load()
+        if cached is not None:
+            if cached['available']:
+                browser_pool.driver_path = cached['driver_path']
+            return cached['available'], True
+
+        try:
+            browser_pool.warm()
+            available = True
+        except Exception:
+            available = False
+        self.save(available, browser_pool.driver_path if available else None)
+        return available, False
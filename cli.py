@@ -0,0 +1,196 @@
+"""
+Headless entry point. Mirrors one or more sites without the GUI and prints one JSON
+summary line per site on stdout (logs go to stderr).
+
+    python cli.py https://example.com --max-pages 50
+    python cli.py --url-file sites.txt --processes 8 --quiet > results.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from crawler import CrawlOptions, crawl_site
+from downloader import DEFAULT_BYTE_LIMITS, MB
+
+
+def read_url_file(path):
+    urls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+    return urls
+
+
+def parse_caps(values, key, limits):
+    """--max-file-mb videos=200 style arguments into the byte_limits dict"""
+    for value in values or []:
+        name, _, mb = value.partition('=')
+        if name not in limits or not mb:
+            raise SystemExit(f"Expected CLASS=MB with CLASS in {', '.join(limits)}, got {value!r}")
+        limits[name][key] = int(float(mb) * MB)
+
+
+def build_parser():
+    defaults = CrawlOptions.DEFAULTS
+    parser = argparse.ArgumentParser(description="Mirror websites without the GUI.")
+    parser.add_argument('urls', nargs='*', help="Site URL(s) to mirror")
+    parser.add_argument('--url-file', help="File with one URL per line (# comments allowed)")
+    parser.add_argument('--processes', type=int, default=1, help="Sites crawled in parallel, one process each")
+    parser.add_argument('--output-root', default=defaults['output_root'], help="Where scraped_* folders are created")
+    parser.add_argument('--max-pages', type=int, default=defaults['max_pages'])
+    parser.add_argument('--single-page', action='store_true', help="Only mirror the start page")
+    parser.add_argument('--page-workers', type=int, default=defaults['page_workers'])
+    parser.add_argument('--download-threads', type=int, default=defaults['download_threads'])
+    parser.add_argument('--parse-processes', type=int, default=defaults['parse_processes'],
+                        help="Worker processes for parsing/rewriting pages per site (default: cores - 1, "
+                             "shared out between sites with --processes; 0 = none)")
+    parser.add_argument('--low-memory', action='store_true',
+                        help="Keep the asset map and frontier on disk with a small in-memory hot set")
+    parser.add_argument('--inflight-mb', type=int, help="Cap on page bodies held in memory at once")
+    parser.add_argument('--pipeline-depth', type=int, default=defaults['pipeline_depth'],
+                        help="Pages queued in front of each pipeline stage")
+    parser.add_argument('--per-host', type=int, default=defaults['per_host_limit'], help="Max concurrent requests per host")
+    parser.add_argument('--host-rate', type=float, default=defaults['host_rate'], help="Max requests per second per host")
+    parser.add_argument('--retries', type=int, default=defaults['retries'], help="Retries of throttled / failed requests")
+    parser.add_argument('--fixed-concurrency', action='store_true', help="Don't adapt per-host concurrency to errors and latency")
+    parser.add_argument('--url-index', choices=['exact', 'bloom'], default=defaults['url_index'],
+                        help="Seen-set for discovered links (bloom: fixed memory, tiny chance of skipping a page)")
+    parser.add_argument('--ignore-robots', action='store_true', help="Don't apply robots.txt Disallow / Crawl-delay")
+    parser.add_argument('--no-sitemaps', action='store_true', help="Don't seed the crawl from sitemap.xml")
+    parser.add_argument('--delay', type=float, default=defaults['politeness_delay'], help="Seconds between page fetches to one host")
+    parser.add_argument('--page-timeout', type=float, default=defaults['page_timeout'],
+                        help="Seconds one page may take (fetch/render + waiting for its assets)")
+    parser.add_argument('--crawl-timeout', type=float, default=defaults['crawl_timeout'],
+                        help="Stop the crawl after this many seconds, keeping what was mirrored")
+    parser.add_argument('--incremental', action='store_true', help="Update scraped_<domain> in place using the HTTP cache")
+    parser.add_argument('--resume', action='store_true', help="Continue the last stopped or crashed crawl of each site")
+    parser.add_argument('--cache-dir', default=defaults['cache_dir'])
+    parser.add_argument('--no-dedup', action='store_true', help="Keep a separate copy of identical asset bodies")
+    parser.add_argument('--archive', choices=['warc', 'warc.gz', 'zip', 'zip-deflated'],
+                        help="Also write the crawl into one archive next to the output folder")
+    parser.add_argument('--optimize', action='store_true',
+                        help="Minify HTML/CSS/JS, add .gz/.br sidecars and cache headers for hashed assets")
+    parser.add_argument('--compress-min-bytes', type=int, default=defaults['compress_min_bytes'],
+                        help="Smallest file --optimize writes .gz/.br sidecars for")
+    parser.add_argument('--no-netlify', action='store_true', help="Don't write netlify.toml")
+    for resource in ['images', 'videos', 'audio', 'css', 'js', 'fonts']:
+        parser.add_argument(f'--no-{resource}', action='store_true', help=f"Skip {resource}")
+    parser.add_argument('--srcset', choices=['largest', 'smallest', 'nearest', 'off'], default=defaults['srcset'],
+                        help="Which srcset / <picture> candidate to mirror (off = leave srcsets pointing at the site)")
+    parser.add_argument('--srcset-width', type=int, default=defaults['srcset_width'],
+                        help="Display width in CSS pixels that --srcset nearest picks for")
+    parser.add_argument('--srcset-dpr', type=float, default=defaults['srcset_dpr'],
+                        help="Device pixel ratio that --srcset nearest picks for")
+    parser.add_argument('--max-file-mb', action='append', metavar='CLASS=MB', help="Per-file cap for a resource class")
+    parser.add_argument('--max-total-mb', action='append', metavar='CLASS=MB', help="Per-crawl cap for a resource class")
+    parser.add_argument('--parser', default=defaults['parser'], help="BeautifulSoup backend: auto, lxml, html.parser, html5lib")
+    parser.add_argument('--selenium', action='store_true', help="Render pages in headless Chrome")
+    parser.add_argument('--browsers', type=int, default=defaults['browser_count'])
+    parser.add_argument('--wait-selector', help="CSS selector a page must contain before it counts as rendered")
+    parser.add_argument('--log-file', action='store_true', help="Write the full log to crawl.log in each output folder")
+    parser.add_argument('--metrics', action='store_true', help="Write metrics.json and metrics.prom to each output folder")
+    parser.add_argument('--profile', action='store_true', help="cProfile the crawl stages (profile.txt / profile.pstats)")
+    parser.add_argument('--quiet', action='store_true', help="Only print the JSON summaries")
+    return parser
+
+
+def options_from_args(args):
+    byte_limits = {name: dict(cap) for name, cap in DEFAULT_BYTE_LIMITS.items()}
+    parse_caps(args.max_file_mb, 'per_file', byte_limits)
+    parse_caps(args.max_total_mb, 'total', byte_limits)
+    return {
+        'max_pages': args.max_pages,
+        'crawl_subpages': not args.single_page,
+        'organize_netlify': not args.no_netlify,
+        'incremental': args.incremental,
+        'dedup': not args.no_dedup,
+        'resume': args.resume,
+        'page_workers': args.page_workers,
+        'download_threads': args.download_threads,
+        'parse_processes': args.parse_processes,
+        'pipeline_depth': args.pipeline_depth,
+        'low_memory': args.low_memory,
+        'inflight_mb': args.inflight_mb,
+        'per_host_limit': args.per_host,
+        'host_rate': args.host_rate,
+        'retries': args.retries,
+        'adaptive_concurrency': not args.fixed_concurrency,
+        'url_index': args.url_index,
+        'respect_robots': not args.ignore_robots,
+        'use_sitemaps': not args.no_sitemaps,
+        'politeness_delay': args.delay,
+        'page_timeout': args.page_timeout,
+        'crawl_timeout': args.crawl_timeout,
+        'images': not args.no_images,
+        'videos': not args.no_videos,
+        'audio': not args.no_audio,
+        'css': not args.no_css,
+        'js': not args.no_js,
+        'fonts': not args.no_fonts,
+        'srcset': None if args.srcset == 'off' else args.srcset,
+        'srcset_width': args.srcset_width,
+        'srcset_dpr': args.srcset_dpr,
+        'use_selenium': args.selenium,
+        'browser_count': args.browsers,
+        'wait_selector': args.wait_selector,
+        'parser': args.parser,
+        'byte_limits': byte_limits,
+        'output_root': args.output_root,
+        'optimize_output': args.optimize,
+        'compress_min_bytes': args.compress_min_bytes,
+        'archive': args.archive,
+        'log_file': args.log_file,
+        'metrics': args.metrics,
+        'profile': args.profile,
+        'cache_dir': args.cache_dir,
+    }
+
+
+def run_site(url, options, quiet):
+    """Runs in a worker process, so it only takes picklable arguments"""
+    def log(message):
+        print(f"[{url}] {message}", file=sys.stderr, flush=True)
+    return crawl_site(url, log=None if quiet else log, **options)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    urls = list(args.urls)
+    if args.url_file:
+        urls.extend(read_url_file(args.url_file))
+    if not urls:
+        parser.error("give at least one URL or --url-file")
+
+    options = options_from_args(args)
+    sites_at_once = min(args.processes, len(urls))
+    if sites_at_once > 1 and args.parse_processes is None:
+        # Every site is a process already: share the cores out instead of each one taking all but one
+        options['parse_processes'] = max(0, (os.cpu_count() or 1) // sites_at_once - 1)
+    failed = 0
+
+    if args.processes <= 1 or len(urls) == 1:
+        results = (run_site(url, options, args.quiet) for url in urls)
+        for summary in results:
+            failed += summary['status'] != 'complete'
+            print(json.dumps(summary), flush=True)
+    else:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = {executor.submit(run_site, url, options, args.quiet): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    summary = {'url': futures[future], 'status': 'error', 'error': str(e)}
+                failed += summary['status'] != 'complete'
+                print(json.dumps(summary), flush=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
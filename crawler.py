@@ -0,0 +1,892 @@
+from urllib.parse import urljoin, urlparse
+import os
+import re
+import time
+import threading
+from pathlib import Path
+from frontier import Frontier
+from asset_store import AssetStore
+from checkpoint import CrawlCheckpoint, STATE_FILE
+from urlnorm import make_seen_set, normalize
+from metrics import CrawlMetrics, start_fetch
+from discovery import RobotsRules, discover_pages
+from archive import open_archive
+from downloader import AssetDownloadPool, ByteCapExceeded, DEFAULT_BYTE_LIMITS, make_budgets, stream_download
+from http_client import HttpClient, PAGE_ACCEPT, USER_AGENT
+from host_scheduler import HostScheduler
+from http_cache import HttpCache
+from rewriter import lookup_keys, rewrite_html
+from extractor import ASSET_KINDS, extract_page, make_soup
+from pipeline import ByteGate, CpuPool, Pipeline
+from spill import SPILL_FILE, DiskMap, DiskQueue, DiskSeenSet, SpillFile, VisitCounter
+from css_assets import StylesheetProcessor
+from responsive import SrcsetPolicy
+from optimize import OutputOptimizer, minify_html, netlify_headers
+from cancel import CancelToken
+
+ASSET_FOLDERS = ASSET_KINDS + ["fonts"]
+
+# Links that are never crawled as pages
+SKIP_SUBDOMAINS = frozenset(['dash', 'admin', 'api', 'reseller', 'portal', 'account', 'auth'])
+SKIP_LINK_RE = re.compile(r'\.(?:pdf|zip|jpg|png|gif)', re.IGNORECASE)
+SKIP_SCHEMES = ('#', 'javascript:', 'mailto:', 'tel:')
+
+
+def parse_page(html, parser, base_url, html_subdir, srcset=None):
+    """
+    CPU half of a page before its assets are known, run in a pipeline worker process.
+    Returns the serialized tree, its PageRefs and every asset map key the rewrite can look up
+    """
+    soup = make_soup(html, parser)
+    refs = extract_page(soup, srcset)
+    html = str(soup)
+    # The tree is full of parent/child cycles; break them now rather than waiting for the GC
+    soup.decompose()
+    return html, refs, lookup_keys(html, base_url, html_subdir)
+
+
+class PageJob:
+    """One page travelling through the crawl pipeline"""
+
+    __slots__ = ("url", "counted", "number", "html", "refs", "keys", "files", "filename", "subdir", "held", "cancel")
+
+    def __init__(self, url):
+        self.url = url
+        self.counted = False  # Visited, i.e. keeps its max_pages slot when released
+        self.number = 0
+        self.html = None
+        self.refs = None
+        self.keys = None
+        self.files = None
+        self.filename = None
+        self.subdir = "."
+        self.held = 0  # Bytes taken from the in-flight body cap
+        self.cancel = None  # The crawl's CancelToken with this page's deadline
+
+
+class CrawlOptions:
+    """Everything a crawl needs to know. The GUI fills this from its widgets, the CLI from argv"""
+
+    DEFAULTS = {
+        'max_pages': 10,
+        'crawl_subpages': True,
+        'organize_netlify': True,
+        'incremental': False,
+        'resume': False,  # Continue the newest stopped/crashed crawl of the same site from its checkpoint
+        'dedup': True,  # Store identical asset bodies once (hard link, or one shared path)
+        'page_workers': 4,
+        'download_threads': 8,
+        'parse_processes': None,  # Worker processes for parse/rewrite, None = one per core but one, 0 = in-process
+        'pipeline_depth': 8,  # Pages waiting in front of each pipeline stage before the one feeding it blocks
+        'low_memory': False,  # Keep the asset map, manifest and frontier in a scratch SQLite file, not in RAM
+        'hot_entries': 50000,  # Low-memory mode: entries of each disk-backed map also kept in memory (LRU)
+        'inflight_mb': None,  # Cap on page bodies held in the pipeline, None = no cap (32 in low-memory mode)
+        'per_host_limit': 4,  # Upper bound, the adaptive limit backs off from it when a host struggles
+        'host_rate': None,  # Max requests per second to one host (token bucket), None = no pacing
+        'retries': 3,  # Retries of 429/502/503/504 and connection errors, with jittered backoff / Retry-After
+        'adaptive_concurrency': True,
+        'url_index': 'exact',  # Seen-set for discovered links: exact fingerprints, or 'bloom' for huge crawls
+        'url_index_capacity': 5_000_000,  # Bloom filter size, in URLs
+        'respect_robots': True,  # Skip Disallow'ed pages, slow down to the robots.txt Crawl-delay
+        'use_sitemaps': True,  # Seed the frontier from robots.txt / sitemap.xml, newest lastmod first
+        'politeness_delay': 0.1,  # Minimum seconds between two page fetches to the same host
+        'page_timeout': None,  # Seconds one page may take to fetch/render and wait for its assets, None = no budget
+        'crawl_timeout': None,  # Seconds before the whole crawl stops as if Stop was pressed, None = no budget
+        'images': True,
+        'videos': True,
+        'audio': True,
+        'css': True,
+        'js': True,
+        'fonts': True,
+        'srcset': 'nearest',  # Which srcset / <picture> candidate is mirrored: largest, smallest, nearest, or None = leave srcsets alone
+        'srcset_width': 1280,  # 'nearest': display width in CSS pixels to pick for
+        'srcset_dpr': 1.0,  # 'nearest': device pixel ratio to pick for
+        'use_selenium': False,
+        'browser_count': 2,
+        'wait_selector': None,
+        'parser': 'auto',  # BeautifulSoup backend, auto = lxml when installed
+        'byte_limits': None,  # Per resource class caps, None = downloader.DEFAULT_BYTE_LIMITS
+        'output_root': '.',
+        'optimize_output': False,  # Minify HTML/CSS/JS, write .gz/.br sidecars and immutable cache headers for hashed assets
+        'compress_min_bytes': 1024,  # Smallest file that gets .gz/.br sidecars, None = no sidecars
+        'archive': None,  # Also stream the crawl into one file: 'warc', 'warc.gz', 'zip' or 'zip-deflated'
+        'log_file': False,  # Also write every log/status line to crawl.log in the output folder
+        'metrics': False,  # Write metrics.json + metrics.prom to the output folder
+        'profile': False,  # cProfile the crawl stages, written as profile.txt / profile.pstats
+        'cache_dir': '.scraper_cache',
+    }
+
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(self.DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown crawl option(s): {', '.join(sorted(unknown))}")
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, overrides.get(name, default))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+
+class SiteCrawler:
+    """
+    Mirrors one site into scraped_<domain>... without any GUI. Progress goes through the
+    optional callbacks:
+        log(message)
+        status(message, progress_text="")
+        progress(fraction)
+    run() blocks until the crawl is finished or stop() is called, and returns a summary dict.
+    """
+
+    def __init__(self, start_url, options=None, log=None, status=None, progress=None, browser_pool=None):
+        if not start_url.startswith(('http://', 'https://')):
+            start_url = 'https://' + start_url
+        self.start_url = start_url
+        self.options = options or CrawlOptions()
+        self.on_log = log
+        self.on_status = status
+        self.progress = progress or (lambda fraction: None)
+        self.log_file = None
+        self.log_lock = threading.Lock()
+        # Created here so callers can add metrics.hooks before run()
+        self.metrics = CrawlMetrics(profile=self.options.profile)
+        self.browser_pool = browser_pool
+        self.owns_browser_pool = False
+
+        self.is_scraping = False
+        self.incremental = self.options.incremental
+        self.frontier = None
+        self.visited_urls = set()
+        self.download_pool = None
+        self.http = None
+        self.scheduler = None
+        self.assets = None
+        self.checkpoint = None
+        self.robots = None
+        self.archive = None
+        self.byte_budgets = {}
+        self.output_dir = None
+        self.stylesheets = None
+        self.cpu = None
+        self.pipeline = None
+        self.spill = None
+        self.body_gate = None
+        self.srcset = None
+        if self.options.images and self.options.srcset:
+            self.srcset = SrcsetPolicy(self.options.srcset, self.options.srcset_width, self.options.srcset_dpr)
+        self.srcset_skipped = 0
+        self.counter_lock = threading.Lock()
+        # Cancelled by stop(): every fetch, download and render checks it or is cut off by it
+        self.cancel = CancelToken()
+
+    def log(self, message):
+        if self.on_log:
+            self.on_log(message)
+        self.write_log(message)
+
+    def status(self, message, progress_text=""):
+        if self.on_status:
+            self.on_status(message, progress_text)
+        elif self.on_log:
+            self.on_log(message)
+        self.write_log(message)
+
+    def write_log(self, message):
+        if self.log_file is None:
+            return
+        with self.log_lock:
+            try:
+                self.log_file.write(f"[{time.strftime('%H:%M:%S')}] {message}\n")
+            except (OSError, ValueError):
+                pass
+
+    def stop(self, reason="stopped by user"):
+        self.is_scraping = False
+        self.cancel.cancel(reason)
+        if self.frontier:
+            self.frontier.close()
+        if self.scheduler:
+            self.scheduler.close()
+
+    def find_resumable_dir(self, root, domain):
+        """
+        Newest folder of this site (scraped_<domain>, or scraped_<domain>_<timestamp>[_<n>])
+        whose checkpoint was started for the same domain, or None. The name alone isn't
+        enough: scraped_example_com_au_... starts like scraped_example_com.
+        """
+        prefix = f"scraped_{domain.replace('.', '_')}"
+        name_re = re.compile(re.escape(prefix) + r'(?:_\d+){0,2}')
+        candidates = [path for path in root.glob(prefix + "*")
+                      if name_re.fullmatch(path.name) and (path / STATE_FILE).exists()
+                      and self.checkpoint_domain(path) == domain]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda path: (path / STATE_FILE).stat().st_mtime)
+
+    def checkpoint_domain(self, folder):
+        """Domain (without www.) of the start URL a folder's checkpoint was made for"""
+        try:
+            checkpoint = CrawlCheckpoint(folder)
+        except Exception:
+            return None
+        try:
+            start_url = checkpoint.get_meta('start_url')
+        finally:
+            checkpoint.close()
+        return urlparse(start_url).netloc.replace('www.', '') if start_url else None
+
+    def prepare_output_dir(self, domain):
+        root = Path(self.options.output_root)
+        previous = self.find_resumable_dir(root, domain) if self.options.resume else None
+        if previous is not None:
+            output_dir = previous
+        elif self.incremental:
+            # Same folder every run, only changed files get rewritten
+            output_dir = root / f"scraped_{domain.replace('.', '_')}"
+            output_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            # Batch runs can start several crawls of one domain within the same second
+            name = f"scraped_{domain.replace('.', '_')}_{int(time.time())}"
+            output_dir = root / name
+            suffix = 1
+            while True:
+                try:
+                    output_dir.mkdir(parents=True)
+                    break
+                except FileExistsError:
+                    suffix += 1
+                    output_dir = root / f"{name}_{suffix}"
+
+        # Create structure
+        for folder in ASSET_FOLDERS:
+            (output_dir / "assets" / folder).mkdir(parents=True, exist_ok=True)
+        (output_dir / "pages").mkdir(exist_ok=True)
+        return output_dir
+
+    def run(self):
+        options = self.options
+        started = time.time()
+        summary = {
+            'url': self.start_url,
+            'status': 'error',
+            'output_dir': None,
+            'pages': 0,
+            'assets': 0,
+            'asset_bytes': 0,
+            'seconds': 0.0,
+            'error': None,
+        }
+        # stop() may already have been called (e.g. Stop pressed before the thread got here)
+        self.is_scraping = not self.cancel.cancelled
+        deadline = None
+        try:
+            self.status(f"Initializing crawl: {self.start_url}")
+
+            # Setup directories
+            domain = urlparse(self.start_url).netloc.replace('www.', '')
+            base_domain = '.'.join(domain.split('.')[-2:]) if domain.count('.') > 0 else domain
+            output_dir = self.output_dir = self.prepare_output_dir(domain)
+            summary['output_dir'] = str(output_dir.absolute())
+            if options.log_file:
+                self.log_file = open(output_dir / "crawl.log", 'a', encoding='utf-8', errors='replace')
+
+            if options.low_memory:
+                # Everything that grows with the crawl goes to disk, with a hot set in memory
+                self.spill = SpillFile(output_dir / SPILL_FILE)
+                self.metrics.max_requests = min(self.metrics.max_requests, 5000)
+                downloaded_files = DiskMap(self.spill, 'downloaded_files', options.hot_entries)
+            else:
+                downloaded_files = {} # Key: Original URL, Value: Path relative to ROOT (scraped_folder/)
+            inflight_mb = options.inflight_mb or (32 if options.low_memory else None)
+            self.body_gate = ByteGate(inflight_mb * 1024 * 1024) if inflight_mb else None
+            self.byte_budgets = make_budgets(options.byte_limits or DEFAULT_BYTE_LIMITS)
+            self.download_pool = AssetDownloadPool(options.download_threads, options.per_host_limit,
+                                                   forget_finished=options.low_memory)
+            cache = HttpCache(Path(options.cache_dir)) if self.incremental else None
+            self.scheduler = HostScheduler(
+                options.per_host_limit, rate=options.host_rate, retries=options.retries,
+                adaptive=options.adaptive_concurrency
+            )
+            self.http = HttpClient(pool_maxsize=max(10, options.download_threads), cache=cache, scheduler=self.scheduler,
+                                   cancel=self.cancel)
+            if options.crawl_timeout:
+                reason = f"crawl time budget of {options.crawl_timeout:g}s reached"
+                deadline = threading.Timer(options.crawl_timeout, self.stop, kwargs={'reason': reason})
+                deadline.daemon = True
+                deadline.start()
+            if self.spill:
+                self.assets = AssetStore(
+                    output_dir, dedup=options.dedup,
+                    entries=DiskMap(self.spill, 'manifest', options.hot_entries, json_values=True),
+                    by_hash=DiskMap(self.spill, 'by_hash', options.hot_entries)
+                )
+            else:
+                self.assets = AssetStore(output_dir, dedup=options.dedup)
+            resuming = options.resume and (output_dir / STATE_FILE).exists()
+            self.checkpoint = CrawlCheckpoint(output_dir)
+            self.download_pool.on_result = self.checkpoint.asset
+            if options.archive:
+                self.archive = open_archive(output_dir, options.archive, append=resuming)
+                summary['archive'] = str(self.archive.path.absolute())
+            self.stylesheets = StylesheetProcessor(self, output_dir, downloaded_files)
+            max_pages = options.max_pages if options.crawl_subpages else 1
+
+            if options.use_selenium:
+                if self.browser_pool is None:
+                    from browser_pool import BrowserPool
+                    self.browser_pool = BrowserPool()
+                    self.owns_browser_pool = True
+                self.browser_pool.size = options.browser_count
+                self.browser_pool.wait_selector = options.wait_selector or None
+
+            # Shared by every page worker: queued + visited URLs and the max_pages budget
+            if self.spill and options.url_index == 'exact':
+                seen = DiskSeenSet(self.spill, options.hot_entries * 2)
+            else:
+                seen = make_seen_set(options.url_index, options.url_index_capacity)
+            self.frontier = Frontier(
+                max_pages, per_host=options.per_host_limit, host_delay=options.politeness_delay, seen=seen,
+                queue=DiskQueue(self.spill) if self.spill else None,
+                visited=VisitCounter() if self.spill else None
+            )
+            self.visited_urls = self.frontier.visited
+            if resuming:
+                queued, done, assets = self.checkpoint.load()
+                # Older checkpoints also hold stylesheet-relative spellings, which must not become keys
+                assets = {key: rel_path for key, rel_path in assets.items() if '://' in key}
+                downloaded_files.update(assets)
+                for key, rel_path in assets.items():
+                    self.assets.adopt(key, rel_path)
+                self.frontier.restore(done, queued)
+                self.log(f"Resuming {output_dir.name}: {len(done)} pages saved, {len(queued)} queued, {len(assets)} asset paths")
+            else:
+                self.checkpoint.reset()
+                self.checkpoint.set_meta('start_url', self.start_url)
+            start_url = normalize(self.start_url)
+            self.enqueue(start_url)
+            # A resumed frontier already holds what the sitemaps gave last time
+            self.discover(start_url, base_domain, max_pages, seed=not resuming)
+
+            # fetch -> parse -> assets -> rewrite, every page flowing through on its own.
+            # Parse and rewrite are CPU work and run in worker processes
+            self.cpu = CpuPool(self.parse_processes(max_pages))
+            page_workers = max(1, min(options.page_workers, max_pages))
+            cpu_workers = max(1, self.cpu.processes)
+            self.pipeline = Pipeline([
+                ('frontier', self.next_page, 1),
+                ('fetch', lambda job: self.fetch_stage(job, start_url, max_pages), page_workers),
+                ('parse', self.parse_stage, cpu_workers),
+                ('assets', lambda job: self.assets_stage(job, base_domain, output_dir, downloaded_files), page_workers),
+                ('rewrite', lambda job: self.rewrite_stage(job, output_dir), cpu_workers),
+            ], maxsize=max(1, options.pipeline_depth), on_error=self.page_failed)
+            self.pipeline.run()
+            pages_crawled = len(self.frontier.visited)
+            self.metrics.pipeline = self.pipeline.report()
+            summary['pipeline'] = {name: stats['utilization'] for name, stats in self.metrics.pipeline.items()}
+            self.log(f"Pipeline: {self.pipeline.summary()}")
+
+            # A stopped crawl should stop, not spend minutes compressing
+            optimizer = None
+            if options.optimize_output and self.is_scraping:
+                optimizer = OutputOptimizer(output_dir, self.cpu, compress_min=options.compress_min_bytes)
+                with self.metrics.stage('optimize'):
+                    summary['optimize'] = optimizer.run()
+                self.log(f"Optimized: {optimizer.summary()}")
+
+            if options.organize_netlify:
+                self.create_netlify_config(output_dir, optimizer.fingerprinted() if optimizer else ())
+                self.archive_file(output_dir / "netlify.toml")
+                self.log(f"Generated Netlify configuration")
+
+            summary['pages'] = pages_crawled
+            if self.spill:
+                summary['assets'] = downloaded_files.distinct_values()
+            else:
+                summary['assets'] = len(set(downloaded_files.values()))
+            summary['asset_bytes'] = sum(budget.used for budget in self.byte_budgets.values())
+            summary['deduplicated'] = self.assets.deduplicated
+            if self.srcset:
+                # Responsive image sizes that weren't downloaded
+                summary['srcset_skipped'] = self.srcset_skipped
+            self.checkpoint.flush()
+            summary['checkpoint_ms'] = round(self.checkpoint.write_seconds * 1000, 1)
+            self.log(f"Checkpoint: {self.checkpoint.summary()}")
+            summary['errors'] = sum(self.metrics.errors.values())
+            summary['retries'] = self.scheduler.retried
+            summary['throttled'] = self.scheduler.throttled
+            self.log(f"Metrics: {self.metrics.summary()}")
+            self.log(f"Hosts: {self.scheduler.summary()}")
+            self.log(f"Assets: {self.assets.summary()}")
+            if self.http.cache:
+                summary['cache'] = {
+                    'revalidated': self.http.cache.hits,
+                    'fetched': self.http.cache.misses,
+                    'bytes_saved': self.http.cache.bytes_saved,
+                }
+                self.log(f"HTTP cache: {self.http.cache.summary()}")
+
+            self.progress(1.0)
+            if self.is_scraping:
+                summary['status'] = 'complete'
+                self.status(f"Complete! Scraped {pages_crawled} pages -> {output_dir.absolute()}", "100%")
+            else:
+                summary['status'] = 'stopped'
+                summary['stop_reason'] = self.cancel.reason
+                self.status(f"Stopped after {pages_crawled} pages ({self.cancel.reason}) -> {output_dir.absolute()}")
+
+        except Exception as e:
+            error_msg = str(e).encode('ascii', 'ignore').decode('ascii')
+            summary['error'] = error_msg
+            self.status(f"Error: {error_msg}")
+        finally:
+            if deadline:
+                deadline.cancel()
+            if self.download_pool:
+                # Every page is done, what still runs was given up on (page_timeout): cut it off
+                self.cancel.cancel("crawl finished")
+                self.download_pool.shutdown(wait=self.is_scraping)
+                self.download_pool = None
+            if self.cpu:
+                self.cpu.shutdown()
+                self.cpu = None
+            if self.archive:
+                try:
+                    self.archive.close()
+                    self.log(f"Archive: {self.archive.records} records -> {self.archive.path.name}")
+                except Exception as e:
+                    self.log(f"Could not finish archive: {e}")
+                self.archive = None
+            if self.output_dir and (options.metrics or options.profile):
+                try:
+                    self.metrics.write(self.output_dir)
+                except OSError as e:
+                    self.log(f"Could not write metrics: {e}")
+            if self.checkpoint:
+                try:
+                    # Only an unfinished crawl needs its state, and the output folder is what gets deployed
+                    complete = summary['status'] == 'complete'
+                    self.checkpoint.set_meta('status', summary['status'])
+                    self.checkpoint.close(remove=complete)
+                except Exception:
+                    pass
+                self.checkpoint = None
+            if self.assets:
+                # Written for stopped crawls too, the next incremental run picks it up
+                try:
+                    self.assets.save()
+                except OSError:
+                    pass
+                self.assets = None
+            if self.spill:
+                self.spill.close()
+                self.spill = None
+            if self.http:
+                self.http.close()
+                self.http = None
+            if self.owns_browser_pool:
+                self.browser_pool.close()
+                self.browser_pool = None
+                self.owns_browser_pool = False
+            self.is_scraping = False
+            summary['seconds'] = round(time.time() - started, 3)
+            if self.log_file:
+                with self.log_lock:
+                    self.log_file.close()
+                    self.log_file = None
+        return summary
+
+    def enqueue(self, url):
+        """url must already be normalize()d"""
+        if self.robots and not self.robots.allowed(url):
+            return
+        if self.frontier.add(url):
+            self.checkpoint.queued(url)
+
+    def wanted_link(self, full_url, base_domain):
+        """Same-site page links only: no skipped subdomains, no files by extension"""
+        netloc = urlparse(full_url).netloc
+        if base_domain not in netloc:
+            return False
+        subdomain = netloc.split('.')[0] if netloc.count('.') > 1 else ''
+        if subdomain in SKIP_SUBDOMAINS:
+            return False
+        return not SKIP_LINK_RE.search(full_url)
+
+    def discover(self, start_url, base_domain, max_pages, seed=True):
+        """
+        Read robots.txt (Disallow + Crawl-delay for the start host) and seed the frontier
+        from the sitemaps it lists, or /sitemap.xml, so every page worker has work right away.
+        """
+        options = self.options
+        want_seed = seed and options.use_sitemaps and options.crawl_subpages and max_pages > 1
+        if not (options.respect_robots or want_seed):
+            return
+
+        robots = RobotsRules(start_url, USER_AGENT).load(self.http)
+        if options.respect_robots and robots.loaded:
+            self.robots = robots
+            delay = robots.crawl_delay()
+            if delay and delay > options.politeness_delay:
+                self.frontier.set_host_delay(urlparse(start_url).netloc, delay)
+                self.log(f"robots.txt: Crawl-delay {delay:g}s")
+
+        if not want_seed:
+            return
+        sitemaps = robots.sitemaps() or [urljoin(start_url, "/sitemap.xml")]
+
+        def wanted(url):
+            # Filtered while streaming: a disallowed entry must not take an allowed page's slot
+            url = normalize(url)
+            return self.wanted_link(url, base_domain) and (self.robots is None or self.robots.allowed(url))
+
+        with self.metrics.stage('sitemaps'):
+            pages = discover_pages(self.http, sitemaps, limit=max_pages * 2, wanted=wanted, log=self.log)
+        for url, lastmod in pages:
+            self.enqueue(normalize(url))
+        if pages:
+            self.log(f"Sitemap: seeded {len(pages)} pages")
+
+    def check_url_validity(self, url, cancel=None):
+        """Check if URL is accessible before scraping"""
+        try:
+            # Try HEAD first (faster)
+            response = self.http.head(url, timeout=5, allow_redirects=True, cancel=cancel)
+            if response.status_code < 400:
+                return True
+
+            # HEAD failed, try GET (some sites block HEAD requests)
+            # Only the status matters, so don't pull the body
+            with self.http.get(url, timeout=10, allow_redirects=True, stream=True, cancel=cancel) as response:
+                return response.status_code < 400
+        except Exception as e:
+            self.metrics.error('check_url', e)
+            # If both fail, still return True to let the main scraper try
+            # Better to attempt and fail than to skip valid pages
+            return True
+
+    def parse_processes(self, max_pages):
+        """Worker processes for parse/rewrite: one core is left for the I/O threads"""
+        processes = self.options.parse_processes
+        if processes is None:
+            processes = min(self.options.page_workers, (os.cpu_count() or 1) - 1)
+        # A single page isn't worth starting processes for
+        return max(0, processes) if max_pages > 1 else 0
+
+    def next_page(self):
+        """
+        Pipeline source: the next claimed URL, None once the crawl is over. The only source
+        thread, so claim() waits out a full budget until the pages in flight are done.
+        """
+        url = self.frontier.claim() if self.is_scraping else None
+        return PageJob(url) if url else None
+
+    def fetch_stage(self, job, start_url, max_pages):
+        """Pipeline I/O stage: validity check + page fetch, spaced per host by the frontier"""
+        if not self.is_scraping:
+            return self.finish(job)
+        current_url = job.url
+        with self.frontier.polite(current_url):
+            if not self.is_scraping:
+                return self.finish(job)
+            # The page budget starts once it is this page's turn at the host
+            job.cancel = self.cancel.child(self.options.page_timeout)
+            if not self.check_url_validity(current_url, job.cancel):
+                self.log(f"Skipped (404 or unreachable): {current_url}")
+                return self.finish(job)
+
+            job.counted = True
+            pages_crawled = job.number = self.frontier.visit(current_url)
+
+            progress_pct = int((pages_crawled / max_pages) * 100)
+            self.status(
+                f"Crawling: {current_url}",
+                f"{progress_pct}% ({pages_crawled}/{max_pages})"
+            )
+            self.progress(pages_crawled / max_pages)
+
+            # Get page efficiently
+            if self.options.use_selenium:
+                job.html = self.get_with_selenium(current_url, job.cancel)
+            else:
+                job.html = self.get_with_requests(current_url, job.cancel)
+
+        if not job.html:
+            return self.finish(job)
+        if self.body_gate:
+            # Blocks while the pipeline already holds inflight_mb of pages
+            job.held = len(job.html)
+            self.body_gate.acquire(job.held)
+
+        # DETERMINE FILE SAVE LOCATION
+        if current_url == start_url:
+            job.filename = "index.html"
+            job.subdir = "." # Root
+        else:
+            path = urlparse(current_url).path.strip('/')
+            job.filename = f"pages/{path.replace('/', '_')}.html" if path else f"pages/page_{pages_crawled}.html"
+            job.subdir = "pages" # Inside pages folder
+        return job
+
+    def parse_stage(self, job):
+        """Pipeline CPU stage: parse, extract and serialize in a worker process"""
+        if not self.is_scraping:
+            return self.finish(job)
+        with self.metrics.stage('parse'):
+            job.html, job.refs, job.keys = self.cpu.run(parse_page, job.html, self.options.parser, job.url, job.subdir, self.srcset)
+        return job
+
+    def assets_stage(self, job, base_domain, output_dir, downloaded_files):
+        """Pipeline I/O stage: queue new links, download the page's assets and stylesheets"""
+        if not self.is_scraping:
+            return self.finish(job)
+        options = self.options
+        current_url = job.url
+        refs = job.refs
+        job.refs = None
+        if refs.srcset_skipped:
+            with self.counter_lock:
+                self.srcset_skipped += refs.srcset_skipped
+
+        # Find more pages to crawl
+        if options.crawl_subpages and self.frontier.has_budget():
+            for href in refs.links:
+                if href.startswith(SKIP_SCHEMES):
+                    continue
+
+                full_url = normalize(urljoin(current_url, href))
+                # Already queued/visited is the frontier's job (canonical fingerprints)
+                if self.wanted_link(full_url, base_domain):
+                    self.enqueue(full_url)
+
+        # Download resources (Note: Logic works recursively now because we pass downloaded_files)
+        # Every call only queues work on the pool; results are merged below before paths are rewritten
+        pending = []
+        for kind in ASSET_KINDS:
+            if getattr(options, kind):
+                self.download_resources(refs.assets[kind], current_url, output_dir / "assets" / kind, downloaded_files, pending)
+
+        # Wait for this page's assets so the rewrite below sees every local path
+        with self.metrics.stage('assets_wait'):
+            self.download_pool.collect(pending, downloaded_files, job.cancel)
+
+        # Stylesheets are parsed once per crawl from the copies just downloaded: @imports,
+        # fonts and background images get mirrored and the local CSS points at them
+        if options.fonts or options.images or options.css:
+            with self.metrics.stage('stylesheets'):
+                for href in refs.stylesheets:
+                    if href.startswith('data:'):
+                        continue
+                    self.stylesheets.process(urljoin(current_url, href))
+
+        # The rewrite runs in another process: send it only the part of the asset map this
+        # page can hit instead of the whole crawl's
+        job.files = {key: downloaded_files[key] for key in job.keys if key in downloaded_files}
+        job.keys = None
+        return job
+
+    def rewrite_stage(self, job, output_dir):
+        """Pipeline CPU stage: local paths in a worker process, then the write"""
+        if not self.is_scraping:
+            return self.finish(job)
+        # UPDATE HTML PATHS WITH RELATIVE CHECK
+        with self.metrics.stage('rewrite'):
+            html_updated = self.cpu.run(rewrite_html, job.html, job.files, job.url, job.subdir)
+        job.html = job.files = None
+
+        filename = job.filename
+        filepath = output_dir / filename
+        filepath.parent.mkdir(exist_ok=True, parents=True)
+
+        if self.incremental and self.is_unchanged(filepath, html_updated):
+            self.log(f"Unchanged: {filename}")
+        else:
+            with self.metrics.stage('write'):
+                with open(filepath, 'w', encoding='utf-8', errors='ignore') as f:
+                    f.write(html_updated)
+            self.log(f"Saved: {filename}")
+        self.archive_file(filepath, job.url, body=html_updated.encode('utf-8', errors='ignore'))
+
+        # Only pages that made it to disk count as done, a resumed crawl refetches the rest
+        self.checkpoint.done(job.url, job.number)
+        return self.finish(job)
+
+    def finish(self, job):
+        """Hand the page's frontier claim back. Returns None, i.e. the job leaves the pipeline"""
+        if job.held:
+            self.body_gate.release(job.held)
+            job.held = 0
+        self.frontier.release(job.url, job.counted)
+        return None
+
+    def page_failed(self, stage, job, error):
+        self.metrics.error('page', error)
+        if job is None:
+            return
+        self.log(f"Error on {job.url}: {error}")
+        self.finish(job)
+
+    def get_with_selenium(self, url, cancel=None):
+        try:
+            with self.metrics.stage('render'), self.scheduler.slot(url):
+                timing = start_fetch()
+                html = self.browser_pool.render(url, cancel or self.cancel)
+            self.metrics.record_fetch('page', url, len(html), status='rendered', timing=timing)
+            if self.archive:
+                self.archive.add_resource(url, 'text/html; charset=utf-8', body=html.encode('utf-8', errors='ignore'))
+            return html
+        except Exception as e:
+            self.metrics.error('render', e)
+            if self.is_scraping:
+                self.log(f"Failed to render: {url} ({e})")
+            return None
+
+    def get_with_requests(self, url, cancel=None):
+        # http_client fills this in through the thread-local, record_fetch reads it back
+        timing = start_fetch()
+        try:
+            response = self.http.get(url, headers={'Accept': PAGE_ACCEPT}, timeout=30, cancel=cancel)
+            response.raise_for_status()
+            self.metrics.record_fetch('page', url, len(response.content), timing=timing)
+            if not getattr(response, 'from_cache', False):
+                self.archive_response(url, response.status_code, response.reason, response.headers, body=response.content)
+            return response.text
+        except Exception as e:
+            self.metrics.error('page_fetch', e)
+            self.metrics.record_fetch('page', url, timing=timing)
+            if self.is_scraping:
+                self.log(f"Failed to fetch: {url} ({e})")
+            return None
+
+    def download_resources(self, refs, base_url, output_dir, downloaded_files, pending=None):
+        """
+        Queue every (url, type attribute) reference from extract_page on the download pool.
+        pending: list that collects (future, keys) pairs. When omitted the downloads are
+                 waited for before returning.
+        """
+        batch = [] if pending is None else pending
+
+        for resource_url, type_attr in refs:
+            if not self.is_scraping:
+                break
+
+            if not resource_url or resource_url.startswith('data:'):
+                continue
+
+            try:
+                full_url = urljoin(base_url, resource_url)
+
+                # If already downloaded, just ensure mapping is there
+                if full_url in downloaded_files:
+                    continue
+
+                # Absolute URL only: the rewriter resolves relative references against the page,
+                # and a relative key would map another page's identical spelling to this file
+                self.queue_asset(full_url, [full_url], output_dir, batch, type_attr)
+
+            except Exception as e:
+                self.metrics.error('queue_asset', e)
+
+        if pending is None:
+            self.download_pool.collect(batch, downloaded_files)
+
+    def queue_asset(self, full_url, keys, output_dir, batch, type_attr='', timeout=15, label="Downloaded"):
+        """Submit one download and add its (future, keys) pair to batch"""
+        # Stable per-URL name (stem + URL digest), see asset_store.AssetStore.path_for
+        filepath = self.assets.path_for(full_url, output_dir, type_attr)
+
+        # IMPORTANT: Mapping is stored relative to the ROOT scraped folder once the download finishes
+        future = self.download_pool.submit(full_url, filepath, self.fetch_asset, full_url, filepath, timeout, label)
+        batch.append((future, keys))
+
+    def fetch_asset(self, full_url, filepath, timeout, label="Downloaded"):
+        """Worker side of the download pool. Returns the path relative to the ROOT scraped folder"""
+        if not self.is_scraping:
+            return None
+
+        kind = filepath.parent.name
+        transferred = False
+        # Incremental runs revalidate files that are already on disk instead of trusting them
+        if self.incremental or not filepath.exists():
+            # Budgets are per resource class, i.e. the assets/ subfolder
+            budget = self.byte_budgets.get(kind)
+            timing = start_fetch()
+            try:
+                size, unchanged, sha256 = stream_download(self.http, full_url, filepath, timeout, budget, self.http.cache,
+                                                          self.cancel)
+            except ByteCapExceeded as e:
+                self.metrics.error('asset', e)
+                self.metrics.record_fetch(kind, full_url, status=timing.status)
+                self.log(f"Skipped {filepath.name}: {e}")
+                return None
+            except Exception as e:
+                # Still raised, the pool drops failed downloads
+                self.metrics.error('asset', e)
+                self.metrics.record_fetch(kind, full_url, status=timing.status)
+                raise
+            self.metrics.record_fetch(kind, full_url, 0 if unchanged else size, status=timing.status)
+            transferred = not unchanged
+
+            if not unchanged:
+                self.log(f"{label}: {filepath.name} ({size // 1024}KB)")
+        else:
+            size, sha256 = filepath.stat().st_size, None
+
+        # Stylesheets are rewritten in place relative to their own URL, so they are never shared
+        # e.g. assets/css/style-3f2a9c01d4e5.css
+        rel_path = self.assets.record(full_url, filepath, size, sha256, dedup=kind != 'css')
+        if transferred:
+            self.archive_response(full_url, timing.status, timing.reason, timing.headers, path=filepath)
+        # Stylesheets go into a zip once StylesheetProcessor has rewritten them
+        if kind != 'css':
+            self.archive_file(self.output_dir / rel_path, full_url)
+        return rel_path
+
+    def archive_response(self, url, status, reason, headers, body=None, path=None):
+        """Capture of one HTTP exchange (WARC output only)"""
+        if self.archive is None or headers is None:
+            return
+        # A resumed (206) download is complete on disk by now
+        if status == 206:
+            status = 200
+        try:
+            self.archive.add_response(url, status, reason, headers, body=body, path=path)
+        except (OSError, ValueError) as e:
+            self.metrics.error('archive', e)
+
+    def archive_file(self, filepath, url=None, body=None):
+        """A finished file of the mirror (zip output only)"""
+        if self.archive is None:
+            return
+        try:
+            self.archive.add_file(str(filepath.relative_to(self.output_dir)), filepath, url=url, body=body)
+        except (OSError, ValueError) as e:
+            self.metrics.error('archive', e)
+
+    def is_unchanged(self, filepath, html):
+        """True if filepath already holds exactly this page (incremental runs skip the write)"""
+        if self.options.optimize_output:
+            # What's on disk went through the optimize stage last time
+            html = minify_html(html)
+        try:
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read() == html
+        except OSError:
+            return False
+
+    def create_netlify_config(self, output_dir, immutable=()):
+        """immutable: asset paths (relative to ROOT) served with a one-year Cache-Control"""
+        config = """[build]
+  publish = "."
+
+[[redirects]]
+  from = "/*"
+  to = "/index.html"
+  status = 200
+"""
+        config += netlify_headers(immutable)
+        with open(output_dir / "netlify.toml", 'w', encoding='utf-8') as f:
+            f.write(config)
+
+
+def crawl_site(url, log=None, **options):
+    """Library entry point: mirror one site and return its summary dict"""
+    return SiteCrawler(url, CrawlOptions(**options), log=log).run()
@@ -0,0 +1,155 @@
+import os
+import posixpath
+import re
+import threading
+from urllib.parse import urljoin, urlparse
+
+# url(...) with optional quotes, and @import "x" / @import url(x)
+CSS_URL_RE = re.compile(r'url\(\s*(["\']?)([^"\')]+?)\1\s*\)', re.IGNORECASE)
+CSS_IMPORT_RE = re.compile(r'@import\s+(?:url\(\s*)?(["\'])?([^"\')\s;]+)', re.IGNORECASE)
+
+FONT_EXTENSIONS = ('.woff', '.woff2', '.ttf', '.otf', '.eot')
+
+# Appended to stylesheets whose url()s already point into the mirror, so an incremental
+# run that finds the file unchanged doesn't try to resolve our local paths against the site
+REWRITTEN_MARKER = "/* urls rewritten for local mirror */"
+
+MAX_IMPORT_DEPTH = 10
+
+
+def asset_kind(url):
+    """Which assets/ folder a url() target belongs in"""
+    path = urlparse(url).path.lower()
+    if path.endswith(FONT_EXTENSIONS):
+        return 'fonts'
+    if path.endswith('.css'):
+        return 'css'
+    return 'images'
+
+
+class StylesheetProcessor:
+    """
+    Mirrors what stylesheets reference: @import chains, fonts and background images.
+    Each stylesheet is read once per crawl from the copy already downloaded into
+    assets/css (or fetched once when CSS isn't being mirrored), its references are queued
+    on the crawler's download pool, and the local copy is rewritten to point at them.
+    Call process() from page threads only, never from a download pool worker.
+    """
+
+    def __init__(self, crawler, output_dir, downloaded_files):
+        self.crawler = crawler
+        self.output_dir = output_dir
+        self.downloaded_files = downloaded_files
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def claim(self, css_url):
+        with self.lock:
+            if css_url in self.seen:
+                return False
+            self.seen.add(css_url)
+            return True
+
+    def wanted(self, kind):
+        options = self.crawler.options
+        return getattr(options, kind)
+
+    def read(self, css_url):
+        """Returns (text, local path or None)"""
+        local = self.downloaded_files.get(css_url)
+        if local:
+            path = self.output_dir / local
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8', errors='replace'), path
+        response = self.crawler.http.get(css_url, timeout=10)
+        response.raise_for_status()
+        return response.text, None
+
+    def process(self, css_url, depth=0):
+        """
+        Handle one stylesheet and everything it imports. A stylesheet another page thread
+        is already handling is skipped rather than waited for, so import cycles can't deadlock.
+        """
+        if depth > MAX_IMPORT_DEPTH or not self.crawler.is_scraping or not self.claim(css_url):
+            return
+        try:
+            text, path = self.read(css_url)
+        except Exception as e:
+            self.crawler.metrics.error('stylesheet', e)
+            return
+        marked = text.rstrip().endswith(REWRITTEN_MARKER)
+        if marked:
+            # Already rewritten by an earlier run (and unchanged since): its url()s are local
+            # paths now, the original targets come from the manifest and are still revalidated
+            refs = self.crawler.assets.refs(css_url)
+            imports, urls = refs.get('imports', []), refs.get('urls', [])
+        else:
+            imports, urls = self.references(css_url, text)
+            if path is not None:
+                self.crawler.assets.set_refs(css_url, {'imports': imports, 'urls': urls})
+
+        batch = []
+        if self.wanted('css'):
+            for full_url in imports:
+                self.crawler.queue_asset(full_url, [full_url], self.output_dir / "assets" / "css", batch, label="Downloaded import")
+
+        for full_url in urls:
+            kind = asset_kind(full_url)
+            if kind == 'css' or not self.wanted(kind):
+                continue
+            label = "Downloaded font" if kind == 'fonts' else "Downloaded CSS image"
+            # Absolute URL only: local_ref() resolves against the stylesheet, and the relative
+            # spelling as a key would map the same string on any page to this file
+            self.crawler.queue_asset(full_url, [full_url], self.output_dir / "assets" / kind, batch, timeout=10, label=label)
+
+        self.crawler.download_pool.collect(batch, self.downloaded_files)
+
+        for import_url in imports:
+            self.process(import_url, depth + 1)
+
+        if path is not None:
+            if not marked:
+                self.rewrite(text, css_url, path)
+            self.crawler.archive_file(path, css_url)
+
+    def references(self, css_url, text):
+        """Absolute URLs of a stylesheet's @imports and of its other url() targets"""
+        imports = [urljoin(css_url, match.group(2)) for match in CSS_IMPORT_RE.finditer(text)]
+        urls = []
+        for match in CSS_URL_RE.finditer(text):
+            raw_url = match.group(2).strip()
+            if not raw_url.startswith(('data:', '#')):
+                urls.append(urljoin(css_url, raw_url))
+        return imports, urls
+
+    def local_ref(self, css_url, raw_url, css_path):
+        if raw_url.startswith(('data:', '#')):
+            return None
+        local = self.downloaded_files.get(urljoin(css_url, raw_url))
+        if not local:
+            return None
+        css_dir = posixpath.dirname(str(css_path.relative_to(self.output_dir)).replace("\\", "/"))
+        return posixpath.relpath(local.replace("\\", "/"), css_dir)
+
+    def rewrite(self, text, css_url, path):
+        def replace_url(match):
+            local = self.local_ref(css_url, match.group(2).strip(), path)
+            if local is None:
+                return match.group(0)
+            quote = match.group(1)
+            return f"url({quote}{local}{quote})"
+
+        def replace_import(match):
+            local = self.local_ref(css_url, match.group(2), path)
+            if local is None:
+                return match.group(0)
+            return match.group(0).replace(match.group(2), local)
+
+        new_text = CSS_URL_RE.sub(replace_url, text)
+        new_text = CSS_IMPORT_RE.sub(replace_import, new_text)
+        if new_text == text:
+            return
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(new_text.rstrip() + "\n" + REWRITTEN_MARKER + "\n")
+        os.replace(tmp, path)
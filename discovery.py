@@ -0,0 +1,177 @@
+import gzip
+import heapq
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+MAX_SITEMAP_FILES = 50  # Sitemap index fan-out we follow before giving up
+MAX_ROBOTS_BYTES = 512 * 1024
+
+
+class RobotsRules:
+    """robots.txt of one site: Disallow rules, Crawl-delay and Sitemap lines"""
+
+    def __init__(self, base_url, user_agent="*"):
+        self.robots_url = urljoin(base_url, "/robots.txt")
+        self.user_agent = user_agent
+        self.parser = RobotFileParser(self.robots_url)
+        self.parser.allow_all = True
+        self.loaded = False
+        self.delay = None
+
+    def load(self, http, timeout=10):
+        """
+        Missing or unreadable robots.txt means everything is allowed. Only 401/403 block the
+        whole site, like urllib.robotparser does.
+        """
+        try:
+            with http.get(self.robots_url, timeout=timeout, stream=True) as response:
+                if response.status_code in (401, 403):
+                    self.parser.allow_all = False
+                    self.parser.disallow_all = True
+                    return self
+                if response.status_code != 200:
+                    return self
+                body = response.raw.read(MAX_ROBOTS_BYTES, decode_content=True)
+        except Exception:
+            return self
+        lines = body.decode('utf-8', errors='replace').splitlines()
+        self.parser.allow_all = False
+        self.parser.parse(lines)
+        self.delay = parse_crawl_delay(lines, self.user_agent)
+        self.loaded = True
+        return self
+
+    def allowed(self, url):
+        return self.parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self):
+        return self.delay
+
+    def sitemaps(self):
+        return list(self.parser.site_maps() or [])
+
+
+def parse_crawl_delay(lines, user_agent):
+    """
+    Crawl-delay of the group matching user_agent, else of the * group. Done by hand because
+    urllib.robotparser ignores fractional values like 0.5.
+    """
+    token = user_agent.split('/')[0].lower()
+    delays = {}
+    agents = []
+    in_rules = False
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        key, value = (part.strip() for part in line.split(':', 1))
+        key = key.lower()
+        if key == 'user-agent':
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(value.lower())
+        else:
+            in_rules = True
+            if key == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+    for agent, delay in delays.items():
+        if agent != '*' and agent in token:
+            return delay
+    return delays.get('*')
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap(stream):
+    """
+    Stream (kind, loc, lastmod) out of a sitemap or sitemap index, kind being 'url' or
+    'sitemap'. Elements are cleared as soon as they are read, so memory doesn't grow with
+    the file size.
+    """
+    root = None
+    loc = lastmod = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        name = local_name(elem.tag)
+        if name == 'loc':
+            loc = (elem.text or '').strip()
+        elif name == 'lastmod':
+            lastmod = (elem.text or '').strip()
+        elif name in ('url', 'sitemap'):
+            if loc:
+                yield name, loc, lastmod
+            loc = lastmod = None
+            elem.clear()
+            root.clear()
+
+
+def open_sitemap(http, url, timeout=20):
+    """Streamed response + file object to parse, gunzipping .gz sitemaps on the fly"""
+    response = http.get(url, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+    except Exception:
+        # A streamed response holds its HostScheduler slot until closed; 404 is the usual answer
+        response.close()
+        raise
+    response.raw.decode_content = True  # Content-Encoding: gzip is undone by urllib3
+    stream = response.raw
+    content_type = response.headers.get('Content-Type', '')
+    if urlparse(url).path.endswith('.gz') or 'gzip' in content_type:
+        stream = gzip.GzipFile(fileobj=stream)
+    return response, stream
+
+
+def discover_pages(http, sitemap_urls, limit, wanted=None, log=None):
+    """
+    Read sitemaps (following sitemap indexes) and return up to limit page URLs, the most
+    recently modified first; pages without lastmod come last in sitemap order.
+    wanted(url) filters pages before they compete for a slot. Only `limit` entries are ever
+    held in memory.
+    """
+    heap = []  # (lastmod, -order, url): the smallest is dropped once we hold more than limit
+    order = 0
+    queue = list(sitemap_urls)
+    seen = set(queue)
+    files = 0
+    while queue and files < MAX_SITEMAP_FILES:
+        sitemap_url = queue.pop(0)
+        files += 1
+        try:
+            response, stream = open_sitemap(http, sitemap_url)
+        except Exception:
+            continue
+        try:
+            for kind, loc, lastmod in iter_sitemap(stream):
+                if kind == 'sitemap':
+                    if loc not in seen:
+                        seen.add(loc)
+                        queue.append(loc)
+                    continue
+                if wanted and not wanted(loc):
+                    continue
+                order += 1
+                entry = (lastmod or '', -order, loc)
+                if len(heap) < limit:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        except (ET.ParseError, OSError, EOFError) as e:
+            if log:
+                log(f"Sitemap {sitemap_url} unreadable: {e}")
+        finally:
+            response.close()
+    entries = sorted(heap, reverse=True)
+    return [(url, lastmod or None) for lastmod, _, url in entries]
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+CHUNK_SIZE = 64 * 1024
+MB = 1024 * 1024
+
+# Per resource class (the assets/ subfolder name): max bytes per file and per crawl, None = no cap
+DEFAULT_BYTE_LIMITS = {
+    'images': {'per_file': 25 * MB, 'total': None},
+    'videos': {'per_file': 1024 * MB, 'total': None},
+    'audio': {'per_file': 200 * MB, 'total': None},
+    'css': {'per_file': 10 * MB, 'total': None},
+    'js': {'per_file': 20 * MB, 'total': None},
+    'fonts': {'per_file': 10 * MB, 'total': None},
+}
+
+
+class ByteCapExceeded(Exception):
+    pass
+
+
+class ByteBudget:
+    """Byte caps for one resource class, shared by every worker downloading that class"""
+
+    def __init__(self, per_file=None, total=None):
+        self.per_file = per_file
+        self.total = total
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def check_file(self, size):
+        if self.per_file and size > self.per_file:
+            raise ByteCapExceeded(f"{size // 1024}KB is over the {self.per_file // 1024}KB per-file cap")
+
+    def consume(self, size):
+        with self.lock:
+            if self.total and self.used + size > self.total:
+                raise ByteCapExceeded(f"crawl cap of {self.total // 1024}KB reached")
+            self.used += size
+
+
+def make_budgets(limits=None):
+    limits = limits or DEFAULT_BYTE_LIMITS
+    return {name: ByteBudget(cap.get('per_file'), cap.get('total')) for name, cap in limits.items()}
+
+
+def stream_download(http, url, filepath, timeout, budget=None, cache=None, cancel=None):
+    """
+    Stream url into filepath in CHUNK_SIZE pieces through a .part file that is renamed into
+    place once complete, so memory stays flat regardless of the body size. A .part left by an
+    interrupted download is resumed with a Range request guarded by If-Range; without a
+    stored ETag / Last-Modified it is thrown away and the download starts over.
+    With a cache, a file already in the mirror is revalidated instead of downloaded again.
+    The body is hashed as it streams. Returns (size, unchanged, sha256), sha256 is None
+    when the body wasn't transferred (304).
+    cancel (cancel.CancelToken) is checked after every chunk; a cancelled download keeps its
+    .part for the next run like any other interrupted one.
+    """
+    part = filepath.with_name(filepath.name + '.part')
+    validator_file = filepath.with_name(filepath.name + '.part.validator')
+    headers = {}
+
+    entry = cache.lookup(url, require_body=False) if cache and filepath.exists() else None
+    if entry:
+        headers.update(cache.conditional_headers(entry))
+
+    offset = part.stat().st_size if part.exists() else 0
+    if offset and not entry:
+        try:
+            with open(validator_file, 'r', encoding='utf-8') as f:
+                validator = f.read().strip()
+        except OSError:
+            validator = None
+        if validator:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+        else:
+            # Nothing tells us the resource is still the same: a bare Range could splice old and new bytes
+            part.unlink(missing_ok=True)
+            offset = 0
+
+    with http.get(url, headers=headers, timeout=timeout, stream=True, cancel=cancel) as response:
+        if response.status_code == 304 and entry:
+            size = filepath.stat().st_size
+            cache.record_hit(size)
+            return size, True, None
+
+        if response.status_code == 416:
+            # Our partial file doesn't fit the current resource any more, start over. Closed
+            # first, an open response keeps its per-host request slot
+            response.close()
+            part.unlink(missing_ok=True)
+            validator_file.unlink(missing_ok=True)
+            return stream_download(http, url, filepath, timeout, budget, cache, cancel)
+
+        response.raise_for_status()
+        resumed = offset and response.status_code == 206
+        if not resumed:
+            offset = 0
+
+        length = response.headers.get('Content-Length')
+        if budget and length and length.isdigit():
+            budget.check_file(offset + int(length))
+
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if validator and not resumed:
+            with open(validator_file, 'w', encoding='utf-8') as f:
+                f.write(validator)
+
+        digest = hashlib.sha256()
+        if resumed:
+            with open(part, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+
+        written = offset
+        try:
+            with open(part, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if cancel is not None:
+                        cancel.check()
+                    if not chunk:
+                        continue
+                    written += len(chunk)
+                    if budget:
+                        budget.check_file(written)
+                        budget.consume(len(chunk))
+                    digest.update(chunk)
+                    f.write(chunk)
+        except ByteCapExceeded:
+            part.unlink(missing_ok=True)
+            validator_file.unlink(missing_ok=True)
+            raise
+        # Any other error keeps the .part around so the next attempt can resume it
+
+        os.replace(part, filepath)
+        validator_file.unlink(missing_ok=True)
+        if cache:
+            cache.record_miss()
+            cache.store_validators(url, response, written)
+        return written, False, digest.hexdigest()
+
+
+class AssetDownloadPool:
+    """
+    Bounded worker pool for asset downloads with a per-host concurrency cap.
+    forget_finished drops finished jobs from the file -> future map instead of keeping
+    every result for the whole crawl (low-memory crawls).
+    """
+
+    def __init__(self, max_workers=8, per_host=4, forget_finished=False):
+        self.max_workers = max(1, int(max_workers))
+        self.per_host = max(1, int(per_host))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asset")
+        self.host_slots = {}
+        self.jobs = {}  # Key: target file path, Value: future writing it
+        self.lock = threading.Lock()
+        self.on_result = None  # Called with (keys, rel_path) for every merged download
+        self.forget_finished = forget_finished
+
+    def host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host)
+                self.host_slots[host] = slot
+            return slot
+
+    def submit(self, url, filepath, fn, *args):
+        """
+        Queue fn(*args) to produce filepath. If another URL already claimed the same
+        file, its future is returned instead so the file is never written twice at once.
+        """
+        slot = self.host_slot(url)
+        with self.lock:
+            future = self.jobs.get(filepath)
+            if future is None:
+                future = self.executor.submit(self._run, slot, fn, *args)
+                self.jobs[filepath] = future
+                if self.forget_finished:
+                    future.add_done_callback(lambda done, path=filepath: self.forget(path))
+            return future
+
+    def forget(self, filepath):
+        with self.lock:
+            self.jobs.pop(filepath, None)
+
+    def _run(self, slot, fn, *args):
+        with slot:
+            return fn(*args)
+
+    def collect(self, batch, downloaded_files, cancel=None):
+        """
+        Wait for every (future, keys) pair in batch and merge the finished paths into
+        downloaded_files. Page workers call this concurrently, so the merge takes the pool lock.
+        cancel: stop waiting at its deadline. Downloads still running carry on, only this
+        call doesn't merge them.
+        """
+        for future, keys in batch:
+            try:
+                rel_path = future.result(timeout=cancel.remaining() if cancel is not None else None)
+            except Exception:
+                continue
+            if rel_path:
+                with self.lock:
+                    for key in keys:
+                        downloaded_files[key] = rel_path
+                if self.on_result:
+                    self.on_result(keys, rel_path)
+        batch.clear()
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
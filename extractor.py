@@ -0,0 +1,85 @@
+import importlib.util
+from bs4 import BeautifulSoup
+
+ASSET_KINDS = ["images", "videos", "audio", "css", "js"]
+
+
+def pick_parser(parser="auto"):
+    """lxml when it is installed (several times faster than html.parser), html.parser otherwise"""
+    if parser and parser != "auto":
+        return parser
+    if importlib.util.find_spec("lxml") is not None:
+        return "lxml"
+    return "html.parser"
+
+
+def make_soup(html, parser="auto"):
+    return BeautifulSoup(html, pick_parser(parser))
+
+
+class PageRefs:
+    """Everything the crawler needs from one page, collected in a single walk of the tree"""
+
+    __slots__ = ("links", "assets", "stylesheets", "srcset_skipped")
+
+    def __init__(self):
+        self.links = []  # raw href of every <a>
+        self.assets = {kind: [] for kind in ASSET_KINDS}  # kind -> [(url, type attribute)]
+        self.stylesheets = []  # raw href of every <link rel=stylesheet>
+        self.srcset_skipped = 0  # srcset candidates left out by the policy
+
+
+def extract_page(soup, srcset=None):
+    """
+    One pass over all tags, replacing the separate find_all calls for a, img, video,
+    audio, source, link and script.
+    srcset: responsive.SrcsetPolicy. Every srcset (img, <picture> source, data-srcset) is cut
+    down to its chosen candidate in the tree and only that one is listed as an image.
+    None leaves srcsets alone, as before.
+    """
+    refs = PageRefs()
+    assets = refs.assets
+
+    def add(kind, tag, *attrs):
+        for attr in attrs:
+            value = tag.attrs.get(attr)
+            if value:
+                assets[kind].append((value, tag.attrs.get('type', '')))
+
+    for tag in soup.find_all(True):
+        name = tag.name
+        if name == 'a':
+            href = tag.attrs.get('href')
+            if href:
+                refs.links.append(href)
+        elif name == 'img':
+            if srcset is not None:
+                refs.srcset_skipped += srcset.apply(tag)[1]
+            add('images', tag, 'src', 'data-src')
+        elif name == 'video':
+            add('videos', tag, 'src', 'data-src')
+        elif name == 'audio':
+            add('audio', tag, 'src')
+        elif name == 'source':
+            # Sources follow their player; anything else keeps the old "treat as video" behaviour
+            parent = tag.parent.name if tag.parent is not None else None
+            if parent == 'audio':
+                add('audio', tag, 'src')
+            elif parent == 'picture' and srcset is not None:
+                # Each <source> stays, they can differ by media query or format
+                chosen, skipped = srcset.apply(tag, src_too=False)
+                refs.srcset_skipped += skipped
+                assets['images'].extend((url, tag.attrs.get('type', '')) for url in chosen)
+            else:
+                add('videos', tag, 'src', 'data-src')
+        elif name == 'link':
+            rel = tag.attrs.get('rel') or []
+            if isinstance(rel, str):
+                rel = rel.split()
+            href = tag.attrs.get('href')
+            if href and 'stylesheet' in [r.lower() for r in rel]:
+                assets['css'].append((href, tag.attrs.get('type', '')))
+                refs.stylesheets.append(href)
+        elif name == 'script':
+            add('js', tag, 'src')
+    return refs
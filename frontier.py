@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+from urlnorm import FingerprintSet, fingerprint
+
+
+class Frontier:
+    """
+    Thread-safe crawl frontier shared by the page workers.
+    Every claimed URL reserves one of the max_pages slots until it is either visited or
+    handed back, so concurrent workers can never crawl more than max_pages between them.
+    URLs are deduplicated by urlnorm.fingerprint, i.e. after canonicalization.
+    queue / seen / visited can be swapped for the disk-backed versions in spill.py.
+    """
+
+    def __init__(self, max_pages, per_host=4, host_delay=0.0, seen=None, queue=None, visited=None):
+        self.max_pages = max_pages
+        self.per_host = max(1, int(per_host))
+        self.host_delay = host_delay
+        self.queue = queue if queue is not None else deque()
+        # Fingerprints of everything queued or visited, so nothing is queued twice
+        self.seen = seen if seen is not None else FingerprintSet()
+        self.visited = visited if visited is not None else set()
+        self.claimed = 0  # Visited pages + pages currently being worked on
+        self.in_flight = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.host_slots = {}
+        self.host_next_start = {}
+        self.host_delays = {}  # Per-host overrides of host_delay, e.g. robots.txt Crawl-delay
+
+    def add(self, url):
+        fp = fingerprint(url)
+        with self.cond:
+            if self.closed or not self.seen.add(fp):
+                return False
+            self.queue.append(url)
+            self.cond.notify()
+            return True
+
+    def restore(self, visited, queued):
+        """Seed the frontier from a checkpoint: visited pages keep their page slots"""
+        with self.cond:
+            self.visited.update(visited)
+            for url in visited:
+                self.seen.add(fingerprint(url))
+            self.claimed += len(visited)
+            for url in queued:
+                if self.seen.add(fingerprint(url)):
+                    self.queue.append(url)
+            self.cond.notify_all()
+
+    def has_budget(self):
+        with self.cond:
+            return self.claimed < self.max_pages
+
+    def claim(self):
+        """
+        Block until a URL is available and return it, or return None once the crawl is
+        over (stopped, budget used up, or nothing queued) and no page is left in flight.
+        A full budget isn't the end while pages are in flight: one that turns out unreachable
+        hands its slot back and the next queued URL gets it.
+        """
+        with self.cond:
+            while True:
+                if self.closed:
+                    return None
+                if self.queue and self.claimed < self.max_pages:
+                    self.claimed += 1
+                    self.in_flight += 1
+                    return self.queue.popleft()
+                if self.in_flight == 0:
+                    return None
+                self.cond.wait(0.5)
+
+    def visit(self, url):
+        """Mark a claimed URL as visited. Returns its 1-based page number"""
+        with self.cond:
+            self.visited.add(url)
+            return len(self.visited)
+
+    def release(self, url, counted=True):
+        """Finish a claimed URL. counted=False hands its page slot back (e.g. it was unreachable)"""
+        with self.cond:
+            self.in_flight -= 1
+            if not counted:
+                self.claimed -= 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def set_host_delay(self, host, seconds):
+        with self.cond:
+            self.host_delays[host.lower()] = seconds
+
+    def host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.cond:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host)
+                self.host_slots[host] = slot
+            return host, slot
+
+    def polite(self, url):
+        """
+        Context manager for one page fetch: at most per_host fetches to the same host at
+        once, and fetch starts to a host spaced at least host_delay seconds apart.
+        """
+        return _PoliteFetch(self, url)
+
+
+class _PoliteFetch:
+    def __init__(self, frontier, url):
+        self.frontier = frontier
+        self.host, self.slot = frontier.host_slot(url)
+
+    def __enter__(self):
+        self.slot.acquire()
+        frontier = self.frontier
+        delay = frontier.host_delays.get(self.host, frontier.host_delay)
+        if delay:
+            with frontier.cond:
+                now = time.monotonic()
+                start = max(now, frontier.host_next_start.get(self.host, now))
+                frontier.host_next_start[self.host] = start + delay
+            if start > now:
+                # close() (a stopped crawl) ends the wait early
+                with frontier.cond:
+                    frontier.cond.wait_for(lambda: frontier.closed, start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self.slot.release()
+        return False
@@ -0,0 +1,288 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests import exceptions
+
+# Answers that mean "not now" rather than "never"
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+# Statuses that tell us the origin is overloaded, the concurrency limit backs off on them
+THROTTLE_STATUSES = frozenset([429, 503])
+RETRY_ERRORS = (exceptions.ConnectionError, exceptions.Timeout, exceptions.ChunkedEncodingError)
+
+
+class SchedulerClosed(Exception):
+    """The crawl was stopped while a request was waiting for its turn"""
+
+
+def parse_retry_after(value, now=None):
+    """Retry-After in seconds (delta-seconds or an HTTP date), None when missing or unreadable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class TokenBucket:
+    """rate tokens per second, at most burst of them saved up. rate=None never waits"""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """Take one token. Returns 0 on success, else the seconds until one is available"""
+        if not self.rate:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class _Host:
+    """Scheduling state of one host. Only touched with HostScheduler.lock held"""
+
+    def __init__(self, name, scheduler):
+        self.name = name
+        self.cond = threading.Condition(scheduler.lock)
+        self.bucket = TokenBucket(scheduler.rate, scheduler.burst)
+        self.limit = float(scheduler.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0  # Retry-After / 429 pause, monotonic time
+        self.last_decrease = 0.0
+        self.latency = None  # EWMA of the time to response headers
+        self.best_latency = None
+
+
+class _Slot:
+    def __init__(self, scheduler, url):
+        self.scheduler = scheduler
+        self.url = url
+
+    def __enter__(self):
+        self.host = self.scheduler.acquire(self.url)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = time.perf_counter() - self.started
+        self.scheduler.release(self.host, latency=None if exc_type else latency, failed=exc_type is not None)
+        return False
+
+
+class HostScheduler:
+    """
+    Per-host admission for every request of a crawl (pages, assets, stylesheets, robots and
+    sitemaps through HttpClient, rendered pages through slot()):
+
+    - at most `limit` requests in flight per host. The limit is adaptive (AIMD): +1/limit
+      per good response, halved on 429/503, 5xx, connection errors or when the time to
+      headers climbs to latency_factor times the best seen. It stays between 1 and
+      max_concurrency, and only drops once per cooldown so one burst doesn't collapse it.
+    - starts per host paced by a token bucket when rate (requests/s) is set.
+    - transient failures (RETRY_STATUSES, RETRY_ERRORS) are retried up to `retries` times
+      with full-jitter exponential backoff, or after Retry-After when the server sent one.
+      A Retry-After pauses the whole host, not just the request that got it.
+    """
+
+    def __init__(self, max_concurrency=4, rate=None, burst=1, retries=3, backoff=0.5, max_backoff=30.0,
+                 max_retry_after=120.0, adaptive=True, latency_factor=4.0, cooldown=1.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate = rate
+        self.burst = burst
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.adaptive = adaptive
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.hosts = {}
+        self.closed = threading.Event()
+        self.retried = 0
+        self.throttled = 0
+        self.gave_up = 0
+
+    def host(self, url):
+        name = urlparse(url).netloc.lower()
+        with self.lock:
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = _Host(name, self)
+            return host
+
+    def acquire(self, url, cancel=None):
+        """
+        Block until the host of url may take one more request. Returns its _Host.
+        cancel (cancel.CancelToken): give up with Cancelled at its deadline
+        """
+        host = self.host(url)
+        with host.cond:
+            while True:
+                if self.closed.is_set():
+                    raise SchedulerClosed(url)
+                if cancel is not None:
+                    cancel.check()
+                now = time.monotonic()
+                if host.blocked_until > now:
+                    wait = host.blocked_until - now
+                elif host.in_flight >= int(host.limit):
+                    wait = 1.0
+                else:
+                    wait = host.bucket.take(now)
+                    if not wait:
+                        host.in_flight += 1
+                        return host
+                host.cond.wait(cancel.timeout(wait) if cancel is not None else wait)
+
+    def release(self, host, status=None, latency=None, failed=False):
+        """Free the slot and feed the outcome into the concurrency limit"""
+        with host.cond:
+            host.in_flight -= 1
+            if self.adaptive:
+                if failed or status in THROTTLE_STATUSES or (status and status >= 500):
+                    self._decrease(host)
+                elif latency is not None and self._slow(host, latency):
+                    self._decrease(host)
+                else:
+                    host.limit = min(self.max_concurrency, host.limit + 1 / host.limit)
+            host.cond.notify_all()
+
+    def _slow(self, host, latency):
+        host.latency = latency if host.latency is None else host.latency * 0.8 + latency * 0.2
+        if host.best_latency is None or host.latency < host.best_latency:
+            host.best_latency = host.latency
+        # Ignore jitter on fast local responses, only a clear trend counts
+        return host.latency > 0.05 and host.latency > host.best_latency * self.latency_factor
+
+    def _decrease(self, host):
+        now = time.monotonic()
+        if now - host.last_decrease < self.cooldown:
+            return
+        host.last_decrease = now
+        host.limit = max(1.0, host.limit / 2)
+
+    def block(self, host, seconds):
+        with host.cond:
+            host.blocked_until = max(host.blocked_until, time.monotonic() + seconds)
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def slot(self, url):
+        """with scheduler.slot(url): ... for fetches that don't go through request()"""
+        return _Slot(self, url)
+
+    def request(self, url, send, stream=False, cancel=None):
+        """
+        Run send() (one HTTP request returning a requests.Response) under the host's limits,
+        retrying transient failures. The last answer is returned even when it is still a
+        429/5xx, callers check the status as before.
+        With stream=True the slot is held until the response is closed, so callers must close
+        it (with ... as response).
+        cancel: waits for a slot, a backoff or a Retry-After end at its deadline with Cancelled.
+        """
+        attempt = 0
+        while True:
+            host = self.acquire(url, cancel)
+            started = time.perf_counter()
+            try:
+                response = send()
+            except RETRY_ERRORS:
+                self.release(host, failed=True)
+                if attempt >= self.retries:
+                    self.count('gave_up')
+                    raise
+                self.wait(self.backoff_delay(attempt), cancel)
+                attempt += 1
+                self.count('retried')
+                continue
+            except BaseException:
+                self.release(host)
+                raise
+
+            latency = time.perf_counter() - started
+            status = response.status_code
+            if status in RETRY_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = self.backoff_delay(attempt) if retry_after is None else min(retry_after, self.max_retry_after)
+                if status in THROTTLE_STATUSES:
+                    self.count('throttled')
+                # Throttling pauses every request to the host, a bad gateway only this one
+                paused = retry_after is not None or status in THROTTLE_STATUSES
+                if paused:
+                    self.block(host, delay)
+                if attempt < self.retries:
+                    response.close()
+                    self.release(host, status=status, latency=latency)
+                    if not paused:
+                        self.wait(delay, cancel)
+                    attempt += 1
+                    self.count('retried')
+                    continue
+                self.count('gave_up')
+
+            if not stream:
+                self.release(host, status=status, latency=latency)
+                return response
+            self.release_on_close(response, host, status, latency)
+            return response
+
+    def release_on_close(self, response, host, status, latency):
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.release(host, status=status, latency=latency)
+
+        response.close = close_and_release
+
+    def wait(self, seconds, cancel=None):
+        if cancel is not None:
+            seconds = cancel.timeout(seconds)
+        if self.closed.wait(seconds):
+            raise SchedulerClosed("stopped")
+        if cancel is not None:
+            cancel.check()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def close(self):
+        """Wake every waiting request with SchedulerClosed, e.g. when the crawl is stopped"""
+        self.closed.set()
+        with self.lock:
+            hosts = list(self.hosts.values())
+        for host in hosts:
+            with host.cond:
+                host.cond.notify_all()
+
+    def limits(self):
+        with self.lock:
+            return {name: int(host.limit) for name, host in self.hosts.items()}
+
+    def summary(self):
+        limits = ", ".join(f"{name} {limit}" for name, limit in sorted(self.limits().items()))
+        return f"{self.retried} retries, {self.throttled} throttled, {self.gave_up} gave up; concurrency {limits or '-'}"
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class HttpCache:
+    """
+    Persistent response cache for incremental re-mirrors. Bodies are stored with their
+    ETag / Last-Modified validators so the next run can send a conditional request and
+    reuse the stored bytes on a 304.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8', 'ignore')).hexdigest()
+        folder = self.cache_dir / key[:2]
+        return folder / f"{key}.body", folder / f"{key}.json"
+
+    def lookup(self, url, require_body=True):
+        """
+        Returns the stored metadata for url, or None if nothing usable is cached.
+        require_body=False is for streamed downloads, whose body lives in the mirror itself.
+        """
+        body_path, meta_path = self.paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if require_body and not body_path.exists():
+            return None
+        meta['body_path'] = str(body_path)
+        return meta
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read_body(self, entry):
+        with open(entry['body_path'], 'rb') as f:
+            return f.read()
+
+    def store(self, url, response):
+        """Keep the body only when the server gave us something to revalidate against"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+
+        body_path, meta_path = self.paths(url)
+        body_path.parent.mkdir(exist_ok=True)
+        # Write to a per-thread temp name first so a concurrent reader never sees half a file
+        tmp_body = body_path.with_name(body_path.name + self.tmp_suffix())
+        with open(tmp_body, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_body, body_path)
+        self.write_meta(url, response, len(response.content))
+
+    def store_validators(self, url, response, size):
+        """Like store, but only the validators. Used for streamed bodies written straight to the mirror"""
+        if not response.headers.get('ETag') and not response.headers.get('Last-Modified'):
+            return
+        body_path, meta_path = self.paths(url)
+        body_path.parent.mkdir(exist_ok=True)
+        # An older buffered copy would no longer match the validators
+        body_path.unlink(missing_ok=True)
+        self.write_meta(url, response, size)
+
+    def write_meta(self, url, response, size):
+        body_path, meta_path = self.paths(url)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type', ''),
+            'size': size,
+        }
+        tmp_meta = meta_path.with_name(meta_path.name + self.tmp_suffix())
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def tmp_suffix(self):
+        return f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def record_hit(self, size):
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def summary(self):
+        return f"{self.hits} revalidated, {self.misses} fetched, {self.bytes_saved // 1024}KB saved"
@@ -0,0 +1,366 @@
+import socket
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from metrics import current_fetch
+from cancel import Cancelled
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+PAGE_ACCEPT = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+READ_CHUNK = 64 * 1024
+
+# Sent with every request, pages and assets alike
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Connection': 'keep-alive',
+}
+
+
+class DnsCache:
+    """
+    getaddrinfo results for the connections of one adapter, so repeated connections to a
+    host skip the resolver. Nothing process-wide is patched; at most max_entries hosts are
+    kept, the least recently used one is dropped first.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """Addresses (family, sockaddr) of host in resolver order"""
+        key = (host, port, allowed_gai_family())
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                return entry[1]
+        started = time.perf_counter()
+        result = [(family, sockaddr) for family, _, _, _, sockaddr in
+                  socket.getaddrinfo(host.strip('[]'), port, key[2], socket.SOCK_STREAM)]
+        timing = current_fetch()
+        if timing:
+            timing.dns += time.perf_counter() - started
+        with self.lock:
+            self.entries[key] = (now + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Sockets used by the request this thread is sending, when it runs under a deadline watchdog
+_request_sockets = threading.local()
+
+
+def _note_socket(sock):
+    sockets = getattr(_request_sockets, 'sockets', None)
+    if sockets is not None and sock is not None:
+        sockets.append(sock)
+
+
+def shutdown_sockets(sockets):
+    for sock in list(sockets):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            pass
+
+
+class _TimedConnect:
+    """
+    Adds the TCP (+TLS) setup time of new connections to the current FetchTiming, and
+    hands the socket to the adapter's ConnectionRegistry and the request's watchdog.
+    With the adapter's DnsCache the host is looked up there and urllib3 connects to the
+    addresses it gives (TLS still checks the host name, not the address).
+    """
+    registry = None
+    dns_cache = None
+
+    def _new_conn(self):
+        if self.dns_cache is None:
+            return super()._new_conn()
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        try:
+            for family, sockaddr in addresses:
+                # A numeric address, create_connection's own lookup of it doesn't hit the resolver
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+        finally:
+            self._dns_host = host
+        if error is None:
+            raise NameResolutionError(self.host, self, socket.gaierror(f"no addresses for {host}"))
+        raise error
+
+    def request(self, *args, **kwargs):
+        # A reused keep-alive connection: connect() below isn't called
+        _note_socket(self.sock)
+        return super().request(*args, **kwargs)
+
+    def connect(self):
+        timing = current_fetch()
+        dns_before = timing.dns if timing else 0.0
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            if timing:
+                # create_connection() resolves the host too, that part is already in timing.dns
+                timing.connect += time.perf_counter() - started - (timing.dns - dns_before)
+        if self.registry is not None and self.sock is not None:
+            self.registry.add(self.sock)
+        _note_socket(self.sock)
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class ConnectionRegistry:
+    """
+    Every socket an adapter opened, so abort() can cut the ones blocked in a read. Sockets,
+    not connections: a response read to the close of the connection owns the socket alone.
+    """
+
+    def __init__(self):
+        self.sockets = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def add(self, sock):
+        with self.lock:
+            self.sockets.add(sock)
+
+    def abort(self):
+        """Shut the sockets down: reads waiting on them return at once with an error"""
+        with self.lock:
+            sockets = list(self.sockets)
+        shutdown_sockets(sockets)
+
+
+class _TrackedPool:
+    # Set on the per-adapter subclasses made by TimedAdapter
+    registry = None
+    dns_cache = None
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.registry = self.registry
+        conn.dns_cache = self.dns_cache
+        return conn
+
+
+class TimedHTTPConnectionPool(_TrackedPool, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_TrackedPool, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    def __init__(self, *args, cache_dns=True, **kwargs):
+        # init_poolmanager runs inside HTTPAdapter.__init__
+        self.registry = ConnectionRegistry()
+        self.dns_cache = DnsCache() if cache_dns else None
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        tracked = {'registry': self.registry, 'dns_cache': self.dns_cache}
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('TrackedHTTPConnectionPool', (TimedHTTPConnectionPool,), tracked),
+            'https': type('TrackedHTTPSConnectionPool', (TimedHTTPSConnectionPool,), tracked),
+        }
+
+
+def read_body(response, cancel):
+    """response.content, read in chunks with a cancel check between them. Closes the response"""
+    try:
+        chunks = []
+        for chunk in response.iter_content(READ_CHUNK):
+            cancel.check()
+            chunks.append(chunk)
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+    finally:
+        # Fully read: the connection goes back to the pool, otherwise it is dropped
+        response.close()
+
+
+class HttpClient:
+    """
+    Shared keep-alive session used by every fetch path. Connections are pooled per host
+    by the adapter, so pool_maxsize should be at least the number of download workers.
+    With a host_scheduler.HostScheduler every request is rate limited and retried by it.
+    cancel (cancel.CancelToken) is checked before and during every request, and cancelling
+    it shuts down the sockets of requests in flight. A request can pass its own token
+    (cancel=, e.g. with a page deadline) derived from it.
+    """
+
+    def __init__(self, pool_connections=16, pool_maxsize=32, headers=None, cache_dns=True, cache=None, scheduler=None,
+                 cancel=None):
+        self.cache = cache
+        self.scheduler = scheduler
+        self.cancel = cancel
+        self.session = requests.Session()
+        adapter = TimedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, cache_dns=cache_dns)
+        self.registry = adapter.registry
+        self.dns_cache = adapter.dns_cache
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if cancel is not None:
+            cancel.on_cancel(self.registry.abort)
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+    def get(self, url, **kwargs):
+        """
+        GET through the session. With a cache attached, plain (non-streamed) GETs are sent
+        as conditional requests and a 304 is answered from the stored body, so callers
+        always see a normal 200 response. response.from_cache tells them which one it was.
+        """
+        if self.cache is None or kwargs.get('stream'):
+            return self.send('GET', url, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.cache.conditional_headers(entry))
+            kwargs['headers'] = headers
+
+        response = self.send('GET', url, **kwargs)
+        response.from_cache = False
+        if response.status_code == 304 and entry:
+            try:
+                response._content = self.cache.read_body(entry)
+            except OSError:
+                # Stored body vanished underneath us, fetch it again without validators
+                kwargs['headers'] = {k: v for k, v in kwargs['headers'].items()
+                                     if k not in ('If-None-Match', 'If-Modified-Since')}
+                return self.get_uncached(url, **kwargs)
+            response.status_code = 200
+            response.from_cache = True
+            if entry.get('content_type'):
+                response.headers['Content-Type'] = entry['content_type']
+            self.cache.record_hit(len(response._content))
+            return response
+        return self.remember(url, response)
+
+    def get_uncached(self, url, **kwargs):
+        return self.remember(url, self.send('GET', url, **kwargs))
+
+    def remember(self, url, response):
+        response.from_cache = False
+        if response.status_code == 200:
+            self.cache.record_miss()
+            try:
+                self.cache.store(url, response)
+            except OSError:
+                pass
+        return response
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.send('HEAD', url, **kwargs)
+
+    def send(self, method, url, cancel=None, **kwargs):
+        cancel = cancel or self.cancel
+        buffered = False
+        watchdog = None
+        if cancel is not None:
+            cancel.check()
+            kwargs['timeout'] = cancel.timeout(kwargs.get('timeout'))
+            # Read the body ourselves so a stop or deadline lands between chunks, not after it all
+            buffered = method != 'HEAD' and not kwargs.get('stream')
+            if buffered:
+                kwargs['stream'] = True
+            remaining = cancel.remaining()
+            if remaining is not None:
+                # A read blocked on a trickling server sees no timeout: cut its socket at the deadline
+                sockets = _request_sockets.sockets = []
+                watchdog = threading.Timer(remaining, shutdown_sockets, args=(sockets,))
+                watchdog.daemon = True
+                watchdog.start()
+        def request():
+            timing = current_fetch()
+            if timing:
+                timing.restart()
+            return self.session.request(method, url, **kwargs)
+
+        response = None
+        try:
+            if self.scheduler is None:
+                response = request()
+            else:
+                response = self.scheduler.request(url, request, stream=kwargs.get('stream', False), cancel=cancel)
+            if buffered:
+                read_body(response, cancel)
+        except Cancelled:
+            raise
+        except Exception:
+            # An aborted socket surfaces as a connection error, report it as what it was
+            if cancel is not None:
+                cancel.check()
+            raise
+        finally:
+            _request_sockets.sockets = None
+            if watchdog is not None:
+                if response is not None and kwargs.get('stream') and not buffered:
+                    self.cancel_on_close(response, watchdog)
+                else:
+                    watchdog.cancel()
+        return self.timed(response)
+
+    def cancel_on_close(self, response, watchdog):
+        """A streamed response stays under its deadline until the caller closes it"""
+        close = response.close
+
+        def close_and_cancel():
+            watchdog.cancel()
+            close()
+
+        response.close = close_and_cancel
+
+    def timed(self, response):
+        """Status and time to headers as seen on the wire (before a 304 is turned into a 200)"""
+        timing = current_fetch()
+        if timing:
+            timing.status = response.status_code
+            timing.ttfb = response.elapsed.total_seconds()
+            timing.reason = response.reason
+            timing.headers = response.headers
+        return response
+
+    def close(self):
+        self.session.close()
+        if self.dns_cache is not None:
+            self.dns_cache.clear()
@@ -0,0 +1,253 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+MAX_REQUEST_RECORDS = 50000  # Per-request rows kept for metrics.json, aggregates are always complete
+
+_local = threading.local()
+
+
+class FetchTiming:
+    """
+    Timings of the fetch running on the current thread. http_client fills in DNS, connect
+    and status as the request goes; everything is in seconds. The clock restarts when the
+    request is actually sent, so waits for a host slot and failed attempts aren't counted.
+    Only numbers and headers are kept, never the response (it holds the body).
+    """
+
+    __slots__ = ("started", "dns", "connect", "ttfb", "status", "reason", "headers")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.dns = 0.0
+        self.connect = 0.0  # TCP + TLS, without the DNS part
+        self.ttfb = None
+        self.status = None
+        self.reason = None  # Reason + headers of the last response, for archive records
+        self.headers = None
+
+    def restart(self):
+        """The request goes out now: scheduler waits and earlier attempts are not part of it"""
+        self.started = time.perf_counter()
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = None
+
+
+def start_fetch():
+    timing = _local.timing = FetchTiming()
+    return timing
+
+
+def current_fetch():
+    return getattr(_local, 'timing', None)
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'avg': round(self.total / self.count, 6) if self.count else 0.0,
+            'max': round(self.max, 6),
+        }
+
+
+class _Stage:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.profiler = self.metrics.thread_profiler()
+        if self.profiler:
+            self.metrics.local.active = True
+            self.profiler.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        if self.profiler:
+            self.profiler.disable()
+            self.metrics.local.active = False
+        self.metrics.add_stage(self.name, seconds)
+        return False
+
+
+class CrawlMetrics:
+    """
+    Structured counters for one crawl: every page/asset fetch (DNS, connect, TTFB, download,
+    bytes, status), time spent per stage (parse, extract, rewrite, write, ...) and errors
+    by where they happened and their exception class.
+
+    hooks: callables hook(name, seconds), called after every stage and fetch ("fetch_<kind>").
+    profile=True runs the stages under cProfile (one profiler per thread, merged in write()).
+    """
+
+    def __init__(self, profile=False, max_requests=MAX_REQUEST_RECORDS):
+        self.lock = threading.Lock()
+        self.max_requests = max_requests
+        self.started = time.time()
+        self.hooks = []
+        self.requests = []
+        self.dropped_requests = 0
+        self.fetch_counts = defaultdict(int)  # (kind, status) -> count
+        self.fetch_bytes = defaultdict(int)  # kind -> bytes
+        self.fetch_times = defaultdict(_Stat)  # (kind, phase) -> stat
+        self.stages = defaultdict(_Stat)
+        self.errors = defaultdict(int)  # (where, exception class) -> count
+        self.pipeline = {}  # Stage -> utilization report, see pipeline.Pipeline.report
+        self.profile = profile
+        self.profilers = []
+        self.local = threading.local()
+
+    def stage(self, name):
+        """with metrics.stage("parse"): ..."""
+        return _Stage(self, name)
+
+    def thread_profiler(self):
+        # Nested stages run under the profiler their outer stage already enabled
+        if not self.profile or getattr(self.local, 'active', False):
+            return None
+        profiler = getattr(self.local, 'profiler', None)
+        if profiler is None:
+            import cProfile
+            profiler = self.local.profiler = cProfile.Profile()
+            with self.lock:
+                self.profilers.append(profiler)
+        return profiler
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            self.stages[name].add(seconds)
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def record_fetch(self, kind, url, size=0, status=None, timing=None):
+        """kind: 'page' or the asset class. timing: the FetchTiming of this fetch"""
+        timing = timing or current_fetch()
+        now = time.perf_counter()
+        total = now - timing.started if timing else 0.0
+        status = status or (timing.status if timing else None) or 'error'
+        phases = {'total': total}
+        if timing:
+            phases['dns'] = timing.dns
+            phases['connect'] = timing.connect
+            if timing.ttfb is not None:
+                phases['ttfb'] = timing.ttfb
+                phases['download'] = max(0.0, total - timing.ttfb)
+
+        with self.lock:
+            self.fetch_counts[(kind, str(status))] += 1
+            self.fetch_bytes[kind] += size
+            for phase, seconds in phases.items():
+                self.fetch_times[(kind, phase)].add(seconds)
+            if len(self.requests) < self.max_requests:
+                record = {'url': url, 'kind': kind, 'status': status, 'bytes': size}
+                record.update({phase: round(seconds, 6) for phase, seconds in phases.items()})
+                self.requests.append(record)
+            else:
+                self.dropped_requests += 1
+        for hook in self.hooks:
+            hook(f"fetch_{kind}", total)
+
+    def error(self, where, exc):
+        with self.lock:
+            self.errors[(where, type(exc).__name__)] += 1
+
+    def report(self):
+        with self.lock:
+            fetches = defaultdict(lambda: {'status': {}, 'bytes': 0, 'seconds': {}})
+            for (kind, status), count in self.fetch_counts.items():
+                fetches[kind]['status'][status] = count
+            for kind, size in self.fetch_bytes.items():
+                fetches[kind]['bytes'] = size
+            for (kind, phase), stat in self.fetch_times.items():
+                fetches[kind]['seconds'][phase] = stat.to_dict()
+            return {
+                'started': self.started,
+                'duration': round(time.time() - self.started, 3),
+                'fetches': dict(fetches),
+                'stages': {name: stat.to_dict() for name, stat in self.stages.items()},
+                'errors': [{'where': where, 'error': name, 'count': count}
+                           for (where, name), count in sorted(self.errors.items())],
+                'pipeline': dict(self.pipeline),
+                'requests': list(self.requests),
+                'requests_dropped': self.dropped_requests,
+            }
+
+    def prometheus(self, prefix="scraper"):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        with self.lock:
+            family("fetches_total", "counter", "Page and asset fetches by kind and HTTP status")
+            for (kind, status), count in sorted(self.fetch_counts.items()):
+                lines.append(f'{prefix}_fetches_total{{kind="{kind}",status="{status}"}} {count}')
+            family("fetch_bytes_total", "counter", "Bytes downloaded by kind")
+            for kind, size in sorted(self.fetch_bytes.items()):
+                lines.append(f'{prefix}_fetch_bytes_total{{kind="{kind}"}} {size}')
+            family("fetch_seconds", "summary", "Fetch time by kind and phase (dns, connect, ttfb, download, total)")
+            for (kind, phase), stat in sorted(self.fetch_times.items()):
+                labels = f'kind="{kind}",phase="{phase}"'
+                lines.append(f'{prefix}_fetch_seconds_sum{{{labels}}} {stat.total:.6f}')
+                lines.append(f'{prefix}_fetch_seconds_count{{{labels}}} {stat.count}')
+            family("stage_seconds", "summary", "Time spent per crawl stage")
+            for name, stat in sorted(self.stages.items()):
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stat.total:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stat.count}')
+            family("pipeline_utilization", "gauge", "Busy share of each crawl pipeline stage's workers")
+            for name, stats in self.pipeline.items():
+                lines.append(f'{prefix}_pipeline_utilization{{stage="{name}"}} {stats["utilization"]}')
+            family("errors_total", "counter", "Errors by where they happened and exception class")
+            for (where, name), count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_errors_total{{where="{where}",error="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir):
+        """metrics.json + metrics.prom (+ profile.txt/profile.pstats when profiling)"""
+        with open(output_dir / "metrics.json", 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=1)
+        with open(output_dir / "metrics.prom", 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        if self.profilers:
+            import io
+            import pstats
+            stats = None
+            for profiler in self.profilers:
+                if stats is None:
+                    stats = pstats.Stats(profiler)
+                else:
+                    stats.add(profiler)
+            stats.dump_stats(str(output_dir / "profile.pstats"))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats('cumulative').print_stats(40)
+            with open(output_dir / "profile.txt", 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+
+    def summary(self):
+        with self.lock:
+            fetches = sum(self.fetch_counts.values())
+            errors = sum(self.errors.values())
+            stages = ", ".join(f"{name} {stat.total:.2f}s" for name, stat in sorted(self.stages.items()))
+        return f"{fetches} fetches, {errors} errors; {stages}"
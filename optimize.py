@@ -0,0 +1,263 @@
+import gzip
+import os
+import re
+import time
+from pathlib import Path
+from urllib.parse import unquote
+
+from asset_store import MANIFEST_NAME
+from css_assets import REWRITTEN_MARKER
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MINIFY_EXTENSIONS = {'.html': 'html', '.htm': 'html', '.css': 'css', '.js': 'js', '.mjs': 'js'}
+COMPRESS_EXTENSIONS = frozenset(['.html', '.htm', '.css', '.js', '.mjs', '.svg', '.json', '.xml', '.txt',
+                                 '.map', '.webmanifest', '.ttf', '.otf', '.eot'])
+# Crawl bookkeeping, never served
+SKIP_NAMES = frozenset([MANIFEST_NAME, 'metrics.json', 'crawl.log', 'profile.txt'])
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Only text between tags is touched; tags (quoted attributes may contain '>') are copied as they are
+HTML_TOKEN_RE = re.compile(r'''<(?:[^>"']|"[^"]*"|'[^']*')*>|[^<]+|<''')
+HTML_RAW_RE = re.compile(r'<(pre|textarea|script|style)\b', re.IGNORECASE)
+# Not \s: a non-breaking space (U+00A0) must stay
+SPACE_RE = re.compile(r'[ \t\r\n\f]+')
+CSS_TOKEN_RE = re.compile(r'''("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')|(/\*.*?\*/)|([ \t\r\n\f]+)''', re.DOTALL)
+CSS_TIGHT = '{};,'
+
+# Build-tool content hashes in a file name: app.3f2a9c01.js, main-5b2c8e1a9d.css
+FINGERPRINT_RE = re.compile(r'[.\-_](?=[0-9a-f]*[a-f])(?=[0-9a-f]*\d)[0-9a-f]{8,}(?=[.\-_]|$)', re.IGNORECASE)
+# assets/<kind>/<stem>-<url digest><ext>, see asset_store.AssetStore.path_for
+STORED_NAME_RE = re.compile(r'^(?P<stem>.*)-[0-9a-f]{12}(?P<ext>\.[\w.]*)?$')
+
+
+def whitespace(run):
+    return "\n" if "\n" in run else " "
+
+
+def minify_html(text):
+    """
+    Collapses whitespace runs in text nodes to one space (a newline if the run had one), which
+    is what the browser renders anyway unless CSS asks for white-space: pre. Tags, <pre>,
+    <textarea>, <script> and <style> bodies are left exactly as they are.
+    """
+    out = []
+    raw_until = None
+    for match in HTML_TOKEN_RE.finditer(text):
+        token = match.group(0)
+        if raw_until is not None:
+            out.append(token)
+            if token.lower().startswith(raw_until):
+                raw_until = None
+        elif token.startswith('<'):
+            out.append(token)
+            raw = HTML_RAW_RE.match(token)
+            if raw and not token.endswith('/>'):
+                raw_until = f"</{raw.group(1).lower()}"
+        else:
+            out.append(SPACE_RE.sub(lambda m: whitespace(m.group(0)), token))
+    return "".join(out)
+
+
+def minify_css(text):
+    """
+    Drops comments (but keeps /*! license */ ones) and collapses whitespace, removing it
+    next to { } ; and , only. Strings are never touched. The local-mirror marker stays last.
+    """
+    marked = text.rstrip().endswith(REWRITTEN_MARKER)
+    if marked:
+        text = text.rstrip()[:-len(REWRITTEN_MARKER)]
+
+    def comment(match):
+        if match.group(2) is not None and not match.group(2).startswith('/*!'):
+            return " "  # a/**/b must not become ab
+        return match.group(0)
+
+    text = CSS_TOKEN_RE.sub(comment, text)
+
+    def space(match):
+        if match.group(3) is None:
+            return match.group(0)
+        before = text[match.start() - 1] if match.start() else ''
+        after = text[match.end()] if match.end() < len(text) else ''
+        if not before or not after or before in CSS_TIGHT or after in CSS_TIGHT:
+            return ""
+        return " "
+
+    text = CSS_TOKEN_RE.sub(space, text)
+    if marked:
+        text = text + "\n" + REWRITTEN_MARKER + "\n"
+    return text
+
+
+def minify_js(text):
+    """
+    Without a real JS parser only layout is safe to touch: indentation, trailing spaces and
+    blank lines. Files with template literals (multi-line strings) or line continuations are
+    left alone, and so is anything already minified.
+    """
+    if '`' in text or '\\\n' in text or '\\\r\n' in text:
+        return text
+    lines = text.splitlines()
+    if not lines or len(text) / len(lines) > 200:
+        return text
+    return "\n".join(line.strip() for line in lines if line.strip()) + "\n"
+
+
+MINIFIERS = {'html': minify_html, 'css': minify_css, 'js': minify_js}
+
+
+def write_sidecar(path, suffix, body):
+    tmp = path.with_name(path.name + suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(body)
+    os.replace(tmp, path.with_name(path.name + suffix))
+
+
+def remove_sidecar(path, suffix):
+    try:
+        os.remove(path.with_name(path.name + suffix))
+    except OSError:
+        pass
+
+
+def optimize_file(path, minify=True, compress_min=1024):
+    """
+    Worker side of OutputOptimizer: minify one file in place, then (re)write its .gz / .br
+    sidecars, or remove stale ones. Returns (bytes before, bytes after, gzip bytes, brotli bytes).
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        body = f.read()
+    before = len(body)
+    kind = MINIFY_EXTENSIONS.get(path.suffix.lower())
+    if minify and kind and not path.name.lower().endswith(('.min.js', '.min.css')):
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            text = None
+        if text is not None:
+            minified = MINIFIERS[kind](text).encode('utf-8')
+            if len(minified) < len(body):
+                tmp = path.with_name(path.name + '.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(minified)
+                os.replace(tmp, path)
+                body = minified
+
+    gz_size = br_size = 0
+    if compress_min is not None and len(body) >= compress_min and path.suffix.lower() in COMPRESS_EXTENSIONS:
+        # mtime=0: the same file gives the same .gz on every run
+        packed = gzip.compress(body, 9, mtime=0)
+        if len(packed) < len(body):
+            write_sidecar(path, '.gz', packed)
+            gz_size = len(packed)
+        if brotli is not None:
+            packed = brotli.compress(body, quality=11)
+            if len(packed) < len(body):
+                write_sidecar(path, '.br', packed)
+                br_size = len(packed)
+    if not gz_size:
+        remove_sidecar(path, '.gz')
+    if not br_size:
+        remove_sidecar(path, '.br')
+    return before, len(body), gz_size, br_size
+
+
+def optimize_job(args):
+    return optimize_file(*args)
+
+
+def is_fingerprinted(rel_path):
+    """True for mirrored assets whose original file name carries a content hash (safe to cache forever)"""
+    name = unquote(rel_path.rsplit('/', 1)[-1])
+    match = STORED_NAME_RE.match(name)
+    stem = match.group('stem') if match else os.path.splitext(name)[0]
+    return FINGERPRINT_RE.search(stem) is not None
+
+
+def netlify_headers(paths):
+    """[[headers]] blocks giving fingerprinted assets a one-year immutable Cache-Control"""
+    blocks = []
+    for rel_path in sorted(paths):
+        blocks.append(f'''
+[[headers]]
+  for = "/{rel_path}"
+  [headers.values]
+    Cache-Control = "{IMMUTABLE}"
+''')
+    return "".join(blocks)
+
+
+class OutputOptimizer:
+    """
+    Post-processing of a finished mirror: conservative minification of HTML / CSS / JS and
+    precompressed .gz (and .br when the brotli module is installed) sidecars for text files
+    of at least compress_min bytes, for servers that serve them directly (nginx gzip_static,
+    Caddy precompressed). Files are spread over pool (pipeline.CpuPool).
+    """
+
+    def __init__(self, output_dir, pool, minify=True, compress_min=1024):
+        self.output_dir = Path(output_dir)
+        self.pool = pool
+        self.minify = minify
+        self.compress_min = compress_min
+        self.files = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.gzip_bytes = 0
+        self.brotli_bytes = 0
+        self.seconds = 0.0
+
+    def candidates(self):
+        for folder, dirs, files in os.walk(self.output_dir):
+            for name in files:
+                if name in SKIP_NAMES:
+                    continue
+                ext = os.path.splitext(name)[1].lower()
+                if ext in MINIFY_EXTENSIONS or ext in COMPRESS_EXTENSIONS:
+                    yield os.path.join(folder, name)
+
+    def run(self):
+        started = time.perf_counter()
+        jobs = [(path, self.minify, self.compress_min) for path in self.candidates()]
+        for before, after, gz_size, br_size in self.pool.map(optimize_job, jobs):
+            self.files += 1
+            self.bytes_before += before
+            self.bytes_after += after
+            self.gzip_bytes += gz_size
+            self.brotli_bytes += br_size
+        self.seconds = time.perf_counter() - started
+        return self.report()
+
+    def fingerprinted(self):
+        """Paths (relative to ROOT) of assets that can be cached forever"""
+        assets = self.output_dir / "assets"
+        for folder, dirs, files in os.walk(assets):
+            for name in files:
+                if name.endswith(('.gz', '.br', '.tmp')):
+                    continue
+                rel_path = os.path.relpath(os.path.join(folder, name), self.output_dir).replace("\\", "/")
+                if is_fingerprinted(rel_path):
+                    yield rel_path
+
+    def report(self):
+        return {
+            'files': self.files,
+            'bytes_before': self.bytes_before,
+            'bytes_after': self.bytes_after,
+            'gzip_bytes': self.gzip_bytes,
+            'brotli_bytes': self.brotli_bytes,
+            'seconds': round(self.seconds, 3),
+        }
+
+    def summary(self):
+        saved = self.bytes_before - self.bytes_after
+        text = f"{self.files} files, minified -{saved // 1024}KB, .gz {self.gzip_bytes // 1024}KB"
+        if brotli is not None:
+            text += f", .br {self.brotli_bytes // 1024}KB"
+        return text + f" in {self.seconds:.1f}s"
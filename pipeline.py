@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_STOP = object()
+
+
+class CpuPool:
+    """
+    Worker processes for CPU-bound page work (parse, serialize, rewrite), so it runs on every
+    core instead of queueing on the GIL. processes=0, or a platform that can't start them,
+    runs the work inline on the calling thread.
+    Functions and arguments must be picklable: module-level functions, plain data.
+    """
+
+    def __init__(self, processes=0):
+        self.processes = max(0, int(processes or 0))
+        self.executor = None
+        if self.processes:
+            try:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+            except (OSError, NotImplementedError, ImportError):
+                self.processes = 0
+
+    def run(self, fn, *args):
+        executor = self.executor
+        if executor is None:
+            return fn(*args)
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory); carry on without processes
+            self.executor = None
+            self.processes = 0
+            return fn(*args)
+
+    def map(self, fn, items, chunksize=16):
+        """[fn(item) for item in items], spread over the processes"""
+        executor = self.executor
+        if executor is not None:
+            try:
+                return list(executor.map(fn, items, chunksize=chunksize))
+            except BrokenProcessPool:
+                self.executor = None
+                self.processes = 0
+        return [fn(item) for item in items]
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class ByteGate:
+    """
+    Caps the bytes held by items inside the pipeline (page bodies). acquire() blocks while
+    the cap is reached; a single item over the cap still goes through on its own.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, size):
+        with self.cond:
+            while self.used and self.used + size > self.limit:
+                self.cond.wait()
+            self.used += size
+
+    def release(self, size):
+        with self.cond:
+            self.used -= size
+            self.cond.notify_all()
+
+
+class Stage:
+    """One pipeline step: `workers` threads taking items from a bounded inbox"""
+
+    def __init__(self, name, handler, workers, maxsize):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.inbox = queue.Queue(maxsize) if maxsize else None  # The source stage has no inbox
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy = 0.0  # Seconds spent inside handler, summed over workers
+        self.queue_wait = 0.0  # Seconds items sat in the inbox
+        self.blocked = 0.0  # Seconds upstream waited for room in the inbox (backpressure)
+        self.peak_queue = 0
+
+    def put(self, item):
+        started = time.perf_counter()
+        self.inbox.put((started, item))
+        waited = time.perf_counter() - started
+        size = self.inbox.qsize()
+        with self.lock:
+            self.blocked += waited
+            if size > self.peak_queue:
+                self.peak_queue = size
+
+    def account(self, busy, waited=0.0):
+        with self.lock:
+            self.items += 1
+            self.busy += busy
+            self.queue_wait += waited
+
+    def report(self, wall):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'items': self.items,
+                'busy_s': round(self.busy, 3),
+                'utilization': round(self.busy / (self.workers * wall), 3) if wall else 0.0,
+                'queue_wait_avg_s': round(self.queue_wait / self.items, 4) if self.items else 0.0,
+                'backpressure_s': round(self.blocked, 3),
+                'peak_queue': self.peak_queue,
+            }
+
+
+class Pipeline:
+    """
+    Streaming page pipeline: source stage -> stage -> stage ... with a bounded queue in
+    front of every stage after the first. A full queue blocks the stage feeding it, so a
+    slow step holds the fetchers back instead of letting pages pile up in memory.
+
+    stages: [(name, handler, workers)]. The first handler is called with no argument and
+    returns the next item, or None once there is no more work. Every other handler gets one
+    item and returns what goes to the next stage (None = the item is finished or dropped).
+    on_error(stage name, item, exception) is called when a handler raises; the item is
+    dropped and the worker carries on.
+    """
+
+    def __init__(self, stages, maxsize=8, on_error=None):
+        self.stages = [Stage(name, handler, workers, maxsize if n else 0)
+                       for n, (name, handler, workers) in enumerate(stages)]
+        self.on_error = on_error
+        self.started = None
+        self.finished = None
+
+    def run(self):
+        """Run until the source is exhausted and every queued item went through"""
+        self.started = time.perf_counter()
+        groups = []
+        for index, stage in enumerate(self.stages):
+            target = self.source_worker if index == 0 else self.stage_worker
+            threads = [threading.Thread(target=target, args=(index,), daemon=True,
+                                        name=f"{stage.name}-{n}") for n in range(stage.workers)]
+            for thread in threads:
+                thread.start()
+            groups.append(threads)
+
+        # Shut down front to back: once a stage's workers are gone nothing new reaches the next one
+        for index, threads in enumerate(groups):
+            for thread in threads:
+                thread.join()
+            if index + 1 < len(self.stages):
+                following = self.stages[index + 1]
+                for _ in range(following.workers):
+                    following.inbox.put((None, _STOP))
+        self.finished = time.perf_counter()
+
+    def emit(self, index, item):
+        if item is not None and index + 1 < len(self.stages):
+            self.stages[index + 1].put(item)
+
+    def source_worker(self, index):
+        stage = self.stages[index]
+        while True:
+            started = time.perf_counter()
+            try:
+                item = stage.handler()
+            except Exception as e:
+                self.error(stage, None, e)
+                continue
+            if item is None:
+                return
+            stage.account(time.perf_counter() - started)
+            self.emit(index, item)
+
+    def stage_worker(self, index):
+        stage = self.stages[index]
+        while True:
+            queued_at, item = stage.inbox.get()
+            if item is _STOP:
+                return
+            started = time.perf_counter()
+            try:
+                result = stage.handler(item)
+            except Exception as e:
+                stage.account(time.perf_counter() - started, started - queued_at)
+                self.error(stage, item, e)
+                continue
+            stage.account(time.perf_counter() - started, started - queued_at)
+            self.emit(index, result)
+
+    def error(self, stage, item, exc):
+        if self.on_error:
+            self.on_error(stage.name, item, exc)
+
+    def report(self):
+        """Per stage: items, busy seconds, utilization (busy / workers x wall time), queue wait, backpressure"""
+        end = self.finished or time.perf_counter()
+        wall = end - self.started if self.started else 0.0
+        return {stage.name: stage.report(wall) for stage in self.stages}
+
+    def summary(self):
+        return ", ".join(f"{name} {stats['utilization']:.0%} x{stats['workers']}"
+                         for name, stats in self.report().items())
@@ -1 +1 @@
-pip install customtkinter selenium webdriver-manager beautifulsoup4 requests
+pip install customtkinter selenium webdriver-manager beautifulsoup4 requests lxml
@@ -0,0 +1,136 @@
+import re
+
+SRCSET_POLICIES = ('largest', 'smallest', 'nearest')
+
+# (img, srcset attribute, the src attribute that gets the same file)
+SRCSET_ATTRS = (('srcset', 'src'), ('data-srcset', 'data-src'))
+
+DESCRIPTOR_RE = re.compile(r'^(\d+(?:\.\d+)?|\.\d+)([wxh])$', re.IGNORECASE)
+
+
+def split_descriptors(text):
+    """Descriptor tokens of one candidate; commas inside parentheses don't end the candidate"""
+    tokens, token, depth = [], "", 0
+    for pos, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')' and depth:
+            depth -= 1
+        elif char == ',' and not depth:
+            if token:
+                tokens.append(token)
+            return tokens, pos + 1
+        elif char.isspace() and not depth:
+            if token:
+                tokens.append(token)
+            token = ""
+            continue
+        token += char
+    if token:
+        tokens.append(token)
+    return tokens, len(text)
+
+
+def parse_srcset(value):
+    """
+    [(url, width or None, density or None)] following the HTML srcset rules: URLs may contain
+    commas (/img/w_800,h_600/a.jpg), a trailing comma ends a candidate without descriptors.
+    A candidate without any descriptor is 1x; invalid descriptors drop the candidate.
+    """
+    candidates = []
+    pos, end = 0, len(value or "")
+    while pos < end:
+        while pos < end and (value[pos].isspace() or value[pos] == ','):
+            pos += 1
+        if pos >= end:
+            break
+        start = pos
+        while pos < end and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        if url.endswith(','):
+            url, tokens = url.rstrip(','), []
+        else:
+            tokens, used = split_descriptors(value[pos:])
+            pos += used
+        width = density = None
+        valid = bool(url)
+        for token in tokens:
+            match = DESCRIPTOR_RE.match(token)
+            if not match:
+                valid = False
+                continue
+            number, kind = float(match.group(1)), match.group(2).lower()
+            if kind == 'w' and width is None and density is None and number > 0:
+                width = int(number)
+            elif kind == 'x' and width is None and density is None and number > 0:
+                density = number
+            elif kind != 'h':
+                valid = False
+        if valid:
+            candidates.append((url, width, density if width is None else None))
+    return candidates
+
+
+class SrcsetPolicy:
+    """
+    Picks the one srcset candidate a mirror keeps:
+        largest  - widest / highest density
+        smallest - narrowest / lowest density
+        nearest  - what a browser at `width` CSS pixels and `dpr` would load: the smallest
+                   candidate covering width x dpr pixels (or dpr for x descriptors), the
+                   largest one when none does
+    Plain attributes only, it goes to the parse worker processes.
+    """
+
+    def __init__(self, policy='nearest', width=1280, dpr=1.0):
+        if policy not in SRCSET_POLICIES:
+            raise ValueError(f"Unknown srcset policy: {policy} (expected one of {', '.join(SRCSET_POLICIES)})")
+        self.policy = policy
+        self.width = width
+        self.dpr = dpr
+
+    def choose(self, candidates):
+        """URL of the chosen candidate, None for an empty srcset"""
+        if not candidates:
+            return None
+        if any(width for _, width, _ in candidates):
+            # w and x don't mix in a valid srcset; if they do, the widths win
+            sized = [(width, url) for url, width, _ in candidates if width]
+            needed = self.width * self.dpr
+        else:
+            sized = [(density or 1.0, url) for url, _, density in candidates]
+            needed = self.dpr
+        # Stable on equal sizes: the first one listed wins, as in the browser
+        sized.sort(key=lambda pair: pair[0])
+        if self.policy == 'smallest':
+            return sized[0][1]
+        if self.policy == 'largest':
+            return max(sized, key=lambda pair: pair[0])[1]
+        for size, url in sized:
+            if size >= needed:
+                return url
+        return max(sized, key=lambda pair: pair[0])[1]
+
+    def apply(self, tag, src_too=True):
+        """
+        Point tag's srcset (and data-srcset) at its chosen candidate only, so the rewrite maps
+        it to the one local file. src_too: an <img> also gets it as src / data-src, otherwise
+        its fallback would be a second download of the same picture.
+        Returns (chosen URLs, candidates dropped).
+        """
+        chosen, dropped = [], 0
+        for srcset_attr, src_attr in SRCSET_ATTRS:
+            value = tag.attrs.get(srcset_attr)
+            if not value:
+                continue
+            candidates = parse_srcset(value)
+            url = self.choose(candidates)
+            if url is None:
+                continue
+            tag[srcset_attr] = url
+            if src_too:
+                tag[src_attr] = url
+            chosen.append(url)
+            dropped += len({candidate[0] for candidate in candidates}) - 1
+        return chosen, dropped
@@ -0,0 +1,159 @@
+import re
+from urllib.parse import urljoin
+
+# One scanner for everything rewrite_html touches. Alternatives, in order:
+#   <base ...> tags (removed), quoted attribute values, CSS url(...) and any other quoted string
+TOKEN_RE = re.compile(r'''
+    (?P<base><base\b[^>]*>)
+  | (?<![\w:-])(?P<attr>[\w:-]+)(?P<eq>\s*=\s*)(?:"(?P<dq>[^"<>]*)"|'(?P<sq>[^'<>]*)')
+  | url\((?P<uq>["']?)(?P<uval>[^"'()\s]*)(?P=uq)\)
+  | "(?P<bdq>[^"\s<>]*)"
+  | '(?P<bsq>[^'\s<>]*)'
+''', re.IGNORECASE | re.VERBOSE)
+
+# Same thing minus attributes/base, used inside attribute values such as style="..."
+INNER_RE = re.compile(r'''
+    url\((?P<uq>["']?)(?P<uval>[^"'()\s]*)(?P=uq)\)
+  | "(?P<bdq>[^"\s<>]*)"
+  | '(?P<bsq>[^'\s<>]*)'
+''', re.IGNORECASE | re.VERBOSE)
+
+# Site-absolute folders mapped onto our assets structure for pages saved in a subfolder
+ATTR_PREFIXES = re.compile(
+    r'^(assets/|/css/|/js/|/javascript/|/images?/|/img/|/fonts?/|/videos?/|/audio/|/media/)',
+    re.IGNORECASE
+)
+URL_PREFIXES = re.compile(r'^(assets/|/css/|/images?/|/fonts?/)', re.IGNORECASE)
+PREFIX_TARGETS = {
+    'assets/': '../assets/',
+    '/css/': '../assets/css/',
+    '/js/': '../assets/js/',
+    '/javascript/': '../assets/js/',
+    '/images/': '../assets/images/',
+    '/image/': '../assets/images/',
+    '/img/': '../assets/images/',
+    '/fonts/': '../assets/fonts/',
+    '/font/': '../assets/fonts/',
+    '/videos/': '../assets/videos/',
+    '/video/': '../assets/videos/',
+    '/audio/': '../assets/audio/',
+    '/media/': '../assets/images/',
+}
+
+# Attribute names the prefix rules apply to (href, src, data-src, data-href, content, ...)
+PREFIX_ATTRS = ('href', 'src', 'content')
+
+NOT_RESOLVABLE = ('#', 'data:', 'javascript:', 'mailto:', 'tel:')
+
+
+class HtmlRewriter:
+    """
+    Rewrites downloaded asset URLs to local paths in one scan of the HTML. Each quoted
+    token is looked up in downloaded_files directly (and by its absolute URL), so the
+    cost per page depends on the page size, not on how many assets the crawl has seen.
+    """
+
+    def __init__(self, downloaded_files, base_url, html_subdir="."):
+        self.downloaded_files = downloaded_files
+        self.base_url = base_url
+        self.in_subdir = html_subdir != "."
+
+    def local_path(self, value):
+        """Local path for value, or None if it wasn't downloaded"""
+        root_relative_path = self.downloaded_files.get(value)
+        if root_relative_path is None:
+            if not value or value.startswith(NOT_RESOLVABLE):
+                return None
+            root_relative_path = self.downloaded_files.get(urljoin(self.base_url, value))
+            if root_relative_path is None:
+                return None
+
+        if self.in_subdir:
+            # File is in pages/, asset is at assets/... so we need ../assets/...
+            return "../" + root_relative_path.replace("\\", "/")
+        return root_relative_path.replace("\\", "/")
+
+    def prefixed(self, value, prefixes):
+        if not self.in_subdir:
+            return None
+        match = prefixes.match(value)
+        if not match:
+            return None
+        return PREFIX_TARGETS[match.group(1).lower()] + value[match.end():]
+
+    def rewrite_url(self, match):
+        value = match.group('uval')
+        new_value = self.local_path(value) or self.prefixed(value, URL_PREFIXES)
+        if new_value is None:
+            return match.group(0)
+        quote = match.group('uq')
+        return f"url({quote}{new_value}{quote})"
+
+    def rewrite_quoted(self, match):
+        if match.group('bdq') is not None:
+            value, quote = match.group('bdq'), '"'
+        else:
+            value, quote = match.group('bsq'), "'"
+        new_value = self.local_path(value)
+        if new_value is None:
+            return match.group(0)
+        return f"{quote}{new_value}{quote}"
+
+    def rewrite_inner(self, match):
+        if match.group('uval') is not None:
+            return self.rewrite_url(match)
+        return self.rewrite_quoted(match)
+
+    def rewrite_attr(self, match):
+        if match.group('dq') is not None:
+            value, quote = match.group('dq'), '"'
+        else:
+            value, quote = match.group('sq'), "'"
+
+        new_value = self.local_path(value)
+        if new_value is None and match.group('attr').lower().endswith(PREFIX_ATTRS):
+            new_value = self.prefixed(value, ATTR_PREFIXES)
+        if new_value is None:
+            # style="background: url(...)" and similar still need their inner URLs fixed
+            if 'url(' in value.lower() or ('"' if quote == "'" else "'") in value:
+                new_value = INNER_RE.sub(self.rewrite_inner, value)
+            else:
+                return match.group(0)
+        return f"{match.group('attr')}{match.group('eq')}{quote}{new_value}{quote}"
+
+    def replace(self, match):
+        if match.group('base') is not None:
+            # Clean up <base> tags which might break relative links
+            return ''
+        if match.group('attr') is not None:
+            return self.rewrite_attr(match)
+        return self.rewrite_inner(match)
+
+    def rewrite(self, html):
+        return TOKEN_RE.sub(self.replace, html)
+
+
+def rewrite_html(html, downloaded_files, base_url, html_subdir="."):
+    return HtmlRewriter(downloaded_files, base_url, html_subdir).rewrite(html)
+
+
+class _KeyRecorder:
+    """Stands in for downloaded_files and remembers every key the rewriter asks for"""
+
+    def __init__(self):
+        self.keys = set()
+
+    def get(self, key, default=None):
+        self.keys.add(key)
+        return default
+
+
+def lookup_keys(html, base_url, html_subdir="."):
+    """
+    Every downloaded_files key rewrite_html could look up for this page. With nothing found
+    the rewriter tries each fallback too, so this is a superset of what a real run asks for,
+    and rewriting with just these entries gives the same result as with the whole map.
+    """
+    recorder = _KeyRecorder()
+    HtmlRewriter(recorder, base_url, html_subdir).rewrite(html)
+    return recorder.keys
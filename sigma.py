@@ -1,22 +1,23 @@
-import customtkinter as ctk
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import requests
-from urllib.parse import urljoin, urlparse, unquote
-import os
-import re
 import time
+STARTUP_BEGIN = time.perf_counter()
+
+import customtkinter as ctk
 import threading
-from pathlib import Path
-import mimetypes
-from collections import deque
+from downloader import DEFAULT_BYTE_LIMITS
+from browser_pool import BrowserPool
+from chrome_detect import ChromeDetection
+from ui_events import UiEventQueue
+# crawler (bs4 + requests) is imported on first use / preloaded by the startup check,
+# selenium only when a browser is actually started
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# The activity log keeps the newest LOG_MAX_LINES lines, crawl.log in the output folder has everything
+LOG_MAX_LINES = 2000
+# How often the UI thread applies queued log/status/progress events
+DRAIN_INTERVAL_MS = 100
+
 class WebsiteSourceGetter(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -31,36 +32,48 @@ class WebsiteSourceGetter(ctk.CTk):
         self.progress_var = ctk.DoubleVar(value=0)
         self.progress_text_var = ctk.StringVar(value="")
         self.is_scraping = False
-        self.visited_urls = set()
         self.chrome_available = False
+        self.crawler = None
+        # Per-file / per-crawl byte caps for each resource class, see downloader.DEFAULT_BYTE_LIMITS
+        self.byte_limits = {name: dict(cap) for name, cap in DEFAULT_BYTE_LIMITS.items()}
+        self.browser_pool = BrowserPool(size=2)
+        self.chrome_detection = ChromeDetection()
+        # A cached "Chrome works" that turns out to be wrong is dropped on the first failed launch
+        self.browser_pool.on_start_failure = self.chrome_detection.invalidate
+        # Minimum seconds between two page fetches to the same host
+        self.politeness_delay = 0.1
+        # Crawl threads never touch Tk directly, everything goes through here
+        self.events = UiEventQueue()
+        self.log_lines = 0
         
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(DRAIN_INTERVAL_MS, self.drain_events)
         
         # Run startup check slightly after UI loads so the window appears first
         self.after(200, self.run_startup_checks)
         
     def run_startup_checks(self):
         """Runs the Chrome check in a thread to keep UI responsive"""
+        self.startup_ms = (time.perf_counter() - STARTUP_BEGIN) * 1000
+        self.log(f"System: Window ready in {self.startup_ms:.0f}ms")
         self.log("System: Checking Chrome Driver availability... Please wait.")
         threading.Thread(target=self.check_chrome_availability, daemon=True).start()
 
     def check_chrome_availability(self):
-        """Check if Chrome is available"""
-        try:
-            options = Options()
-            options.add_argument('--headless')
-            options.add_argument('--no-sandbox')
-            # Suppress logs for the check
-            options.add_experimental_option('excludeSwitches', ['enable-logging'])
-            
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-            driver.quit()
-            
-            self.chrome_available = True
-            self.after(0, lambda: self.update_chrome_status(True))
-        except Exception as e:
-            self.chrome_available = False
-            self.after(0, lambda: self.update_chrome_status(False))
+        """
+        Check if Chrome is available. A cached result skips the browser launch entirely;
+        otherwise the browser started here stays in the pool for the first page.
+        """
+        # Load the crawl modules now so the first Start click doesn't pay for them
+        import crawler
+        
+        started = time.perf_counter()
+        available, from_cache = self.chrome_detection.check(self.browser_pool)
+        check_ms = (time.perf_counter() - started) * 1000
+        self.chrome_available = available
+        self.log(f"System: Chrome check took {check_ms:.0f}ms{' (cached)' if from_cache else ''}")
+        self.events.call(self.update_chrome_status, available)
 
     def update_chrome_status(self, available):
         if available:
@@ -163,6 +176,33 @@ class WebsiteSourceGetter(ctk.CTk):
         )
         self.organize_netlify.pack(anchor="w", pady=5)
         self.organize_netlify.select()
+        
+        self.incremental_mode = ctk.CTkSwitch(
+            crawl_frame,
+            text="Incremental re-mirror (HTTP cache)",
+            font=("Segoe UI", 12),
+            switch_width=50,
+            switch_height=25
+        )
+        self.incremental_mode.pack(anchor="w", pady=5)
+
+        self.resume_mode = ctk.CTkSwitch(
+            crawl_frame,
+            text="Resume last stopped crawl",
+            font=("Segoe UI", 12),
+            switch_width=50,
+            switch_height=25
+        )
+        self.resume_mode.pack(anchor="w", pady=5)
+
+        self.low_memory_mode = ctk.CTkSwitch(
+            crawl_frame,
+            text="Low memory (spill large crawls to disk)",
+            font=("Segoe UI", 12),
+            switch_width=50,
+            switch_height=25
+        )
+        self.low_memory_mode.pack(anchor="w", pady=5)
 
         # Max pages
         pages_frame = ctk.CTkFrame(left_inner, fg_color="transparent")
@@ -190,6 +230,56 @@ class WebsiteSourceGetter(ctk.CTk):
             height=18
         ).pack(fill="x")
         
+        # Download workers
+        threads_frame = ctk.CTkFrame(left_inner, fg_color="transparent")
+        threads_frame.pack(fill="x", pady=(0, 20))
+        
+        self.page_workers_var = ctk.IntVar(value=4)
+        self.download_threads_var = ctk.IntVar(value=8)
+        self.per_host_limit_var = ctk.IntVar(value=4)
+        threads_label = ctk.CTkLabel(
+            threads_frame,
+            text=f"Page workers: {self.page_workers_var.get()}, download threads: {self.download_threads_var.get()} (max {self.per_host_limit_var.get()} per host)",
+            font=("Segoe UI", 11),
+            text_color=("#666666", "#999999")
+        )
+        threads_label.pack(anchor="w", pady=(0, 5))
+        
+        def update_threads_label(value=None):
+            threads_label.configure(
+                text=f"Page workers: {self.page_workers_var.get()}, download threads: {self.download_threads_var.get()} (max {self.per_host_limit_var.get()} per host)"
+            )
+        
+        ctk.CTkSlider(
+            threads_frame,
+            from_=1,
+            to=16,
+            number_of_steps=15,
+            variable=self.page_workers_var,
+            command=update_threads_label,
+            height=18
+        ).pack(fill="x", pady=(0, 5))
+        
+        ctk.CTkSlider(
+            threads_frame,
+            from_=1,
+            to=32,
+            number_of_steps=31,
+            variable=self.download_threads_var,
+            command=update_threads_label,
+            height=18
+        ).pack(fill="x", pady=(0, 5))
+        
+        ctk.CTkSlider(
+            threads_frame,
+            from_=1,
+            to=16,
+            number_of_steps=15,
+            variable=self.per_host_limit_var,
+            command=update_threads_label,
+            height=18
+        ).pack(fill="x")
+        
         # Resource checkboxes
         resources_label = ctk.CTkLabel(
             left_inner,
@@ -251,6 +341,37 @@ class WebsiteSourceGetter(ctk.CTk):
         )
         self.chrome_status_label.pack(anchor="w", padx=(30, 0))
         
+        self.browser_count_var = ctk.IntVar(value=2)
+        browsers_label = ctk.CTkLabel(
+            selenium_frame,
+            text=f"Browsers: {self.browser_count_var.get()}",
+            font=("Segoe UI", 11),
+            text_color=("#666666", "#999999")
+        )
+        browsers_label.pack(anchor="w", pady=(10, 5))
+        
+        def update_browsers_label(value):
+            browsers_label.configure(text=f"Browsers: {int(float(value))}")
+        
+        ctk.CTkSlider(
+            selenium_frame,
+            from_=1,
+            to=8,
+            number_of_steps=7,
+            variable=self.browser_count_var,
+            command=update_browsers_label,
+            height=18
+        ).pack(fill="x")
+        
+        self.wait_selector_var = ctk.StringVar()
+        ctk.CTkEntry(
+            selenium_frame,
+            textvariable=self.wait_selector_var,
+            placeholder_text="Wait for CSS selector (optional)",
+            height=32,
+            font=("Segoe UI", 12)
+        ).pack(fill="x", pady=(10, 0))
+        
         # Right column - Progress & Log
         right = ctk.CTkFrame(columns, fg_color=("#f8f9fa", "#1a1a1a"), corner_radius=12)
         right.pack(side="left", fill="both", expand=True, padx=(8, 0))
@@ -352,25 +473,63 @@ class WebsiteSourceGetter(ctk.CTk):
         )
         credits_label.pack(side="right")
         
+    def on_close(self):
+        self.is_scraping = False
+        if self.crawler:
+            self.crawler.stop()
+        self.browser_pool.close()
+        self.destroy()
+        
     def log(self, message):
+        """Safe from any thread, the line shows up on the next drain_events tick"""
         timestamp = time.strftime("%H:%M:%S")
-        try:
-            self.log_text.insert("end", f"[{timestamp}] {message}\n")
-        except:
-            safe_msg = message.encode('ascii', 'ignore').decode('ascii')
-            self.log_text.insert("end", f"[{timestamp}] {safe_msg}\n")
-        self.log_text.see("end")
+        self.events.log(f"[{timestamp}] {message}")
         
     def update_status(self, message, progress_text=""):
+        """Safe from any thread"""
+        self.events.status(message, progress_text)
+        self.log(message)
+
+    def drain_events(self):
+        """UI thread: apply everything queued since the last tick in one batch"""
+        try:
+            lines, dropped, status, progress, callbacks = self.events.drain()
+            if dropped:
+                lines.insert(0, f"... {dropped} lines skipped, see crawl.log in the output folder")
+            if lines:
+                self.append_log(lines)
+            if status:
+                message, progress_text = status
+                try:
+                    self.status_var.set(message)
+                except:
+                    self.status_var.set(message.encode('ascii', 'ignore').decode('ascii'))
+                if progress_text:
+                    self.progress_text_var.set(progress_text)
+            if progress is not None:
+                self.progress_var.set(progress)
+            for fn, args in callbacks:
+                try:
+                    fn(*args)
+                except Exception as e:
+                    self.log(f"UI update failed: {e}")
+        finally:
+            self.after(DRAIN_INTERVAL_MS, self.drain_events)
+
+    def append_log(self, lines):
+        """One insert per batch, then trim the textbox back to LOG_MAX_LINES"""
+        lines = lines[-LOG_MAX_LINES:]
+        text = "\n".join(lines) + "\n"
         try:
-            self.status_var.set(message)
-            if progress_text:
-                self.progress_text_var.set(progress_text)
-            self.log(message)
+            self.log_text.insert("end", text)
         except:
-            safe_msg = message.encode('ascii', 'ignore').decode('ascii')
-            self.status_var.set(safe_msg)
-            self.log(safe_msg)
+            self.log_text.insert("end", text.encode('ascii', 'ignore').decode('ascii'))
+        self.log_lines += len(lines)
+        if self.log_lines > LOG_MAX_LINES:
+            excess = self.log_lines - LOG_MAX_LINES
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_lines = LOG_MAX_LINES
+        self.log_text.see("end")
         
     def start_scraping(self):
         url = self.url_var.get().strip()
@@ -383,175 +542,81 @@ class WebsiteSourceGetter(ctk.CTk):
             self.url_var.set(url)
         
         self.is_scraping = True
-        self.visited_urls.clear()
         self.scrape_btn.configure(state="disabled")
         self.stop_btn.configure(state="normal", fg_color=("#ef4444", "#dc2626"), hover_color=("#dc2626", "#b91c1c"))
         self.progress_var.set(0)
         self.progress_text_var.set("0%")
         self.log_text.delete("1.0", "end")
+        self.log_lines = 0
         
-        thread = threading.Thread(target=self.scrape_website, args=(url,), daemon=True)
+        # Widgets are read here on the UI thread, the crawl thread only gets the snapshot.
+        # The crawler exists before the thread does, so Stop always has something to stop
+        from crawler import SiteCrawler
+        options = self.read_options()
+        try:
+            crawler = self.crawler = SiteCrawler(
+                url,
+                options,
+                log=self.log,
+                status=self.update_status,
+                progress=self.events.progress,
+                browser_pool=self.browser_pool if options.use_selenium else None
+            )
+        except Exception as e:
+            self.is_scraping = False
+            self.update_status(f"Error: {e}")
+            self.reset_buttons()
+            return
+        thread = threading.Thread(target=self.scrape_website, args=(crawler,), daemon=True)
         thread.start()
         
     def stop_scraping(self):
         self.is_scraping = False
-        self.update_status("Stopped by user")
-        self.scrape_btn.configure(state="normal")
+        if self.crawler:
+            self.crawler.stop()
+        self.update_status("Stopping...")
+        # Start comes back from the crawl thread once the crawl has wound down, not before
         self.stop_btn.configure(state="disabled", fg_color=("#6b7280", "#4b5563"), hover_color=("#4b5563", "#374151"))
         
-    def check_url_validity(self, url):
-        """Check if URL is accessible before scraping"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            # Try HEAD first (faster)
-            response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-            if response.status_code < 400:
-                return True
-            
-            # HEAD failed, try GET (some sites block HEAD requests)
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-            return response.status_code < 400
-        except:
-            # If both fail, still return True to let the main scraper try
-            # Better to attempt and fail than to skip valid pages
-            return True
+    def read_options(self):
+        """Snapshot the widgets into CrawlOptions so the crawl threads never touch Tk variables"""
+        from crawler import CrawlOptions
+        return CrawlOptions(
+            max_pages=self.max_pages_var.get(),
+            crawl_subpages=bool(self.crawl_subpages.get()),
+            organize_netlify=bool(self.organize_netlify.get()),
+            incremental=bool(self.incremental_mode.get()),
+            resume=bool(self.resume_mode.get()),
+            low_memory=bool(self.low_memory_mode.get()),
+            page_workers=self.page_workers_var.get(),
+            download_threads=self.download_threads_var.get(),
+            per_host_limit=self.per_host_limit_var.get(),
+            politeness_delay=self.politeness_delay,
+            images=bool(self.download_images.get()),
+            videos=bool(self.download_videos.get()),
+            audio=bool(self.download_audio.get()),
+            css=bool(self.download_css.get()),
+            js=bool(self.download_js.get()),
+            fonts=bool(self.download_fonts.get()),
+            use_selenium=bool(self.use_selenium.get()) and self.chrome_available,
+            browser_count=self.browser_count_var.get(),
+            wait_selector=self.wait_selector_var.get().strip() or None,
+            byte_limits=self.byte_limits,
+            log_file=True,  # The on-screen log is capped, crawl.log keeps all of it
+        )
         
-    def scrape_website(self, start_url):
+    def scrape_website(self, crawler):
         try:
-            self.update_status(f"Initializing crawl: {start_url}")
-            
-            # Setup directories
-            domain = urlparse(start_url).netloc.replace('www.', '')
-            base_domain = '.'.join(domain.split('.')[-2:]) if domain.count('.') > 0 else domain
-            output_dir = Path(f"scraped_{domain.replace('.', '_')}_{int(time.time())}")
-            output_dir.mkdir(exist_ok=True)
-            
-            # Create structure
-            (output_dir / "assets").mkdir(exist_ok=True)
-            (output_dir / "assets" / "images").mkdir(exist_ok=True)
-            (output_dir / "assets" / "videos").mkdir(exist_ok=True)
-            (output_dir / "assets" / "audio").mkdir(exist_ok=True)
-            (output_dir / "assets" / "css").mkdir(exist_ok=True)
-            (output_dir / "assets" / "js").mkdir(exist_ok=True)
-            (output_dir / "assets" / "fonts").mkdir(exist_ok=True)
-            (output_dir / "pages").mkdir(exist_ok=True)
-            
-            downloaded_files = {} # Key: Original URL, Value: Path relative to ROOT (scraped_folder/)
-            pages_to_visit = deque([start_url])
-            pages_crawled = 0
-            max_pages = self.max_pages_var.get() if self.crawl_subpages.get() else 1
-            
-            while pages_to_visit and pages_crawled < max_pages and self.is_scraping:
-                current_url = pages_to_visit.popleft()
-                
-                if current_url in self.visited_urls:
-                    continue
-                
-                if not self.check_url_validity(current_url):
-                    self.log(f"Skipped (404 or unreachable): {current_url}")
-                    continue
-                
-                self.visited_urls.add(current_url)
-                pages_crawled += 1
-                
-                progress_pct = int((pages_crawled / max_pages) * 100)
-                self.update_status(
-                    f"Crawling: {current_url}",
-                    f"{progress_pct}% ({pages_crawled}/{max_pages})"
-                )
-                self.progress_var.set(pages_crawled / max_pages)
-                
-                # Get page efficiently
-                html = None
-                if self.use_selenium.get() and self.chrome_available:
-                    html = self.get_with_selenium(current_url)
-                else:
-                    html = self.get_with_requests(current_url)
-                
-                if not html:
-                    self.log(f"Failed to fetch: {current_url}")
-                    continue
-                
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Find more pages to crawl
-                if self.crawl_subpages.get() and pages_crawled < max_pages:
-                    for link in soup.find_all('a', href=True):
-                        href = link['href']
-                        
-                        if href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-                            continue
-                        
-                        full_url = urljoin(current_url, href)
-                        parsed = urlparse(full_url)
-                        
-                        if base_domain in parsed.netloc and full_url not in self.visited_urls:
-                            skip_subdomains = ['dash', 'admin', 'api', 'reseller', 'portal', 'account', 'auth']
-                            subdomain = parsed.netloc.split('.')[0] if parsed.netloc.count('.') > 1 else ''
-                            
-                            if subdomain.lower() in skip_subdomains:
-                                continue
-                            
-                            if not any(ext in full_url.lower() for ext in ['.pdf', '.zip', '.jpg', '.png', '.gif']):
-                                pages_to_visit.append(full_url)
-                
-                # Download resources (Note: Logic works recursively now because we pass downloaded_files)
-                if self.download_images.get():
-                    self.download_resources(soup, current_url, 'img', 'src', output_dir / "assets" / "images", downloaded_files)
-                    self.download_resources(soup, current_url, 'img', 'data-src', output_dir / "assets" / "images", downloaded_files)
-                
-                if self.download_videos.get():
-                    self.download_media(soup, current_url, ['video', 'source'], ['src', 'data-src'], output_dir / "assets" / "videos", downloaded_files, ['.mp4', '.webm', '.ogg', '.mov'])
-                
-                if self.download_audio.get():
-                    self.download_media(soup, current_url, ['audio', 'source'], ['src'], output_dir / "assets" / "audio", downloaded_files, ['.mp3', '.wav', '.ogg', '.m4a'])
-                
-                if self.download_css.get():
-                    self.download_resources(soup, current_url, 'link', 'href', output_dir / "assets" / "css", downloaded_files, rel='stylesheet')
-                
-                if self.download_js.get():
-                    self.download_resources(soup, current_url, 'script', 'src', output_dir / "assets" / "js", downloaded_files)
-                
-                if self.download_fonts.get():
-                    self.download_fonts_from_css(soup, current_url, output_dir / "assets" / "fonts", downloaded_files)
-                
-                # DETERMINE FILE SAVE LOCATION
-                if current_url == start_url:
-                    filename = "index.html"
-                    file_subdir = "." # Root
-                else:
-                    path = urlparse(current_url).path.strip('/')
-                    filename = f"pages/{path.replace('/', '_')}.html" if path else f"pages/page_{pages_crawled}.html"
-                    file_subdir = "pages" # Inside pages folder
-                
-                # UPDATE HTML PATHS WITH RELATIVE CHECK
-                html_updated = self.update_html_paths(str(soup), downloaded_files, current_url, file_subdir)
-                
-                filepath = output_dir / filename
-                filepath.parent.mkdir(exist_ok=True, parents=True)
-                
-                with open(filepath, 'w', encoding='utf-8', errors='ignore') as f:
-                    f.write(html_updated)
-                
-                self.log(f"Saved: {filename}")
-            
-            if self.organize_netlify.get():
-                self.create_netlify_config(output_dir)
-                self.log(f"Generated Netlify configuration")
-            
-            self.progress_var.set(1.0)
-            self.progress_text_var.set("100%")
-            self.update_status(f"Complete! Scraped {pages_crawled} pages -> {output_dir.absolute()}")
+            summary = crawler.run()
             
             # Auto-open folder in Windows Explorer
-            try:
-                import subprocess
-                subprocess.Popen(f'explorer "{output_dir.absolute()}"')
-                self.log(f"Opened output folder")
-            except Exception as e:
-                self.log(f"Could not auto-open folder: {e}")
+            if summary['status'] == 'complete':
+                try:
+                    import subprocess
+                    subprocess.Popen(f'explorer "{summary["output_dir"]}"')
+                    self.log(f"Opened output folder")
+                except Exception as e:
+                    self.log(f"Could not auto-open folder: {e}")
             
         except Exception as e:
             error_msg = str(e).encode('ascii', 'ignore').decode('ascii')
@@ -559,207 +624,14 @@ class WebsiteSourceGetter(ctk.CTk):
             # print error for debugging
             print(f"DEBUG ERROR: {e}")
         finally:
-            self.scrape_btn.configure(state="normal")
-            self.stop_btn.configure(state="disabled", fg_color=("#6b7280", "#4b5563"), hover_color=("#4b5563", "#374151"))
+            if self.crawler is crawler:
+                self.crawler = None
             self.is_scraping = False
-    
-    def get_with_selenium(self, url):
-        try:
-            options = Options()
-            options.add_argument('--headless')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-            driver.get(url)
-            time.sleep(2)
-            
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
-            driver.execute_script("window.scrollTo(0, 0);")
-            
-            html = driver.page_source
-            driver.quit()
-            return html
-        except Exception as e:
-            return None
-    
-    def get_with_requests(self, url):
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            return None
-    
-    def download_resources(self, soup, base_url, tag, attr, output_dir, downloaded_files, **kwargs):
-        elements = soup.find_all(tag, **kwargs)
-        
-        for idx, element in enumerate(elements):
-            if not self.is_scraping:
-                break
-            
-            resource_url = element.get(attr)
-            if not resource_url or resource_url.startswith('data:'):
-                continue
-            
-            try:
-                full_url = urljoin(base_url, resource_url)
-                
-                # If already downloaded, just ensure mapping is there
-                if full_url in downloaded_files:
-                    continue
-
-                parsed = urlparse(full_url)
-                filename = os.path.basename(unquote(parsed.path))
-                
-                if not filename or '.' not in filename:
-                    ext = mimetypes.guess_extension(element.get('type', '')) or '.bin'
-                    filename = f"resource_{abs(hash(full_url))}{ext}"
-                
-                filename = re.sub(r'[^\w\.-]', '_', filename)
-                filepath = output_dir / filename
-                
-                if not filepath.exists():
-                    response = requests.get(full_url, timeout=15)
-                    response.raise_for_status()
-                    
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
-                    
-                    size_kb = len(response.content) // 1024
-                    self.log(f"Downloaded: {filename} ({size_kb}KB)")
-                
-                # IMPORTANT: Store path relative to the ROOT scraped folder
-                # e.g. assets/css/style.css
-                rel_path_from_root = str(filepath.relative_to(filepath.parents[2]))
-                downloaded_files[full_url] = rel_path_from_root
-                downloaded_files[resource_url] = rel_path_from_root # Store original relative URL too
-                
-            except Exception as e:
-                pass
-    
-    def download_media(self, soup, base_url, tags, attrs, output_dir, downloaded_files, extensions):
-        for tag in tags:
-            for attr in attrs:
-                self.download_resources(soup, base_url, tag, attr, output_dir, downloaded_files)
-    
-    def download_fonts_from_css(self, soup, base_url, output_dir, downloaded_files):
-        css_links = soup.find_all('link', rel='stylesheet')
-        for link in css_links:
-            href = link.get('href')
-            if href:
-                try:
-                    css_url = urljoin(base_url, href)
-                    response = requests.get(css_url, timeout=10)
-                    css_content = response.text
-                    
-                    font_urls = re.findall(r'url\(["\']?([^"\'()]+\.(woff2?|ttf|otf|eot))["\']?\)', css_content)
-                    for font_url, ext in font_urls:
-                        if not self.is_scraping:
-                            break
-                        try:
-                            full_font_url = urljoin(css_url, font_url)
-                            
-                            if full_font_url in downloaded_files:
-                                continue
+            self.events.call(self.reset_buttons)
 
-                            filename = os.path.basename(unquote(font_url))
-                            filename = re.sub(r'[^\w\.-]', '_', filename)
-                            filepath = output_dir / filename
-                            
-                            if not filepath.exists():
-                                font_response = requests.get(full_font_url, timeout=10)
-                                font_response.raise_for_status()
-                                
-                                with open(filepath, 'wb') as f:
-                                    f.write(font_response.content)
-                                self.log(f"Downloaded font: {filename}")
-                            
-                            rel_path_from_root = str(filepath.relative_to(filepath.parents[2]))
-                            downloaded_files[full_font_url] = rel_path_from_root
-                            downloaded_files[font_url] = rel_path_from_root
-                        except:
-                            pass
-                except:
-                    pass
-    
-    def update_html_paths(self, html, downloaded_files, base_url, html_subdir="."):
-        """
-        Intelligently updates paths based on where the HTML file is located.
-        html_subdir: The directory the HTML file is in, relative to the root scraped folder.
-                     e.g., "." for index.html, "pages" for subpages.
-        """
-        # Sort by length descending to prevent partial replacements
-        sorted_urls = sorted(downloaded_files.keys(), key=len, reverse=True)
-        
-        for original_url in sorted_urls:
-            root_relative_path = downloaded_files[original_url]
-            
-            if html_subdir == ".":
-                final_path = root_relative_path.replace("\\", "/")
-            else:
-                # File is in pages/, asset is at assets/...
-                # We need ../assets/...
-                final_path = "../" + root_relative_path.replace("\\", "/")
-            
-            # Replace strictly
-            html = html.replace(f'"{original_url}"', f'"{final_path}"')
-            html = html.replace(f"'{original_url}'", f"'{final_path}'")
-            
-            # Handle absolute URLs that might have been constructed
-            if not original_url.startswith(('http://', 'https://', '//')):
-                full_url = urljoin(base_url, original_url)
-                html = html.replace(f'"{full_url}"', f'"{final_path}"')
-                html = html.replace(f"'{full_url}'", f"'{final_path}'")
-        
-        # NUCLEAR OPTION: For pages in subfolders, aggressively rewrite ALL resource paths
-        if html_subdir != ".":
-            # Fix assets/ references
-            html = re.sub(r'(href|src|content|data-src|data-href)=(["\'])assets/', r'\1=\2../assets/', html, flags=re.IGNORECASE)
-            html = re.sub(r'url\((["\']?)assets/', r'url(\1../assets/', html, flags=re.IGNORECASE)
-            
-            # Fix absolute paths like /css/, /js/, /images/ etc
-            # Map common absolute paths to our assets structure
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/css/', r'\1=\2../assets/css/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/js/', r'\1=\2../assets/js/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/javascript/', r'\1=\2../assets/js/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/images?/', r'\1=\2../assets/images/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/img/', r'\1=\2../assets/images/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/fonts?/', r'\1=\2../assets/fonts/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/videos?/', r'\1=\2../assets/videos/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/audio/', r'\1=\2../assets/audio/', html, flags=re.IGNORECASE)
-            html = re.sub(r'(href|src|content|data-src)=(["\'])/media/', r'\1=\2../assets/images/', html, flags=re.IGNORECASE)
-            
-            # Fix CSS url() with absolute paths
-            html = re.sub(r'url\((["\']?)/css/', r'url(\1../assets/css/', html, flags=re.IGNORECASE)
-            html = re.sub(r'url\((["\']?)/images?/', r'url(\1../assets/images/', html, flags=re.IGNORECASE)
-            html = re.sub(r'url\((["\']?)/fonts?/', r'url(\1../assets/fonts/', html, flags=re.IGNORECASE)
-        
-        # Clean up <base> tags which might break relative links
-        html = re.sub(r'<base[^>]*>', '', html, flags=re.IGNORECASE)
-        
-        return html
-    
-    def create_netlify_config(self, output_dir):
-        config = """[build]
-  publish = "."
-  
-[[redirects]]
-  from = "/*"
-  to = "/index.html"
-  status = 200
-"""
-        with open(output_dir / "netlify.toml", 'w', encoding='utf-8') as f:
-            f.write(config)
+    def reset_buttons(self):
+        self.scrape_btn.configure(state="normal")
+        self.stop_btn.configure(state="disabled", fg_color=("#6b7280", "#4b5563"), hover_color=("#4b5563", "#374151"))
 
 if __name__ == "__main__":
     app = WebsiteSourceGetter()
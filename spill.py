@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+SPILL_FILE = "crawl_spill.sqlite"
+
+
+class SpillFile:
+    """
+    Scratch SQLite file behind the low-memory structures below. No journal and no fsync:
+    it only has to live as long as the crawl (the checkpoint is what resumes one), and is
+    deleted by close(). cache_mb bounds SQLite's own page cache.
+    """
+
+    def __init__(self, path, cache_mb=4):
+        self.path = path
+        if os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute(f"PRAGMA cache_size=-{int(cache_mb * 1024)}")
+        self.lock = threading.RLock()
+
+    def execute(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class LruCache:
+    """The hot set in front of a disk structure: the `size` most recently used keys"""
+
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self.items = OrderedDict()
+
+    def get(self, key, default=None):
+        value = self.items.get(key, default)
+        if key in self.items:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def discard(self, key):
+        self.items.pop(key, None)
+
+
+_MISSING = object()
+
+
+class DiskMap:
+    """
+    dict stand-in (get, [], in, setdefault, pop, update, len) for the big string maps of a crawl,
+    e.g. downloaded_files or the asset manifest. Every entry lives in SQLite; the `hot` most
+    recently used ones are also kept in memory. json_values stores dict/list values as JSON.
+    """
+
+    def __init__(self, spill, name, hot=50000, json_values=False):
+        self.spill = spill
+        self.table = name
+        self.hot = LruCache(hot)
+        self.json_values = json_values
+        spill.execute(f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+
+    def encode(self, value):
+        return json.dumps(value, separators=(',', ':')) if self.json_values else value
+
+    def decode(self, value):
+        return json.loads(value) if self.json_values else value
+
+    def get(self, key, default=None):
+        with self.spill.lock:
+            value = self.hot.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            row = self.spill.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            value = self.decode(row[0])
+            self.hot.put(key, value)
+            return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        with self.spill.lock:
+            self.spill.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?)", (key, self.encode(value)))
+            self.hot.put(key, value)
+
+    def setdefault(self, key, value):
+        with self.spill.lock:
+            existing = self.get(key, _MISSING)
+            if existing is not _MISSING:
+                return existing
+            self[key] = value
+            return value
+
+    def pop(self, key, default=None):
+        with self.spill.lock:
+            value = self.get(key, default)
+            self.spill.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self.hot.discard(key)
+            return value
+
+    def update(self, items):
+        items = items.items() if hasattr(items, 'items') else items
+        with self.spill.lock:
+            self.spill.conn.execute("BEGIN")
+            try:
+                for key, value in items:
+                    self[key] = value
+            finally:
+                self.spill.conn.execute("COMMIT")
+
+    def __len__(self):
+        return self.spill.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def sorted_items(self, batch=1000):
+        """(key, value) pairs in key order, read a batch at a time"""
+        last = None
+        while True:
+            if last is None:
+                sql, args = f"SELECT key, value FROM {self.table} ORDER BY key LIMIT ?", (batch,)
+            else:
+                sql, args = f"SELECT key, value FROM {self.table} WHERE key > ? ORDER BY key LIMIT ?", (last, batch)
+            rows = self.spill.execute(sql, args).fetchall()
+            if not rows:
+                return
+            for key, value in rows:
+                yield key, self.decode(value)
+            last = rows[-1][0]
+
+    def distinct_values(self):
+        return self.spill.execute(f"SELECT COUNT(DISTINCT value) FROM {self.table}").fetchone()[0]
+
+
+class DiskSeenSet:
+    """Exact fingerprint seen-set (see urlnorm.FingerprintSet) kept in SQLite behind a hot set"""
+
+    def __init__(self, spill, hot=100000):
+        self.spill = spill
+        self.hot = LruCache(hot)
+        self.count = 0
+        spill.execute("CREATE TABLE IF NOT EXISTS seen (fp INTEGER PRIMARY KEY)")
+
+    def add(self, fp):
+        """Returns False if fp was already present"""
+        with self.spill.lock:
+            if fp in self.hot:
+                self.hot.put(fp, True)
+                return False
+            self.hot.put(fp, True)
+            # SQLite integers are signed 64-bit
+            cursor = self.spill.execute("INSERT OR IGNORE INTO seen VALUES (?)", (fp - (1 << 64) if fp >= 1 << 63 else fp,))
+            if cursor.rowcount == 1:
+                self.count += 1
+                return True
+            return False
+
+    def __contains__(self, fp):
+        with self.spill.lock:
+            if fp in self.hot:
+                return True
+            key = fp - (1 << 64) if fp >= 1 << 63 else fp
+            return self.spill.execute("SELECT 1 FROM seen WHERE fp = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.count
+
+
+class DiskQueue:
+    """
+    FIFO with deque's append/popleft/len/bool for the frontier. Only the `batch` oldest and
+    newest entries are in memory; everything in between waits in SQLite.
+    """
+
+    def __init__(self, spill, name="queue", batch=1000):
+        self.spill = spill
+        self.table = name
+        self.batch = max(1, int(batch))
+        self.head = deque()  # Oldest entries, popped from
+        self.tail = []  # Newest entries, appended to
+        self.stored = 0
+        spill.execute(f"CREATE TABLE IF NOT EXISTS {name} (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT)")
+
+    def append(self, url):
+        self.tail.append(url)
+        if len(self.tail) >= self.batch:
+            with self.spill.lock:
+                self.spill.conn.executemany(f"INSERT INTO {self.table} (url) VALUES (?)", ((u,) for u in self.tail))
+            self.stored += len(self.tail)
+            self.tail = []
+
+    def popleft(self):
+        if not self.head:
+            if self.stored:
+                with self.spill.lock:
+                    rows = self.spill.execute(f"SELECT id, url FROM {self.table} ORDER BY id LIMIT ?", (self.batch,)).fetchall()
+                    self.spill.execute(f"DELETE FROM {self.table} WHERE id <= ?", (rows[-1][0],))
+                self.stored -= len(rows)
+                self.head.extend(url for _, url in rows)
+            else:
+                self.head.extend(self.tail)
+                self.tail = []
+        return self.head.popleft()
+
+    def __len__(self):
+        return len(self.head) + self.stored + len(self.tail)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class VisitCounter:
+    """Stands in for the frontier's visited set when only the number of pages matters"""
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, url):
+        self.count += 1
+
+    def update(self, urls):
+        self.count += len(urls)
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, url):
+        return False
+
+    def __iter__(self):
+        return iter(())
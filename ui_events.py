@@ -0,0 +1,51 @@
+import threading
+from collections import deque
+
+
+class UiEventQueue:
+    """
+    Hand-off between crawl threads and the Tk main loop. Worker threads only append here,
+    the UI thread drains everything in one go from an after() timer:
+        log lines   - kept in order, at most max_pending (older ones are dropped and counted)
+        status      - only the latest message/progress text matters
+        progress    - only the latest fraction matters
+        callbacks   - functions that must run on the UI thread (button states, ...)
+    """
+
+    def __init__(self, max_pending=5000):
+        self.lines = deque(maxlen=max_pending)
+        self.dropped = 0
+        self.status_update = None
+        self.progress_update = None
+        self.callbacks = deque()
+        self.lock = threading.Lock()
+
+    def log(self, line):
+        with self.lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line)
+
+    def status(self, message, progress_text=""):
+        with self.lock:
+            self.status_update = (message, progress_text)
+
+    def progress(self, fraction):
+        with self.lock:
+            self.progress_update = fraction
+
+    def call(self, fn, *args):
+        self.callbacks.append((fn, args))
+
+    def drain(self):
+        """Returns (lines, dropped, status or None, progress or None, callbacks) and resets"""
+        with self.lock:
+            lines = list(self.lines)
+            self.lines.clear()
+            dropped, self.dropped = self.dropped, 0
+            status, self.status_update = self.status_update, None
+            progress, self.progress_update = self.progress_update, None
+        callbacks = []
+        while self.callbacks:
+            callbacks.append(self.callbacks.popleft())
+        return lines, dropped, status, progress, callbacks
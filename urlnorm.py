@@ -0,0 +1,115 @@
+import hashlib
+import math
+import re
+
+DEFAULT_PORT_SUFFIX = {'http': ':80', 'https': ':443'}
+# scheme :// netloc, then path + query up to the fragment
+URL_RE = re.compile(r'([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)([^#]*)')
+
+
+def normalize(url):
+    """
+    Safe cleanup of a URL we are about to fetch: no fragment, lowercase scheme and host,
+    no default port. The path is left alone, links on the page resolve against it.
+    One regex match instead of urlsplit, this runs for every link on every page.
+    """
+    match = URL_RE.match(url.strip())
+    if match is None:
+        return url.partition('#')[0]
+    scheme, netloc, tail = match.groups()
+    scheme = scheme.lower()
+    if '@' in netloc:
+        userinfo, _, host = netloc.rpartition('@')
+        netloc = f"{userinfo}@{host.lower()}"
+    else:
+        netloc = netloc.lower()
+    suffix = DEFAULT_PORT_SUFFIX.get(scheme)
+    if suffix and netloc.endswith(suffix):
+        netloc = netloc[:-len(suffix)]
+    if not tail.startswith('/'):
+        tail = '/' + tail
+    return f"{scheme}://{netloc}{tail}"
+
+
+def url_key(url):
+    """
+    Canonical form of a normalize()d URL, used to decide whether two URLs are the same
+    page: trailing slashes dropped and query parameters sorted. Never fetched, only compared.
+    """
+    base, sep, query = url.partition('?')
+    path_start = base.find('/', base.find('://') + 3)
+    if path_start != -1 and base.endswith('/'):
+        base = base[:path_start] + (base[path_start:].rstrip('/') or '/')
+    if '&' in query:
+        query = '&'.join(sorted(query.split('&')))
+    return f"{base}?{query}" if query else base
+
+
+def fingerprint(url):
+    """64-bit digest of url_key(url) for a normalize()d url, the only thing the seen-set keeps per URL"""
+    digest = hashlib.blake2b(url_key(url).encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class FingerprintSet:
+    """Exact seen-set over 64-bit fingerprints instead of full URL strings"""
+
+    def __init__(self):
+        self.items = set()
+
+    def add(self, fp):
+        """Returns False if fp was already present"""
+        if fp in self.items:
+            return False
+        self.items.add(fp)
+        return True
+
+    def __contains__(self, fp):
+        return fp in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class BloomFilter:
+    """
+    Fixed-size seen-set for very large crawls. Memory doesn't grow with the crawl, at the
+    price of a small chance (error_rate at capacity) that a new URL is taken as seen and skipped.
+    """
+
+    def __init__(self, capacity=5_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, fp):
+        # Double hashing: both halves of the 64-bit fingerprint
+        low, high = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        return [(low + i * high) % self.size for i in range(self.hashes)]
+
+    def add(self, fp):
+        """Returns False if fp was (probably) already present"""
+        bits = self.bits
+        new = False
+        for pos in self.positions(fp):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, fp):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(fp))
+
+    def __len__(self):
+        return self.count
+
+
+def make_seen_set(kind="exact", capacity=5_000_000):
+    if kind == "bloom":
+        return BloomFilter(capacity)
+    return FingerprintSet()